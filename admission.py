@@ -0,0 +1,294 @@
+import asyncio
+import json
+import math
+import os
+import re
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from metrics import REGISTRY, ASGIApp, Message, Registry, Scope
+
+# Настройки допуска из JSON-файла (формат — в load_config); без файла
+# действуют DEFAULT_POLICIES и ограничение частоты из переменных ниже
+ADMISSION_CONFIG = os.environ.get("BLOG_ADMISSION_CONFIG", "")
+# Запросов в секунду с одного IP и запас на всплеск; 0 — без ограничения
+RATE_LIMIT = float(os.environ.get("BLOG_RATE_LIMIT_RPS", "0"))
+RATE_BURST = float(os.environ.get("BLOG_RATE_LIMIT_BURST", "0"))
+# Сколько корзин клиентов помнить: дальше забываются успевшие наполниться
+MAX_CLIENTS = 10_000
+
+
+class RoutePolicy(NamedTuple):
+    # Класс запросов: в обработке одновременно не больше concurrency,
+    # ещё не больше queue ждут своей очереди. Ждавший дольше target_ms
+    # получает 503 — клиенту лучше повторить, чем ждать без конца
+    name: str
+    methods: Tuple[str, ...]
+    pattern: str
+    concurrency: int
+    queue: int
+    target_ms: float
+
+
+class AdmissionConfig(NamedTuple):
+    policies: List[RoutePolicy]
+    default: RoutePolicy
+    rate: float
+    burst: float
+
+
+# Первый подходящий класс задаёт лимиты. Дорогие маршруты — рендеринг
+# страниц целиком и проходы по всей базе — получают мало мест: цикл событий
+# один, и больше пары таких обработчиков сразу не ускоряет их, а только
+# ставит дешёвые запросы в очередь за ними
+DEFAULT_POLICIES = [
+    RoutePolicy("pages", ("GET",), r"/|/api-info|/users", 2, 64, 1000),
+    RoutePolicy("bulk", ("GET", "POST"), r"/api/bulk/(import|export)", 1, 4, 5000),
+    RoutePolicy("batches", ("POST",), r"/api/(journeys|travelers)/batch", 2, 16, 2000),
+    RoutePolicy(
+        "lists",
+        ("GET",),
+        r"/api/(journeys|travelers)/|/api/journeys/(search|top|nearby|bbox|meta)"
+        r"|/api/changes",
+        2,
+        128,
+        1000,
+    ),
+]
+DEFAULT_POLICY = RoutePolicy("default", (), r".*", 256, 1024, 1000)
+
+
+def load_config(path: str = ADMISSION_CONFIG) -> AdmissionConfig:
+    # {"rate_limit": {"per_second": 20, "burst": 40},
+    #  "routes": [{"name": "pages", "methods": ["GET"], "pattern": "/|/users",
+    #              "concurrency": 4, "queue": 64, "target_ms": 1000}, ...],
+    #  "default": {"concurrency": 256, "queue": 1024, "target_ms": 1000}}
+    # Отсутствующие ключи берутся из значений по умолчанию
+    config = AdmissionConfig(DEFAULT_POLICIES, DEFAULT_POLICY, RATE_LIMIT, RATE_BURST)
+    if not path:
+        return config
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    policies = config.policies
+    if "routes" in raw:
+        policies = [
+            RoutePolicy(
+                route["name"],
+                tuple(route.get("methods", ())),
+                route["pattern"],
+                route.get("concurrency", DEFAULT_POLICY.concurrency),
+                route.get("queue", DEFAULT_POLICY.queue),
+                route.get("target_ms", DEFAULT_POLICY.target_ms),
+            )
+            for route in raw["routes"]
+        ]
+    default = DEFAULT_POLICY._replace(**raw.get("default", {}))
+    rate_limit = raw.get("rate_limit", {})
+    return AdmissionConfig(
+        policies,
+        default,
+        rate_limit.get("per_second", config.rate),
+        rate_limit.get("burst", config.burst),
+    )
+
+
+class Gate:
+    # Семафор с ограниченной очередью: освободившееся место передаётся
+    # первому ждущему, поэтому порядок — FIFO и никто не обгоняет очередь
+    def __init__(self, policy: RoutePolicy) -> None:
+        self.policy = policy
+        self.active = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def enter(self) -> Optional[str]:
+        # None — запрос допущен, иначе причина отказа
+        if self.active < self.policy.concurrency and not self._waiters:
+            self.active += 1
+            return None
+        if len(self._waiters) >= self.policy.queue:
+            return "queue_full"
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.policy.target_ms / 1000)
+        except asyncio.TimeoutError:
+            self._forget(waiter)
+            return "timeout"
+        except asyncio.CancelledError:
+            # Клиент ушёл: место, которое успели передать, возвращаем
+            if waiter.done() and not waiter.cancelled():
+                self.leave()
+            else:
+                self._forget(waiter)
+            raise
+        return None
+
+    def _forget(self, waiter: "asyncio.Future[None]") -> None:
+        # Отменённого ждущего мог уже вынуть leave()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def leave(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class TokenBuckets:
+    # Корзина токенов на клиента: rate в секунду, не больше burst впрок
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        # клиент -> (токены, когда пересчитаны)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, client: str) -> float:
+        # 0 — запрос можно выполнять, иначе через сколько секунд появится токен
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[client] = (tokens, now)
+            return (1 - tokens) / self.rate
+        self._buckets[client] = (tokens - 1, now)
+        if len(self._buckets) > MAX_CLIENTS:
+            self._forget(now)
+        return 0.0
+
+    def _forget(self, now: float) -> None:
+        # Наполнившаяся корзина ничем не отличается от новой
+        full = self.burst / self.rate
+        self._buckets = {
+            client: state
+            for client, state in self._buckets.items()
+            if now - state[1] < full
+        }
+
+
+class AdmissionMiddleware:
+    # Контроль допуска до маршрутизации: частота запросов с одного IP (429)
+    # и места по классам маршрутов (503). Отказ — сразу и с Retry-After,
+    # пока запрос ещё ничего не стоил. Чистый ASGI, как MetricsMiddleware
+    def __init__(
+        self,
+        app: ASGIApp,
+        config: Optional[AdmissionConfig] = None,
+        registry: Registry = REGISTRY,
+    ) -> None:
+        self.app = app
+        config = config or load_config()
+        self._classes = [
+            (frozenset(policy.methods), re.compile(policy.pattern), Gate(policy))
+            for policy in config.policies
+        ]
+        self._default = Gate(config.default)
+        self._gates = [gate for _, _, gate in self._classes] + [self._default]
+        self.buckets = (
+            TokenBuckets(config.rate, config.burst or 2 * config.rate)
+            if config.rate > 0
+            else None
+        )
+        self.decisions = registry.counter(
+            "blog_admission_decisions_total",
+            "Решения контроля допуска",
+            ("class", "decision"),
+        )
+        self.queue_wait = registry.histogram(
+            "blog_admission_queue_seconds",
+            "Ожидание места в очереди допуска",
+            ("class",),
+        )
+        registry.gauge_callback(
+            "blog_admission_active",
+            "Запросы класса в обработке",
+            ("class",),
+            lambda: {(gate.policy.name,): gate.active for gate in self._gates},
+        )
+        registry.gauge_callback(
+            "blog_admission_waiting",
+            "Запросы класса в очереди",
+            ("class",),
+            lambda: {(gate.policy.name,): gate.waiting for gate in self._gates},
+        )
+
+    def _gate(self, method: str, path: str) -> Gate:
+        for methods, pattern, gate in self._classes:
+            if (not methods or method in methods) and pattern.fullmatch(path):
+                return gate
+        return self._default
+
+    async def __call__(
+        self,
+        scope: Scope,
+        receive: Callable[[], Awaitable[Message]],
+        send: Callable[[Message], Awaitable[None]],
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        gate = self._gate(scope["method"], scope["path"])
+        name = gate.policy.name
+        if self.buckets is not None:
+            client = scope.get("client")
+            wait = self.buckets.take(client[0] if client else "")
+            if wait:
+                self.decisions.inc(name, "rate_limited")
+                await _reject(
+                    send, 429, "Слишком много запросов, повторите попытку позже", wait
+                )
+                return
+
+        started = time.perf_counter()
+        refused = await gate.enter()
+        if refused is not None:
+            self.decisions.inc(name, refused)
+            await _reject(
+                send,
+                503,
+                "Сервер перегружен, повторите попытку позже",
+                gate.policy.target_ms / 1000,
+            )
+            return
+        self.queue_wait.observe(time.perf_counter() - started, name)
+        self.decisions.inc(name, "admitted")
+        if gate is not self._default:
+            # Обработчики почти не уступают цикл событий, и без этой уступки
+            # запрос класса прошёл бы целиком до прихода следующего — места
+            # никогда не были бы заняты. Теперь пришедшие следом тяжёлые
+            # запросы ждут в очереди, а дешёвые идут сразу за допущенными
+            await asyncio.sleep(0)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.leave()
+
+
+async def _reject(
+    send: Callable[[Message], Awaitable[None]], status: int, detail: str, retry: float
+) -> None:
+    body = json.dumps({"detail": detail}, ensure_ascii=False).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry))).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
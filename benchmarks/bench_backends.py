@@ -0,0 +1,116 @@
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from sqlite_storage import SqliteStore
+from storage import JournalStore, SnapshotStore, Store
+
+DATASET = 20_000
+OPERATIONS = 2_000
+BATCH_SIZES = [1, 50]
+
+
+def make_journey(journey_id: int, traveler_id: int) -> Dict[str, Any]:
+    now = datetime.now()
+    return {
+        "id": journey_id,
+        "travelerId": traveler_id,
+        "destination": f"Место {journey_id}",
+        "story": "Рассказ о путешествии по горам и озёрам " * 5,
+        "createdAt": now,
+        "updatedAt": now,
+    }
+
+
+def workload(start_id: int) -> List[Dict[str, Any]]:
+    # Смесь создания, правки и удаления постов, одинаковая для всех хранилищ
+    random.seed(7)
+    changes: List[Dict[str, Any]] = []
+    next_id = start_id
+    for _ in range(OPERATIONS):
+        roll = random.random()
+        if roll < 0.6:
+            changes.append(
+                {"op": "put", "c": "journeys", "rec": make_journey(next_id, 1)}
+            )
+            next_id += 1
+        elif roll < 0.9:
+            journey_id = random.randint(1, next_id - 1)
+            changes.append(
+                {"op": "put", "c": "journeys", "rec": make_journey(journey_id, 1)}
+            )
+        else:
+            changes.append(
+                {"op": "del", "c": "journeys", "id": random.randint(1, next_id - 1)}
+            )
+    return changes
+
+
+def seed(store: Store) -> None:
+    store.load()
+    traveler = {
+        "id": 1,
+        "email": "a@b.ru",
+        "username": "ab",
+        "password": "123456",
+        "createdAt": datetime.now(),
+        "updatedAt": datetime.now(),
+    }
+    changes = [{"op": "put", "c": "travelers", "rec": traveler}]
+    changes += [
+        {"op": "put", "c": "journeys", "rec": make_journey(i, 1)}
+        for i in range(1, DATASET + 1)
+    ]
+    store.apply(changes)
+    store.close()
+
+
+def run(factory: Callable[[], Store], batch_size: int) -> Dict[str, float]:
+    store = factory()
+    seed(store)
+
+    store = factory()
+    started = time.perf_counter()
+    store.load()
+    load_time = time.perf_counter() - started
+
+    changes = workload(DATASET + 1)
+    started = time.perf_counter()
+    for offset in range(0, len(changes), batch_size):
+        store.apply(changes[offset : offset + batch_size])
+        store.sync()
+    elapsed = time.perf_counter() - started
+    store.close()
+    return {"load_ms": load_time * 1000, "ops_per_s": len(changes) / elapsed}
+
+
+def main() -> None:
+    print(f"Набор: {DATASET} постов, {OPERATIONS} операций")
+    print(f"{'backend':>10} {'batch':>6} {'load, мс':>10} {'операций/с':>12}")
+    for batch_size in BATCH_SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            factories: Dict[str, Callable[[], Store]] = {
+                "snapshot": lambda: SnapshotStore(os.path.join(tmp, "s.json")),
+                "journal": lambda: JournalStore(
+                    os.path.join(tmp, "j.json"),
+                    os.path.join(tmp, "j.journal"),
+                    compact_every=10**9,
+                    fsync=True,
+                ),
+                "sqlite": lambda: SqliteStore(os.path.join(tmp, "blog.sqlite3")),
+            }
+            for name, factory in factories.items():
+                if name == "snapshot" and batch_size == 1:
+                    continue
+                result = run(factory, batch_size)
+                print(
+                    f"{name:>10} {batch_size:>6} {result['load_ms']:>10.1f} "
+                    f"{result['ops_per_s']:>12.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import random
+import timeit
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from categories import CategoryIndex
+from favorites import FavoriteIndex
+from repository import BlogRepository
+
+SIZES = [10_000, 100_000, 1_000_000]
+CATEGORIES = 50
+CATEGORIES_PER_JOURNEY = 2
+FAVORITES_PER_USER = 200
+USERS = 1_000
+PAGE_SIZE = 20
+
+
+def build(size: int) -> Dict[str, Any]:
+    started = datetime(2024, 1, 1)
+    journeys = []
+    for journey_id in range(1, size + 1):
+        created_at = started + timedelta(seconds=journey_id)
+        journeys.append(
+            {
+                "id": journey_id,
+                "travelerId": 1,
+                "destination": f"Место {journey_id}",
+                "story": "История",
+                "createdAt": created_at,
+                "updatedAt": created_at,
+            }
+        )
+    categories = [
+        {"id": i, "name": f"Категория {i}", "slug": f"c{i}", "createdAt": started}
+        for i in range(1, CATEGORIES + 1)
+    ]
+    # Популярность категорий неравномерна: первые встречаются чаще
+    weights = [1 / rank for rank in range(1, CATEGORIES + 1)]
+    links: List[Dict[str, Any]] = []
+    for journey in journeys:
+        chosen = set(
+            random.choices(range(1, CATEGORIES + 1), weights, k=CATEGORIES_PER_JOURNEY)
+        )
+        for category_id in chosen:
+            links.append(
+                {
+                    "id": len(links) + 1,
+                    "journeyId": journey["id"],
+                    "categoryId": category_id,
+                }
+            )
+    favorites = [
+        {
+            "id": i + 1,
+            "userId": i // FAVORITES_PER_USER + 1,
+            "journeyId": random.randint(1, size),
+        }
+        for i in range(USERS * FAVORITES_PER_USER)
+    ]
+    return {
+        "journeys": journeys,
+        "categories": categories,
+        "links": links,
+        "favorites": favorites,
+    }
+
+
+def main() -> None:
+    random.seed(42)
+    print(
+        f"{'journeys':>10} {'batch, мкс':>11} {'N+1 scan, мкс':>14} "
+        f"{'filter, мкс':>12} {'filter scan, мс':>16} {'counts, мкс':>12}"
+    )
+    for size in SIZES:
+        data = build(size)
+        repo = BlogRepository([], data["journeys"], 2, size + 1)
+        categories = CategoryIndex(repo, data["categories"], data["links"])
+        favorites = FavoriteIndex(repo, data["favorites"])
+        page_ids = [journey["id"] for journey in repo.page_journeys(PAGE_SIZE)[0]]
+        links, favorite_records = data["links"], data["favorites"]
+
+        def batch() -> None:
+            categories.categories_for(page_ids)
+            favorites.favorites_among(7, page_ids)
+
+        def n_plus_one() -> None:
+            # Как без индексов: по проходу на каждый пост страницы
+            for journey_id in page_ids[:2]:
+                [link for link in links if link["journeyId"] == journey_id]
+                any(
+                    f["userId"] == 7 and f["journeyId"] == journey_id
+                    for f in favorite_records
+                )
+
+        def filtered() -> None:
+            categories.page_journeys(CATEGORIES, PAGE_SIZE)
+
+        def filter_scan() -> None:
+            members = {
+                link["journeyId"] for link in links if link["categoryId"] == CATEGORIES
+            }
+            matches = [j for j in repo.journeys if j["id"] in members]
+            matches[:PAGE_SIZE]
+
+        def counts() -> None:
+            categories.counts()
+
+        batch_us = timeit.timeit(batch, number=1_000) * 1_000
+        scan_us = timeit.timeit(n_plus_one, number=1) / 2 * PAGE_SIZE * 1_000_000
+        filter_us = timeit.timeit(filtered, number=1_000) * 1_000
+        filter_scan_ms = timeit.timeit(filter_scan, number=1) * 1_000
+        counts_us = timeit.timeit(counts, number=1_000) * 1_000
+        print(
+            f"{size:>10} {batch_us:>11.1f} {scan_us:>14.0f} {filter_us:>12.1f} "
+            f"{filter_scan_ms:>16.1f} {counts_us:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from comments import REPLIES_PREVIEW, CommentTree
+from repository import BlogRepository
+
+SIZES = [1_000, 10_000, 100_000]
+PAGE_SIZE = 20
+# Доля ответов среди комментариев и с какой вероятностью ответ идёт
+# на один из последних комментариев — так растут длинные ветки
+REPLY_SHARE = 0.8
+RECENT_WINDOW = 50
+
+
+def make_comments(size: int) -> List[Dict[str, Any]]:
+    started = datetime(2024, 1, 1)
+    comments: List[Dict[str, Any]] = []
+    for comment_id in range(1, size + 1):
+        parent_id = None
+        if comments and random.random() < REPLY_SHARE:
+            parent_id = random.choice(comments[-RECENT_WINDOW:])["id"]
+        created_at = started + timedelta(seconds=comment_id)
+        comments.append(
+            {
+                "id": comment_id,
+                "journeyId": 1,
+                "authorId": 1,
+                "parentId": parent_id,
+                "content": f"Комментарий {comment_id}",
+                "createdAt": created_at,
+                "updatedAt": created_at,
+            }
+        )
+    return comments
+
+
+def naive_first_page(comments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Как без дерева: по уровню за проход, рекурсивно от каждого корня
+    def replies(parent_id: Any) -> List[Dict[str, Any]]:
+        result = []
+        for comment in comments:
+            if comment["parentId"] == parent_id:
+                result.append(comment)
+                result += replies(comment["id"])
+        return result
+
+    roots = [c for c in comments if c["parentId"] is None][:PAGE_SIZE]
+    return [item for root in roots for item in [root] + replies(root["id"])]
+
+
+def main() -> None:
+    random.seed(42)
+    print(
+        f"{'comments':>10} {'load, мс':>10} {'page, мс':>10} "
+        f"{'reply, мкс':>11} {'naive, мс':>10}"
+    )
+    for size in SIZES:
+        comments = make_comments(size)
+        repo = BlogRepository([], [])
+
+        started = time.perf_counter()
+        tree = CommentTree(repo, comments, size + 1)
+        load_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        for _ in range(100):
+            tree.page_threads(1, PAGE_SIZE, replies=REPLIES_PREVIEW)
+        page_ms = (time.perf_counter() - started) * 10
+
+        parents = [random.choice(comments) for _ in range(1_000)]
+        started = time.perf_counter()
+        for parent in parents:
+            tree.create(1, 1, "Ответ", parent)
+        reply_us = (time.perf_counter() - started) * 1000
+        repo.drain_changes()
+
+        naive = "-"
+        if size <= 10_000:
+            started = time.perf_counter()
+            naive_first_page(comments)
+            naive = f"{(time.perf_counter() - started) * 1000:.1f}"
+        print(
+            f"{size:>10} {load_ms:>10.1f} {page_ms:>10.3f} "
+            f"{reply_us:>11.1f} {naive:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
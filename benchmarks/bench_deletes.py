@@ -0,0 +1,86 @@
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from benchmarks.dataset import generate
+from repository import BlogRepository
+
+SIZES = [10_000, 100_000, 1_000_000]
+DELETES = 2_000
+# Пользователей, удаляемых вместе с постами
+CASCADES = 50
+
+
+def percentile(samples: List[float], share: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+def measure(size: int, seed: int) -> Tuple[float, ...]:
+    rng = random.Random(seed)
+    data = generate(max(size // 10, 2), size, comments_per_journey=0, seed=seed)
+    repo = BlogRepository(data["travelers"], data["journeys"])
+    # Прежняя реализация: list.remove по тому же списку записей
+    baseline = list(repo.journeys)
+    doomed = rng.sample(baseline, DELETES)
+
+    removals = []
+    for journey in doomed[: DELETES // 4]:
+        started = time.perf_counter()
+        baseline.remove(journey)
+        removals.append(time.perf_counter() - started)
+
+    deletes = []
+    for journey in doomed:
+        started = time.perf_counter()
+        repo.delete_journey(journey["id"])
+        deletes.append(time.perf_counter() - started)
+    repo.drain_changes()
+
+    # Удаление пользователя уносит его посты (ON DELETE CASCADE)
+    victims = rng.sample([traveler["id"] for traveler in repo.travelers], CASCADES)
+    cascaded = 0
+    started = time.perf_counter()
+    for traveler_id in victims:
+        cascaded += len(repo.get_journeys_by_traveler(traveler_id))
+        repo.delete_traveler(traveler_id)
+    cascade = (time.perf_counter() - started) / CASCADES
+    repo.drain_changes()
+
+    # Порядок обхода, страницы API и каскад проверяет tests/test_deletes.py
+    started = time.perf_counter()
+    repo.compact()
+    compaction = time.perf_counter() - started
+    return (
+        percentile(removals, 0.5),
+        percentile(deletes, 0.5),
+        percentile(deletes, 0.99),
+        cascade,
+        cascaded / CASCADES,
+        compaction,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Удаление постов: пометка вместо list.remove"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(
+        f"{'постов':>10} {'list.remove':>12} {'delete p50':>11} {'p99':>8} "
+        f"{'каскад':>9} {'постов/польз':>13} {'сжатие':>9}  (мкс; сжатие — мс)"
+    )
+    for size in args.sizes:
+        remove, p50, p99, cascade, per_user, compaction = measure(size, args.seed)
+        print(
+            f"{size:>10} {remove * 1e6:>12.1f} {p50 * 1e6:>11.1f} {p99 * 1e6:>8.1f} "
+            f"{cascade * 1e6:>9.1f} {per_user:>13.1f} {compaction * 1e3:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from feeds import FeedIndex
+from repository import BlogRepository
+
+TRAVELERS = 20_000
+JOURNEYS = 200_000
+# Сколько авторов читает каждый пользователь
+FOLLOWING = 50
+# Показатель Ципфа: популярность автора ~ 1 / rank ** ZIPF_S.
+# При таких параметрах у первого автора десятки тысяч подписчиков
+ZIPF_S = 1.1
+PAGE_SIZE = 20
+READS = 2_000
+POSTS = 2_000
+
+
+def build_repo() -> BlogRepository:
+    started = datetime(2024, 1, 1)
+    travelers = [
+        {
+            "id": i,
+            "email": f"user{i}@travel.com",
+            "username": f"user{i}",
+            "password": "secret123",
+            "createdAt": started,
+            "updatedAt": started,
+        }
+        for i in range(1, TRAVELERS + 1)
+    ]
+    journeys = []
+    for journey_id in range(1, JOURNEYS + 1):
+        created_at = started + timedelta(seconds=journey_id)
+        journeys.append(
+            {
+                "id": journey_id,
+                "travelerId": random.randint(1, TRAVELERS),
+                "destination": f"Место {journey_id}",
+                "story": "История путешествия",
+                "createdAt": created_at,
+                "updatedAt": created_at,
+            }
+        )
+    return BlogRepository(travelers, journeys, TRAVELERS + 1, JOURNEYS + 1)
+
+
+def build_subscriptions() -> List[Dict[str, Any]]:
+    weights = [1 / rank**ZIPF_S for rank in range(1, TRAVELERS + 1)]
+    subscriptions = []
+    for subscriber in range(1, TRAVELERS + 1):
+        targets = set(random.choices(range(1, TRAVELERS + 1), weights, k=FOLLOWING))
+        targets.discard(subscriber)
+        for target in targets:
+            subscriptions.append(
+                {
+                    "id": len(subscriptions) + 1,
+                    "subscriberId": subscriber,
+                    "targetUserId": target,
+                    "createdAt": datetime(2024, 1, 1),
+                }
+            )
+    return subscriptions
+
+
+def naive_feed(repo: BlogRepository, following: Any) -> List[Dict[str, Any]]:
+    # Без лент: проход по всем постам на каждый запрос
+    matches = [j for j in repo.journeys if j["travelerId"] in following]
+    matches.sort(key=lambda j: (j["createdAt"], j["id"]), reverse=True)
+    return matches[:PAGE_SIZE]
+
+
+def percentile(samples: List[float], share: float) -> float:
+    return sorted(samples)[int(len(samples) * share) - 1]
+
+
+def main() -> None:
+    random.seed(42)
+    repo = build_repo()
+    subscriptions = build_subscriptions()
+    feeds = FeedIndex(repo, subscriptions, len(subscriptions) + 1)
+    counts = sorted(
+        (feeds.follower_count(author) for author in range(1, TRAVELERS + 1)),
+        reverse=True,
+    )
+    print(
+        f"подписок: {len(subscriptions)}, подписчиков у авторов: "
+        f"max {counts[0]}, p99 {counts[TRAVELERS // 100]}, "
+        f"медиана {statistics.median(counts):.0f}, "
+        f"без раскладки: {sum(1 for c in counts if c > feeds.fanout_limit)}"
+    )
+
+    readers = [random.randint(1, TRAVELERS) for _ in range(READS)]
+    cold = []
+    for reader in readers:
+        started = time.perf_counter()
+        feeds.page(reader, PAGE_SIZE)
+        cold.append((time.perf_counter() - started) * 1000)
+    warm = []
+    for reader in readers:
+        started = time.perf_counter()
+        feeds.page(reader, PAGE_SIZE)
+        warm.append((time.perf_counter() - started) * 1000)
+    print(
+        f"чтение ленты, мс: первое p50 {statistics.median(cold):.3f} "
+        f"p99 {percentile(cold, 0.99):.3f}; повторное p50 "
+        f"{statistics.median(warm):.3f} p99 {percentile(warm, 0.99):.3f}"
+    )
+
+    # Автор поста — с тем же распределением, что и подписки
+    weights = [1 / rank**ZIPF_S for rank in range(1, TRAVELERS + 1)]
+    authors = random.choices(range(1, TRAVELERS + 1), weights, k=POSTS)
+    posts = []
+    for author in authors:
+        writes = feeds.fanout_writes
+        started = time.perf_counter()
+        repo.create_journey(author, "Новое место", "Новая история")
+        posts.append(
+            ((time.perf_counter() - started) * 1000, feeds.fanout_writes - writes)
+        )
+    repo.drain_changes()
+    times = [elapsed for elapsed, _ in posts]
+    print(
+        f"публикация поста, мс: p50 {statistics.median(times):.3f} "
+        f"p99 {percentile(times, 0.99):.3f} max {max(times):.3f}; "
+        f"записей в ленты: в среднем {statistics.mean(w for _, w in posts):.0f}, "
+        f"max {max(w for _, w in posts)}"
+    )
+
+    sample = readers[:20]
+    started = time.perf_counter()
+    for reader in sample:
+        naive_feed(repo, feeds.following(reader))
+    naive_ms = (time.perf_counter() - started) * 1000 / len(sample)
+    print(f"лента проходом по всем постам, мс: {naive_ms:.1f}")
+
+
+if __name__ == "__main__":
+    main()
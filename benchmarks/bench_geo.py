@@ -0,0 +1,135 @@
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from geo import GeoIndex, haversine_km
+from repository import BlogRepository
+
+POINTS = 1_000_000
+# Посты скапливаются у популярных мест, остальные разбросаны по суше
+PLACES = 2_000
+CLUSTERED_SHARE = 0.7
+CLUSTER_SPREAD_DEGREES = 0.3
+RADII_KM = [5, 50, 500]
+LIMIT = 20
+QUERIES = 500
+NAIVE_QUERIES = 3
+
+
+def build(places: List[Tuple[float, float]]) -> List[Dict[str, Any]]:
+    started = datetime(2024, 1, 1)
+    journeys = []
+    for journey_id in range(1, POINTS + 1):
+        if random.random() < CLUSTERED_SHARE:
+            lat, lng = random.choice(places)
+            lat = max(-90.0, min(90.0, random.gauss(lat, CLUSTER_SPREAD_DEGREES)))
+            lng = (random.gauss(lng, CLUSTER_SPREAD_DEGREES) + 180) % 360 - 180
+        else:
+            lat, lng = random.uniform(-56, 72), random.uniform(-180, 180)
+        created_at = started + timedelta(seconds=journey_id)
+        journeys.append(
+            {
+                "id": journey_id,
+                "travelerId": 1,
+                "destination": f"Место {journey_id}",
+                "story": "История",
+                "locationLat": lat,
+                "locationLng": lng,
+                "createdAt": created_at,
+                "updatedAt": created_at,
+            }
+        )
+    return journeys
+
+
+def naive_nearby(
+    journeys: List[Dict[str, Any]], lat: float, lng: float, radius_km: float
+) -> List[Tuple[float, int]]:
+    # Без индекса: расстояние до каждого поста
+    matches = []
+    for journey in journeys:
+        distance = haversine_km(
+            lat, lng, journey["locationLat"], journey["locationLng"]
+        )
+        if distance <= radius_km:
+            matches.append((distance, journey["id"]))
+    return sorted(matches)[:LIMIT]
+
+
+def timed_ms(queries: List[Tuple[float, float]], run: Any) -> List[float]:
+    samples = []
+    for lat, lng in queries:
+        started = time.perf_counter()
+        run(lat, lng)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def percentile(samples: List[float], share: float) -> float:
+    return sorted(samples)[int(len(samples) * share) - 1]
+
+
+def main() -> None:
+    random.seed(42)
+    places = [
+        (random.uniform(-50, 65), random.uniform(-180, 180)) for _ in range(PLACES)
+    ]
+    journeys = build(places)
+    repo = BlogRepository([], journeys, 2, POINTS + 1)
+
+    started = time.perf_counter()
+    index = GeoIndex(repo)
+    print(f"построение индекса, {POINTS} точек: {time.perf_counter() - started:.1f} с")
+
+    # Половина запросов у популярных мест, половина — в случайных точках
+    queries = [random.choice(places) for _ in range(QUERIES // 2)]
+    queries += [
+        (random.uniform(-56, 72), random.uniform(-180, 180))
+        for _ in range(QUERIES // 2)
+    ]
+    print(f"{'radius, км':>11} {'p50, мс':>9} {'p99, мс':>9} {'найдено (медиана)':>18}")
+    for radius in RADII_KM:
+        found = [
+            len(index.nearby(lat, lng, radius, 10**9)) for lat, lng in queries[:50]
+        ]
+        samples = timed_ms(
+            queries, lambda lat, lng: index.nearby(lat, lng, radius, LIMIT)
+        )
+        print(
+            f"{radius:>11} {statistics.median(samples):>9.3f} "
+            f"{percentile(samples, 0.99):>9.3f} {statistics.median(found):>18.0f}"
+        )
+
+    # Окно карты примерно 2°×3° у популярного места
+    windows = [(lat - 1, lng - 1.5) for lat, lng in queries]
+    samples = timed_ms(
+        windows,
+        lambda south, west: index.within(south, west, south + 2, west + 3, LIMIT),
+    )
+    print(
+        f"окно карты 2°×3°, мс: p50 {statistics.median(samples):.3f} "
+        f"p99 {percentile(samples, 0.99):.3f}"
+    )
+
+    # Правка координат: точка перекладывается из ячейки в ячейку
+    moved = random.sample(journeys, 10_000)
+    started = time.perf_counter()
+    for journey in moved:
+        repo.update_journey(journey, locationLat=journey["locationLat"] / 2)
+    update_us = (time.perf_counter() - started) / len(moved) * 1_000_000
+    repo.drain_changes()
+    print(
+        f"правка поста с переносом точки: {update_us:.1f} мкс (вместе с репозиторием)"
+    )
+
+    naive = timed_ms(
+        queries[:NAIVE_QUERIES],
+        lambda lat, lng: naive_nearby(repo.journeys, lat, lng, RADII_KM[1]),
+    )
+    print(f"поиск проходом по всем постам, мс: {statistics.mean(naive):.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+import httpx
+from fastapi import FastAPI, Response
+
+from json_cache import JSON_MEDIA_TYPE, JsonCache
+from repository import BlogRepository
+
+RECORDS = 10_000
+PAGE_SIZES = [20, 100]
+REQUESTS = 2_000
+
+
+def build_repo() -> BlogRepository:
+    start = datetime(2025, 1, 1)
+    journeys = [
+        {
+            "id": i,
+            "travelerId": 1,
+            "destination": f"Место {i}",
+            "story": "Рассказ о путешествии по горам и озёрам " * 5,
+            "createdAt": start + timedelta(seconds=i),
+            "updatedAt": start + timedelta(seconds=i),
+        }
+        for i in range(1, RECORDS + 1)
+    ]
+    return BlogRepository([], journeys, 1, RECORDS + 1)
+
+
+def build_app(repo: BlogRepository) -> FastAPI:
+    # Тот же список постов двумя способами: через jsonable_encoder и из кэша
+    app = FastAPI()
+    cache = JsonCache()
+
+    @app.get("/encoder")
+    async def encoder(limit: int) -> List[Dict[str, Any]]:
+        return repo.page_journeys(limit)[0]
+
+    @app.get("/cached")
+    async def cached(limit: int) -> Response:
+        content = cache.encode_list("journeys", repo.page_journeys(limit)[0])
+        return Response(content=content, media_type=JSON_MEDIA_TYPE)
+
+    return app
+
+
+async def requests_per_second(client: httpx.AsyncClient, url: str) -> float:
+    await client.get(url)
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        response = await client.get(url)
+        response.raise_for_status()
+    return REQUESTS / (time.perf_counter() - started)
+
+
+async def run() -> None:
+    app = build_app(build_repo())
+    transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        print(f"{'page size':>10} {'encoder':>10} {'cached':>10}  (запросов/с)")
+        for limit in PAGE_SIZES:
+            results = [
+                await requests_per_second(client, f"/{path}?limit={limit}")
+                for path in ("encoder", "cached")
+            ]
+            print(f"{limit:>10} {results[0]:>10.0f} {results[1]:>10.0f}")
+
+
+def main() -> None:
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
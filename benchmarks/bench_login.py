@@ -0,0 +1,110 @@
+import asyncio
+import statistics
+import time
+from typing import Dict, List, Optional
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from passwords import HasherBusy, PasswordHasher, hash_password, verify_password
+
+DURATION = 3.0
+LOGIN_CLIENTS = 8
+PASSWORD = "wander123"
+PROBE_INTERVAL = 0.005
+
+
+def build_app(stored: str, hasher: PasswordHasher) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping() -> Dict[str, str]:
+        return {"status": "ok"}
+
+    @app.post("/login/pool")
+    async def login_pool() -> Dict[str, bool]:
+        try:
+            matches, _ = await hasher.verify(PASSWORD, stored)
+        except HasherBusy:
+            raise HTTPException(status_code=503)
+        return {"ok": matches}
+
+    @app.post("/login/inline")
+    async def login_inline() -> Dict[str, bool]:
+        # Так было бы без пула: scrypt прямо в обработчике
+        matches, _ = verify_password(PASSWORD, stored)
+        return {"ok": matches}
+
+    return app
+
+
+async def login_loop(client: httpx.AsyncClient, url: str, deadline: float) -> int:
+    done = 0
+    while time.perf_counter() < deadline:
+        await client.post(url)
+        done += 1
+    return done
+
+
+async def probe(client: httpx.AsyncClient, deadline: float) -> List[float]:
+    # Задержку считаем от момента, когда запрос должен был уйти: если цикл
+    # событий занят, ожидание отправки тоже входит в ответ
+    latencies = []
+    planned = time.perf_counter()
+    while planned < deadline:
+        await asyncio.sleep(max(planned - time.perf_counter(), 0))
+        await client.get("/ping")
+        finished = time.perf_counter()
+        latencies.append((finished - planned) * 1000)
+        planned = max(planned + PROBE_INTERVAL, finished)
+    return latencies
+
+
+def percentile(values: List[float], q: int) -> float:
+    # Если вход блокирует цикл событий, проба успевает пройти один раз
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+async def scenario(client: httpx.AsyncClient, login_url: Optional[str]) -> str:
+    deadline = time.perf_counter() + DURATION
+    logins = []
+    if login_url is not None:
+        logins = [
+            asyncio.create_task(login_loop(client, login_url, deadline))
+            for _ in range(LOGIN_CLIENTS)
+        ]
+    latencies = await probe(client, deadline)
+    login_count = sum(await asyncio.gather(*logins))
+    return (
+        f"{len(latencies):>7} {percentile(latencies, 50):>8.2f} {percentile(latencies, 99):>8.2f}"
+        f" {login_count / DURATION:>10.1f}"
+    )
+
+
+async def run() -> None:
+    hasher = PasswordHasher()
+    app = build_app(hash_password(PASSWORD), hasher)
+    transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        print(
+            f"{'scenario':>16} {'probes':>7} {'p50, мс':>8} {'p99, мс':>8} {'входов/с':>10}  (/ping)"
+        )
+        for name, url in (
+            ("idle", None),
+            ("logins, pool", "/login/pool"),
+            ("logins, inline", "/login/inline"),
+        ):
+            print(f"{name:>16} {await scenario(client, url)}")
+    hasher.shutdown()
+
+
+def main() -> None:
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JOURNEYS = 1_000_000
+# Порог сжатия рассказов для режима "slots+zlib", байт
+COMPRESS_BYTES = 256
+MODES = {
+    "dict": "словарь + datetime (как до records.py)",
+    "slots": "JourneyRecord",
+    "slots+zlib": f"JourneyRecord, рассказы от {COMPRESS_BYTES} байт сжаты",
+    "repository": "BlogRepository с индексами, JourneyRecord",
+}
+
+
+def rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def journeys(count: int, seed: int) -> Iterator[Dict[str, Any]]:
+    # Записи в том виде, в каком их отдаёт storage.load(). Рассказы из
+    # пула с номером в конце: каждая строка — отдельный объект, как после
+    # чтения снимка, а генерация миллиона не занимает минуты.
+    # По одной: освобождённые словари не остаются в RSS режимов со слотами
+    from benchmarks.dataset import story
+
+    rng = random.Random(seed)
+    stories = [story(rng) for _ in range(1000)]
+    started = datetime(2024, 1, 1)
+    for journey_id in range(1, count + 1):
+        created_at = started + timedelta(seconds=journey_id)
+        yield (
+            {
+                "id": journey_id,
+                "travelerId": journey_id % 1000 + 1,
+                "destination": f"Место {journey_id}",
+                "story": f"{stories[journey_id % len(stories)]} {journey_id}",
+                "locationLat": 50.0 + journey_id % 90 / 10 if journey_id % 3 else None,
+                "locationLng": 80.0 + journey_id % 90 / 10 if journey_id % 3 else None,
+                "viewCount": journey_id % 500,
+                "likeCount": journey_id % 50,
+                "createdAt": created_at,
+                # Отдельный объект, как после разбора снимка
+                "updatedAt": created_at + timedelta(hours=journey_id % 48),
+            }
+        )
+
+
+def measure(mode: str, count: int, seed: int) -> Dict[str, Any]:
+    from records import JourneyRecord
+    from repository import BlogRepository
+
+    gc.collect()
+    before = rss()
+    if mode == "dict":
+        records: List[Any] = list(journeys(count, seed))
+    else:
+        records = [JourneyRecord(record) for record in journeys(count, seed)]
+    # Индексы репозитория: по id, по автору и порядок для страниц
+    repo = BlogRepository([], records) if mode == "repository" else None
+    gc.collect()
+    used = rss() - before
+    # У сжатых рассказов в слоте лежат байты
+    text = sum(
+        sys.getsizeof(record["story"] if mode == "dict" else record._story)
+        for record in records
+    )
+    del repo
+    return {
+        "mode": mode,
+        "journeys": count,
+        "bytes_per_record": used / count,
+        "text_per_record": text / count,
+        "overhead_per_record": (used - text) / count,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Память на запись поста")
+    parser.add_argument("--journeys", type=int, default=JOURNEYS)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--run-here", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_here:
+        print(json.dumps(measure(args.run_here, args.journeys, args.seed)))
+        return
+
+    print(f"постов: {args.journeys}")
+    print(f"{'режим':<12} {'байт/запись':>12} {'текст':>8} {'остальное':>10}")
+    for mode in args.modes:
+        # Каждый режим — в отдельном процессе: RSS не смешивается
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        if mode == "slots+zlib":
+            env["BLOG_COMPRESS_STORY_BYTES"] = str(COMPRESS_BYTES)
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.bench_memory",
+                "--journeys",
+                str(args.journeys),
+                "--seed",
+                str(args.seed),
+                "--run-here",
+                mode,
+            ],
+            cwd=ROOT,
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.splitlines()[-1])
+        print(
+            f"{mode:<12} {result['bytes_per_record']:>12.0f} "
+            f"{result['text_per_record']:>8.0f} {result['overhead_per_record']:>10.0f}"
+            f"  {MODES[mode]}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+from benchmarks.dataset import WORDS, generate, write
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRAVELERS = 1_000
+JOURNEYS = 10_000
+SECONDS = 10.0
+PORT = 8766
+BASE_URL = f"http://127.0.0.1:{PORT}"
+# Тяжёлые клиенты шлют запросы без пауз: поиск по всей базе и выгрузку
+SEARCH_CLIENTS = 16
+EXPORT_CLIENTS = 2
+# Дешёвые запросы приходят сами по себе (пуассоновский поток), а не по
+# ответу на предыдущий: иначе перегрузка замедляла бы и их поток
+CHEAP_RPS = 40
+# Пауза тяжёлого клиента после отказа, чтобы он не крутился вхолостую
+BACKOFF = 0.05
+MODES = {
+    "off": "без контроля допуска: все запросы сразу в цикл событий",
+    "on": "контроль допуска с настройками по умолчанию (admission.py)",
+}
+# Настройки "off": классов нет, у остальных запросов мест без счёта
+UNLIMITED = {
+    "routes": [],
+    "default": {"concurrency": 1_000_000, "queue": 1_000_000, "target_ms": 60_000},
+}
+
+
+def percentile(samples: List[float], share: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+def start_server(workdir: str, env: Dict[str, str]) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import uvicorn; uvicorn.run('main:app', host='127.0.0.1', "
+            f"port={PORT}, log_level='warning')",
+        ],
+        cwd=workdir,
+        env=env,
+    )
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{BASE_URL}/api/travelers/1", timeout=5)
+            return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Сервер не запустился")
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.send_signal(signal.SIGINT)
+    server.wait(timeout=60)
+
+
+async def load(journey_ids: List[int], seconds: float, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    cheap: List[float] = []
+    cheap_failed = 0
+    heavy = {"done": 0, "rejected": 0}
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+
+    async with httpx.AsyncClient(
+        base_url=BASE_URL, timeout=None, limits=limits
+    ) as client:
+
+        async def heavy_client(make_path: Callable[[], str]) -> None:
+            while time.perf_counter() < deadline:
+                response = await client.get(make_path())
+                if response.status_code == 200:
+                    heavy["done"] += 1
+                else:
+                    heavy["rejected"] += 1
+                    await asyncio.sleep(BACKOFF)
+
+        async def cheap_request(path: str) -> None:
+            nonlocal cheap_failed
+            started = time.perf_counter()
+            response = await client.get(path)
+            if response.status_code == 200:
+                cheap.append(time.perf_counter() - started)
+            else:
+                cheap_failed += 1
+
+        def search() -> str:
+            return f"/api/journeys/search?q={rng.choice(WORDS)}"
+
+        clients = [
+            asyncio.create_task(heavy_client(search)) for _ in range(SEARCH_CLIENTS)
+        ]
+        clients += [
+            asyncio.create_task(heavy_client(lambda: "/api/bulk/export"))
+            for _ in range(EXPORT_CLIENTS)
+        ]
+        requests = []
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(rng.expovariate(CHEAP_RPS))
+            journey_id = rng.choice(journey_ids)
+            path = rng.choice(
+                (f"/journeys/{journey_id}", f"/api/journeys/{journey_id}")
+            )
+            requests.append(asyncio.create_task(cheap_request(path)))
+        await asyncio.gather(*requests, *clients)
+
+    return {
+        "cheap_requests": len(cheap) + cheap_failed,
+        "cheap_failed": cheap_failed,
+        "cheap_p50_ms": percentile(cheap, 0.5) * 1000,
+        "cheap_p99_ms": percentile(cheap, 0.99) * 1000,
+        "cheap_max_ms": max(cheap, default=0.0) * 1000,
+        "heavy_rps": heavy["done"] / seconds,
+        "heavy_rejected": heavy["rejected"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Дешёвые запросы при перегрузке тяжёлыми: с контролем допуска и без"
+    )
+    parser.add_argument("--travelers", type=int, default=TRAVELERS)
+    parser.add_argument("--journeys", type=int, default=JOURNEYS)
+    parser.add_argument("--seconds", type=float, default=SECONDS)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(
+        f"постов: {args.journeys}, {args.seconds:.0f} с; тяжёлые клиенты: "
+        f"{SEARCH_CLIENTS} поиск + {EXPORT_CLIENTS} выгрузка, "
+        f"дешёвые: {CHEAP_RPS} запросов/с к /journeys/{{id}} и /api/journeys/{{id}}"
+    )
+    print(
+        f"{'режим':<6} {'дешёвых':>8} {'отказов':>8} {'p50 мс':>8} {'p99 мс':>8} "
+        f"{'max мс':>8} {'тяжёлых/с':>10} {'отказов':>8}"
+    )
+    data = generate(args.travelers, args.journeys, seed=args.seed)
+    journey_ids = [journey["id"] for journey in data["journeys"]]
+    with tempfile.TemporaryDirectory() as workdir:
+        # Шаблоны ищутся относительно рабочего каталога, данные пишутся в него
+        write(workdir, data)
+        os.symlink(os.path.join(ROOT, "templates"), os.path.join(workdir, "templates"))
+        unlimited = os.path.join(workdir, "unlimited.json")
+        with open(unlimited, "w") as f:
+            json.dump(UNLIMITED, f)
+        for mode in args.modes:
+            # Сервер — отдельный процесс, как в работе: нагрузка не делит
+            # с ним цикл событий
+            env = dict(os.environ, PYTHONPATH=ROOT)
+            env.pop("BLOG_ADMISSION_CONFIG", None)
+            if mode == "off":
+                env["BLOG_ADMISSION_CONFIG"] = unlimited
+            server = start_server(workdir, env)
+            try:
+                result = asyncio.run(load(journey_ids, args.seconds, args.seed))
+            finally:
+                stop_server(server)
+            print(
+                f"{mode:<6} {result['cheap_requests']:>8} {result['cheap_failed']:>8} "
+                f"{result['cheap_p50_ms']:>8.1f} {result['cheap_p99_ms']:>8.1f} "
+                f"{result['cheap_max_ms']:>8.1f} {result['heavy_rps']:>10.1f} "
+                f"{result['heavy_rejected']:>8}  {MODES[mode]}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRAVELERS = 5_000
+JOURNEYS = 50_000
+REQUESTS = 20
+# Главная — самая длинная страница ленты; /users выводит всех сразу
+PATHS = ["/?limit=100", "/users"]
+MODES = {
+    "render": "страница целиком в памяти, затем отправка (как до html_stream.py)",
+    "stream": "поток кусками по мере рендеринга",
+    "stream+gzip": "поток, сжатый на лету",
+    "cached": "готовые байты из кэша страниц",
+    "cached+gzip": "заранее сжатый вариант из кэша",
+}
+
+
+def reset_peak_rss() -> None:
+    # Linux: запись "5" сбрасывает VmHWM до текущего RSS
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+
+
+def memory_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+async def fetch(app: Any, path: str, gzip: bool) -> Tuple[float, float, int]:
+    # Прямой вызов ASGI: время до первого куска тела, до конца и размер
+    route, _, query = path.partition("?")
+    headers = [(b"accept-encoding", b"gzip")] if gzip else []
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": route,
+        "raw_path": route.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": headers,
+        "client": ("127.0.0.1", 40000),
+        "server": ("bench", 80),
+    }
+    first: List[float] = []
+    size = 0
+    requested = asyncio.Event()
+
+    async def receive() -> Dict[str, Any]:
+        # Тело запроса — один раз, дальше клиент на связи до конца ответа
+        if requested.is_set():
+            await asyncio.Event().wait()
+        requested.set()
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal size
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            if not first:
+                first.append(time.perf_counter())
+            size += len(message["body"])
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    return first[0] - started, time.perf_counter() - started, size
+
+
+async def measure(
+    mode: str, path: str, requests: int, chunk_size: int
+) -> Dict[str, Any]:
+    import html_stream
+    import main
+
+    gzip = mode.endswith("+gzip")
+    cached = mode.startswith("cached")
+    # Без деления на куски страница рендерится целиком до первого байта
+    html_stream.HTML_CHUNK_SIZE = 1 << 62 if mode == "render" else chunk_size
+    # Прогрев: карточки постов и пользователей — в кэше фрагментов
+    await fetch(main.app, path, gzip)
+    ttfb, total = [], []
+    size = 0
+    peak = 0
+    for _ in range(requests):
+        if not cached:
+            main.page_cache.clear()
+        reset_peak_rss()
+        before = memory_kb("VmRSS")
+        first, done, size = await fetch(main.app, path, gzip)
+        peak = max(peak, memory_kb("VmHWM") - before)
+        ttfb.append(first)
+        total.append(done)
+    return {
+        "ttfb_ms": statistics.median(ttfb) * 1000,
+        "total_ms": statistics.median(total) * 1000,
+        "bytes": size,
+        "peak_kb": peak,
+    }
+
+
+def compile_times(workdir: str) -> Tuple[float, float]:
+    # Компиляция всех шаблонов при старте: без байт-кода на диске и с ним
+    from fastapi.templating import Jinja2Templates
+
+    from html_stream import precompile_templates
+
+    directory = os.path.join(workdir, "template-cache")
+    times = []
+    for _ in range(2):
+        env = Jinja2Templates(directory="templates").env
+        started = time.perf_counter()
+        precompile_templates(env, directory)
+        times.append(time.perf_counter() - started)
+    shutil.rmtree(directory)
+    return times[0], times[1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Время до первого байта и пик памяти страниц"
+    )
+    parser.add_argument("--travelers", type=int, default=TRAVELERS)
+    parser.add_argument("--journeys", type=int, default=JOURNEYS)
+    parser.add_argument("--requests", type=int, default=REQUESTS)
+    parser.add_argument("--paths", nargs="+", default=PATHS)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from benchmarks.dataset import generate, write
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Шаблоны ищутся относительно рабочего каталога, данные пишутся в него
+        write(
+            workdir,
+            generate(
+                args.travelers, args.journeys, comments_per_journey=0, seed=args.seed
+            ),
+        )
+        os.symlink(os.path.join(ROOT, "templates"), os.path.join(workdir, "templates"))
+        os.chdir(workdir)
+
+        cold, warm = compile_times(workdir)
+        print(
+            f"компиляция шаблонов при старте: {cold * 1000:.1f} мс, "
+            f"с байт-кодом на диске: {warm * 1000:.1f} мс"
+        )
+
+        import html_stream
+
+        chunk_size = html_stream.HTML_CHUNK_SIZE
+        print(f"пользователей: {args.travelers}, постов: {args.journeys}")
+        print(
+            f"{'страница':<12} {'режим':<12} {'TTFB мс':>9} {'всего мс':>9} "
+            f"{'байт':>9} {'пик RSS КБ':>11}"
+        )
+        for path in args.paths:
+            for mode in args.modes:
+                result = asyncio.run(measure(mode, path, args.requests, chunk_size))
+                print(
+                    f"{path:<12} {mode:<12} {result['ttfb_ms']:>9.2f} "
+                    f"{result['total_ms']:>9.2f} {result['bytes']:>9} "
+                    f"{result['peak_kb']:>11}  {MODES[mode]}"
+                )
+
+
+if __name__ == "__main__":
+    main()
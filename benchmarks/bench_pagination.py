@@ -0,0 +1,40 @@
+import timeit
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from pagination import KeysetIndex, encode_cursor, sort_key
+
+SIZES = [10_000, 100_000, 1_000_000]
+PAGE_SIZE = 20
+REPEAT = 2_000
+
+
+def build(size: int) -> List[Dict[str, Any]]:
+    start = datetime(2025, 1, 1)
+    return [
+        {"id": i, "createdAt": start + timedelta(seconds=i)} for i in range(1, size + 1)
+    ]
+
+
+def main() -> None:
+    print(
+        f"{'records':>10} {'first page':>12} {'middle page':>12} {'last page':>12}"
+        "  (мкс на страницу)"
+    )
+    for size in SIZES:
+        records = build(size)
+        index = KeysetIndex(records)
+        cursors: List[Optional[str]] = [None]
+        for position in (size // 2, size - PAGE_SIZE - 1):
+            cursors.append(encode_cursor("next", sort_key(records[position])))
+        timings = [
+            timeit.timeit(lambda: index.page(PAGE_SIZE, cursor), number=REPEAT)
+            / REPEAT
+            * 1_000_000
+            for cursor in cursors
+        ]
+        print(f"{size:>10} " + " ".join(f"{t:>12.2f}" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
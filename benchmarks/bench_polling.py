@@ -0,0 +1,119 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRAVELERS = 1_000
+JOURNEYS = 10_000
+POLLS = 50
+# Правок между опросами: клиент опрашивает раз в несколько секунд
+WRITES_PER_POLL = 2
+PAGE = 100
+
+
+async def full_poll(client: Any, etags: Optional[Dict[str, str]]) -> Tuple[int, int]:
+    # Весь список постов по страницам; с etags — условными запросами
+    url: Optional[str] = f"/api/journeys/?limit={PAGE}"
+    transferred = requests = 0
+    while url:
+        headers = {}
+        if etags is not None and url in etags:
+            headers["If-None-Match"] = etags[url]
+        response = await client.get(url, headers=headers)
+        requests += 1
+        transferred += len(response.content)
+        if response.status_code == 304:
+            # Страница не изменилась — и все следующие тоже (ETag общий)
+            break
+        if etags is not None:
+            etags[url] = response.headers["ETag"]
+        url = response.links.get("next", {}).get("url")
+    return transferred, requests
+
+
+async def run(polls: int, seed: int) -> List[Tuple[str, float, float, float]]:
+    import httpx
+
+    import main
+
+    rng = random.Random(seed)
+    journey_ids = [journey["id"] for journey in main.repo.journeys]
+    results = []
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            since = main.change_log.version
+            etags: Dict[str, str] = {}
+            totals = {mode: [0, 0, 0.0] for mode in ("full", "etag", "changes")}
+            for _ in range(polls):
+                for _ in range(WRITES_PER_POLL):
+                    journey_id = rng.choice(journey_ids)
+                    await client.put(
+                        f"/api/journeys/{journey_id}",
+                        json={
+                            "destination": "Правка",
+                            "story": f"Новый текст {rng.random()}",
+                        },
+                    )
+                for mode in totals:
+                    started = time.perf_counter()
+                    if mode == "changes":
+                        response = await client.get(f"/api/changes?since={since}")
+                        since = response.json()["version"]
+                        transferred, requests = len(response.content), 1
+                    else:
+                        transferred, requests = await full_poll(
+                            client, etags if mode == "etag" else None
+                        )
+                    totals[mode][0] += transferred
+                    totals[mode][1] += requests
+                    totals[mode][2] += time.perf_counter() - started
+            # Без правок между опросами условный запрос — один 304
+            started = time.perf_counter()
+            idle_bytes, _ = await full_poll(client, etags)
+            idle = time.perf_counter() - started
+            for mode, (transferred, requests, seconds) in totals.items():
+                results.append(
+                    (mode, transferred / polls, requests / polls, seconds / polls)
+                )
+            results.append(("etag, без правок", idle_bytes, 1, idle))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Трафик опроса списка постов")
+    parser.add_argument("--travelers", type=int, default=TRAVELERS)
+    parser.add_argument("--journeys", type=int, default=JOURNEYS)
+    parser.add_argument("--polls", type=int, default=POLLS)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from benchmarks.dataset import generate, write
+
+    with tempfile.TemporaryDirectory() as workdir:
+        write(workdir, generate(args.travelers, args.journeys, seed=args.seed))
+        os.symlink(os.path.join(ROOT, "templates"), os.path.join(workdir, "templates"))
+        os.chdir(workdir)
+        results = asyncio.run(run(args.polls, args.seed))
+
+    print(
+        f"постов: {args.journeys}, правок между опросами: {WRITES_PER_POLL}, "
+        f"опросов: {args.polls}"
+    )
+    print(f"{'режим':<18} {'байт/опрос':>12} {'запросов':>9} {'мс/опрос':>9}")
+    for mode, transferred, requests, seconds in results:
+        print(
+            f"{mode:<18} {transferred:>12.0f} {requests:>9.1f} {seconds * 1000:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
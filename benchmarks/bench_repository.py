@@ -0,0 +1,83 @@
+import random
+import timeit
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from repository import BlogRepository
+
+SIZES = [1_000, 10_000, 100_000]
+LOOKUPS = 2_000
+
+
+def build_dataset(size: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    now = datetime.now()
+    traveler_count = max(size // 10, 1)
+    travelers = [
+        {
+            "id": i,
+            "email": f"user{i}@travel.com",
+            "username": f"user{i}",
+            "password": "secret123",
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        for i in range(1, traveler_count + 1)
+    ]
+    journeys = [
+        {
+            "id": i,
+            "travelerId": random.randint(1, traveler_count),
+            "destination": f"Место {i}",
+            "story": "История путешествия",
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        for i in range(1, size + 1)
+    ]
+    return travelers, journeys
+
+
+def per_lookup_us(stmt: Any, number: int) -> float:
+    return timeit.timeit(stmt, number=number) / number * 1_000_000
+
+
+def main() -> None:
+    random.seed(42)
+    print(
+        f"{'records':>10} {'scan id':>12} {'index id':>12} "
+        f"{'index email':>12} {'by author':>12}  (мкс на поиск)"
+    )
+    for size in SIZES:
+        travelers, journeys = build_dataset(size)
+        repo = BlogRepository(travelers, journeys, len(travelers) + 1, size + 1)
+        ids = [random.randint(1, size) for _ in range(LOOKUPS)]
+        emails = [random.choice(travelers)["email"] for _ in range(LOOKUPS)]
+        authors = [random.choice(travelers)["id"] for _ in range(LOOKUPS)]
+
+        def scan() -> None:
+            for journey_id in ids[:20]:
+                next((j for j in journeys if j["id"] == journey_id), None)
+
+        def by_id() -> None:
+            for journey_id in ids:
+                repo.get_journey(journey_id)
+
+        def by_email() -> None:
+            for email in emails:
+                repo.get_traveler_by_email(email)
+
+        def by_author() -> None:
+            for traveler_id in authors:
+                repo.get_journeys_by_traveler(traveler_id)
+
+        print(
+            f"{size:>10} "
+            f"{per_lookup_us(scan, 1) / 20:>12.2f} "
+            f"{per_lookup_us(by_id, 10) / LOOKUPS:>12.3f} "
+            f"{per_lookup_us(by_email, 10) / LOOKUPS:>12.3f} "
+            f"{per_lookup_us(by_author, 10) / LOOKUPS:>12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,714 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+# Размер данных: (пользователи, посты); комментариев в среднем 3 на пост
+SIZES = {
+    "small": (100, 1_000),
+    "medium": (1_000, 10_000),
+    "large": (10_000, 100_000),
+}
+CONCURRENCY = [1, 8, 32]
+REQUESTS = 200
+# Маршруты, где один запрос — это scrypt или вся база: меньше повторов
+SLOW_REQUESTS = 20
+# Записей в одном пакетном запросе
+BATCH_SIZE = 20
+SCHEMA_VERSION = 1
+
+# (URL, аргументы httpx.request)
+Request = Tuple[str, Dict[str, Any]]
+
+
+class Scenario(NamedTuple):
+    method: str
+    # Шаблон пути, как в декораторе маршрута в main.py
+    route: str
+    make: Callable[[Any], Request]
+    # Готовит n записей для изменяющих запросов (что удалять и т.п.)
+    prepare: Optional[Callable[[int], List[Any]]] = None
+    requests: int = REQUESTS
+
+
+def build_scenarios(main: Any, rng: random.Random) -> List[Scenario]:
+    # main — уже импортированный модуль приложения: данные для запросов
+    # берём из его репозитория, записи для удаления создаём через индексы
+    repo = main.repo
+    traveler_ids = [traveler["id"] for traveler in repo.travelers]
+    journey_ids = [journey["id"] for journey in repo.journeys]
+    comment_ids = [comment["id"] for comment in repo.records("comments")]
+    located = [j for j in repo.journeys if j.get("locationLat") is not None]
+    slugs = [category["slug"] for category in main.category_index.all()]
+    category_ids = [category["id"] for category in main.category_index.all()]
+    words = ["байкал", "горы", "озеро", "рынок", "закат", "поход"]
+    unique = itertools.count(1)
+    password = "путешествие2024"
+
+    def traveler() -> int:
+        return rng.choice(traveler_ids)
+
+    def journey() -> int:
+        return rng.choice(journey_ids)
+
+    def two_travelers() -> Tuple[int, int]:
+        # Подписаться на себя нельзя
+        subscriber, target = rng.sample(traveler_ids, 2)
+        return subscriber, target
+
+    def point() -> Tuple[float, float]:
+        spot = rng.choice(located)
+        return spot["locationLat"], spot["locationLng"]
+
+    def story() -> str:
+        return "Новый рассказ о поездке, написанный во время замера"
+
+    def new_journeys(n: int) -> List[Any]:
+        return [
+            repo.create_journey(traveler(), "Удаляемый пост", story())["id"]
+            for _ in range(n)
+        ]
+
+    def new_travelers(n: int) -> List[Any]:
+        stored = repo.get_traveler(traveler_ids[0])["password"]
+        return [
+            repo.create_traveler(
+                f"gone{next(unique)}@example.com", "Удаляемый", stored
+            )["id"]
+            for _ in range(n)
+        ]
+
+    def new_subscriptions(n: int) -> List[Any]:
+        # Повторная подписка вернула бы существующую — берём только новые пары
+        pairs: Dict[Tuple[int, int], None] = {}
+        while len(pairs) < n:
+            subscriber, target = two_travelers()
+            if target not in main.feeds.following(subscriber):
+                main.feeds.subscribe(subscriber, target)
+                pairs[subscriber, target] = None
+        return list(pairs)
+
+    def new_favorites(n: int) -> List[Any]:
+        pairs: Dict[Tuple[int, int], None] = {}
+        while len(pairs) < n:
+            user_id, journey_id = traveler(), journey()
+            if not main.favorite_index.is_favorite(user_id, journey_id):
+                main.favorite_index.add(user_id, repo.get_journey(journey_id))
+                pairs[user_id, journey_id] = None
+        return list(pairs)
+
+    def new_categories(n: int) -> List[Any]:
+        return [
+            main.category_index.create(f"Удаляемая {number}", f"gone-{number}")["id"]
+            for number in itertools.islice(unique, n)
+        ]
+
+    def new_comments(n: int) -> List[Any]:
+        return [
+            main.comment_tree.create(journey(), traveler(), "Удаляемый комментарий")[
+                "id"
+            ]
+            for _ in range(n)
+        ]
+
+    def journeys_batch(journey_id: int) -> Request:
+        # Пакет: создания, правки и удаление заранее созданного поста
+        operations: List[Dict[str, Any]] = [
+            {
+                "op": "create",
+                "data": {
+                    "travelerId": traveler(),
+                    "destination": "Пост пакетом",
+                    "story": story(),
+                },
+            }
+            for _ in range(BATCH_SIZE // 2)
+        ]
+        operations += [
+            {"op": "update", "id": journey(), "data": {"story": story()}}
+            for _ in range(BATCH_SIZE // 2 - 1)
+        ]
+        operations.append({"op": "delete", "id": journey_id})
+        return "/api/journeys/batch", {"json": {"operations": operations}}
+
+    def travelers_batch(traveler_id: int) -> Request:
+        operations: List[Dict[str, Any]] = [
+            {
+                "op": "create",
+                "data": {
+                    "email": f"batch{next(unique)}@example.com",
+                    "username": "Пакетный путешественник",
+                    "password": password,
+                },
+            },
+            {"op": "update", "id": traveler(), "data": {"username": "Переименованный"}},
+            {"op": "delete", "id": traveler_id},
+        ]
+        return "/api/travelers/batch", {"json": {"operations": operations}}
+
+    def home(i: int) -> Request:
+        # Через раз — лента категории
+        return "/", {"params": {"category": rng.choice(slugs)}} if i % 2 else {}
+
+    def bbox(_: Any) -> Request:
+        # Окно карты 2°×3° вокруг места, где есть посты
+        lat, lng = point()
+        return "/api/journeys/bbox", {
+            "params": {
+                "south": max(lat - 1, -90),
+                "west": max(lng - 1.5, -180),
+                "north": min(lat + 1, 90),
+                "east": min(lng + 1.5, 180),
+            }
+        }
+
+    def subscribe(_: Any) -> Request:
+        subscriber, target = two_travelers()
+        return f"/api/travelers/{subscriber}/subscriptions", {
+            "json": {"targetUserId": target}
+        }
+
+    def new_category(_: Any) -> Request:
+        number = next(unique)
+        return "/api/categories/", {
+            "json": {"name": f"Категория {number}", "slug": f"new-{number}"}
+        }
+
+    def import_body(_: Any) -> Request:
+        lines = [
+            json.dumps(
+                {
+                    "type": "journey",
+                    "travelerId": traveler(),
+                    "destination": f"Импорт {next(unique)}",
+                    "story": story(),
+                },
+                ensure_ascii=False,
+            )
+            for _ in range(100)
+        ]
+        return "/api/bulk/import", {"content": "\n".join(lines).encode()}
+
+    form = {"destination": "Пост из формы", "story": story()}
+    return [
+        # Страницы
+        Scenario("GET", "/", home),
+        Scenario("GET", "/api-info", lambda i: ("/api-info", {})),
+        Scenario("GET", "/users", lambda i: ("/users", {})),
+        Scenario(
+            "GET", "/journeys/{journey_id}", lambda i: (f"/journeys/{journey()}", {})
+        ),
+        Scenario(
+            "GET",
+            "/comments/{comment_id}",
+            lambda i: (f"/comments/{rng.choice(comment_ids)}", {}),
+        ),
+        Scenario("GET", "/create-journey", lambda i: ("/create-journey", {})),
+        Scenario(
+            "GET",
+            "/edit-journey/{journey_id}",
+            lambda i: (f"/edit-journey/{journey()}", {}),
+        ),
+        # Чтение через API
+        Scenario("GET", "/api/travelers/", lambda i: ("/api/travelers/", {})),
+        Scenario(
+            "POST",
+            "/api/travelers/batch-get",
+            lambda i: (
+                "/api/travelers/batch-get",
+                {"json": {"ids": rng.sample(traveler_ids, BATCH_SIZE)}},
+            ),
+        ),
+        Scenario(
+            "GET",
+            "/api/travelers/{traveler_id}",
+            lambda i: (f"/api/travelers/{traveler()}", {}),
+        ),
+        Scenario(
+            "GET",
+            "/api/travelers/{traveler_id}/feed",
+            lambda i: (f"/api/travelers/{traveler()}/feed", {}),
+        ),
+        Scenario(
+            "GET",
+            "/api/travelers/{traveler_id}/favorites",
+            lambda i: (f"/api/travelers/{traveler()}/favorites", {}),
+        ),
+        Scenario("GET", "/api/journeys/", lambda i: ("/api/journeys/", {})),
+        Scenario(
+            "POST",
+            "/api/journeys/batch-get",
+            lambda i: (
+                "/api/journeys/batch-get",
+                {"json": {"ids": rng.sample(journey_ids, BATCH_SIZE)}},
+            ),
+        ),
+        Scenario(
+            "GET",
+            "/api/journeys/search",
+            lambda i: ("/api/journeys/search", {"params": {"q": rng.choice(words)}}),
+        ),
+        Scenario(
+            "GET",
+            "/api/journeys/top",
+            lambda i: (
+                "/api/journeys/top",
+                {"params": {"by": ("views", "likes")[i % 2]}},
+            ),
+        ),
+        Scenario(
+            "GET",
+            "/api/journeys/nearby",
+            lambda i: (
+                "/api/journeys/nearby",
+                {"params": dict(zip(("lat", "lng"), point()), radius_km=50)},
+            ),
+        ),
+        Scenario("GET", "/api/journeys/bbox", bbox),
+        Scenario(
+            "GET",
+            "/api/journeys/meta",
+            lambda i: (
+                "/api/journeys/meta",
+                {"params": {"ids": ",".join(str(journey()) for _ in range(20))}},
+            ),
+        ),
+        Scenario("GET", "/api/categories/", lambda i: ("/api/categories/", {})),
+        Scenario(
+            "GET",
+            "/api/journeys/{journey_id}",
+            lambda i: (f"/api/journeys/{journey()}", {}),
+        ),
+        Scenario(
+            "GET",
+            "/api/journeys/{journey_id}/stats",
+            lambda i: (f"/api/journeys/{journey()}/stats", {}),
+        ),
+        Scenario(
+            "GET",
+            "/api/journeys/{journey_id}/comments",
+            lambda i: (f"/api/journeys/{journey()}/comments", {}),
+        ),
+        Scenario(
+            "GET",
+            "/api/comments/{comment_id}",
+            lambda i: (f"/api/comments/{rng.choice(comment_ids)}", {}),
+        ),
+        Scenario(
+            "GET", "/api/render-cache/stats", lambda i: ("/api/render-cache/stats", {})
+        ),
+        Scenario("GET", "/metrics", lambda i: ("/metrics", {})),
+        Scenario(
+            "GET",
+            "/api/changes",
+            lambda i: (f"/api/changes?since={main.change_log.version}", {}),
+        ),
+        Scenario(
+            "GET",
+            "/api/bulk/export",
+            lambda i: ("/api/bulk/export", {}),
+            requests=SLOW_REQUESTS,
+        ),
+        # Формы
+        Scenario(
+            "POST",
+            "/create-journey",
+            lambda i: ("/create-journey", {"data": {**form, "travelerId": traveler()}}),
+        ),
+        Scenario(
+            "POST",
+            "/edit-journey/{journey_id}",
+            lambda i: (
+                f"/edit-journey/{journey()}",
+                {"data": {**form, "travelerId": traveler()}},
+            ),
+        ),
+        Scenario(
+            "POST",
+            "/journeys/{journey_id}/comments",
+            lambda i: (
+                f"/journeys/{journey()}/comments",
+                {"data": {"authorId": traveler(), "content": "Комментарий из формы"}},
+            ),
+        ),
+        # Изменения через API
+        Scenario(
+            "POST",
+            "/api/travelers/",
+            lambda i: (
+                "/api/travelers/",
+                {
+                    "json": {
+                        "email": f"new{next(unique)}@example.com",
+                        "username": "Новый путешественник",
+                        "password": password,
+                    }
+                },
+            ),
+            requests=SLOW_REQUESTS,
+        ),
+        Scenario(
+            "POST",
+            "/api/login",
+            lambda i: (
+                "/api/login",
+                {
+                    "json": {
+                        "email": f"traveler{traveler()}@example.com",
+                        "password": password,
+                    }
+                },
+            ),
+            requests=SLOW_REQUESTS,
+        ),
+        Scenario(
+            "PUT",
+            "/api/travelers/{traveler_id}",
+            lambda i: (
+                f"/api/travelers/{traveler()}",
+                {"json": {"username": f"Переименованный {i}"}},
+            ),
+        ),
+        Scenario(
+            "POST",
+            "/api/travelers/{traveler_id}/subscriptions",
+            subscribe,
+        ),
+        Scenario(
+            "POST",
+            "/api/travelers/{traveler_id}/favorites",
+            lambda i: (
+                f"/api/travelers/{traveler()}/favorites",
+                {"json": {"journeyId": journey()}},
+            ),
+        ),
+        Scenario(
+            "POST",
+            "/api/journeys/",
+            lambda i: (
+                "/api/journeys/",
+                {
+                    "json": {
+                        "travelerId": traveler(),
+                        "destination": "Пост через API",
+                        "story": story(),
+                    }
+                },
+            ),
+        ),
+        Scenario(
+            "PUT",
+            "/api/journeys/{journey_id}/categories",
+            lambda i: (
+                f"/api/journeys/{journey()}/categories",
+                {"json": {"categoryIds": rng.sample(category_ids, 2)}},
+            ),
+        ),
+        Scenario(
+            "POST",
+            "/api/categories/",
+            new_category,
+        ),
+        Scenario(
+            "POST",
+            "/api/journeys/{journey_id}/like",
+            lambda i: (f"/api/journeys/{journey()}/like", {}),
+        ),
+        Scenario(
+            "PUT",
+            "/api/journeys/{journey_id}",
+            lambda i: (f"/api/journeys/{journey()}", {"json": {"story": story()}}),
+        ),
+        Scenario(
+            "POST",
+            "/api/journeys/{journey_id}/comments",
+            lambda i: (
+                f"/api/journeys/{journey()}/comments",
+                {"json": {"authorId": traveler(), "content": "Комментарий через API"}},
+            ),
+        ),
+        Scenario("POST", "/api/bulk/import", import_body, requests=SLOW_REQUESTS),
+        Scenario("POST", "/api/journeys/batch", journeys_batch, prepare=new_journeys),
+        Scenario(
+            "POST",
+            "/api/travelers/batch",
+            travelers_batch,
+            prepare=new_travelers,
+            requests=SLOW_REQUESTS,
+        ),
+        # Удаления: каждый запрос удаляет свою, заранее созданную запись
+        Scenario(
+            "POST",
+            "/delete-journey/{journey_id}",
+            lambda journey_id: (f"/delete-journey/{journey_id}", {}),
+            prepare=new_journeys,
+        ),
+        Scenario(
+            "POST",
+            "/delete-comment/{comment_id}",
+            lambda comment_id: (f"/delete-comment/{comment_id}", {}),
+            prepare=new_comments,
+        ),
+        Scenario(
+            "DELETE",
+            "/api/travelers/{traveler_id}/subscriptions",
+            lambda pair: (
+                f"/api/travelers/{pair[0]}/subscriptions",
+                {"params": {"targetUserId": pair[1]}},
+            ),
+            prepare=new_subscriptions,
+        ),
+        Scenario(
+            "DELETE",
+            "/api/travelers/{traveler_id}/favorites/{journey_id}",
+            lambda pair: (f"/api/travelers/{pair[0]}/favorites/{pair[1]}", {}),
+            prepare=new_favorites,
+        ),
+        Scenario(
+            "DELETE",
+            "/api/categories/{category_id}",
+            lambda category_id: (f"/api/categories/{category_id}", {}),
+            prepare=new_categories,
+        ),
+        Scenario(
+            "DELETE",
+            "/api/comments/{comment_id}",
+            lambda comment_id: (f"/api/comments/{comment_id}", {}),
+            prepare=new_comments,
+        ),
+        Scenario(
+            "DELETE",
+            "/api/journeys/{journey_id}",
+            lambda journey_id: (f"/api/journeys/{journey_id}", {}),
+            prepare=new_journeys,
+        ),
+        Scenario(
+            "DELETE",
+            "/api/travelers/{traveler_id}",
+            lambda traveler_id: (f"/api/travelers/{traveler_id}", {}),
+            prepare=new_travelers,
+        ),
+    ]
+
+
+def percentile(samples: List[float], share: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+async def measure(
+    client: Any, main: Any, scenario: Scenario, concurrency: int, requests: int
+) -> Dict[str, Any]:
+    items: List[Any] = list(range(requests))
+    if scenario.prepare is not None:
+        items = scenario.prepare(requests)
+        # Подготовленные записи уходят в хранилище вне замера
+        await main.persist()
+    pending = iter(items)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def worker() -> None:
+        for item in pending:
+            url, arguments = scenario.make(item)
+            started = time.perf_counter()
+            response = await client.request(scenario.method, url, **arguments)
+            latencies.append(time.perf_counter() - started)
+            status = str(response.status_code)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    milliseconds = [latency * 1000 for latency in latencies]
+    return {
+        "route": f"{scenario.method} {scenario.route}",
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": sum(
+            count for status, count in statuses.items() if int(status) >= 400
+        ),
+        "status": dict(sorted(statuses.items())),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.mean(milliseconds), 3),
+        "p50_ms": round(percentile(milliseconds, 0.50), 3),
+        "p95_ms": round(percentile(milliseconds, 0.95), 3),
+        "p99_ms": round(percentile(milliseconds, 0.99), 3),
+        "max_ms": round(max(milliseconds), 3),
+    }
+
+
+def uncovered(app: Any, scenarios: List[Scenario]) -> List[str]:
+    # Маршруты main.py без сценария: новый маршрут сразу виден в отчёте
+    from fastapi.routing import APIRoute
+
+    covered = {(scenario.method, scenario.route) for scenario in scenarios}
+    return sorted(
+        f"{method} {route.path}"
+        for route in app.routes
+        if isinstance(route, APIRoute)
+        for method in route.methods
+        if (method, route.path) not in covered
+    )
+
+
+async def run_size(args: argparse.Namespace) -> Dict[str, Any]:
+    # Выполняется в отдельном процессе, рабочий каталог — каталог с данными
+    import httpx
+
+    started = time.perf_counter()
+    import main
+
+    startup = time.perf_counter() - started
+    rng = random.Random(args.seed)
+    pattern = args.routes
+    results = []
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            scenarios = build_scenarios(main, rng)
+            selected = [
+                scenario
+                for scenario in scenarios
+                if pattern is None or pattern in f"{scenario.method} {scenario.route}"
+            ]
+            for scenario in selected:
+                if scenario.prepare is None:
+                    # Прогрев: шаблоны, кэши, ленивые индексы
+                    url, arguments = scenario.make(0)
+                    await client.request(scenario.method, url, **arguments)
+                for concurrency in args.concurrency:
+                    requests = min(args.requests, scenario.requests)
+                    result = await measure(
+                        client, main, scenario, concurrency, requests
+                    )
+                    results.append(result)
+                    print(
+                        f"  {result['route']:<55} c={concurrency:<3} "
+                        f"{result['throughput_rps']:>9.1f} rps  "
+                        f"p50 {result['p50_ms']:>8.2f}  p99 {result['p99_ms']:>8.2f} мс"
+                        + (f"  ошибок: {result['errors']}" if result["errors"] else ""),
+                        flush=True,
+                    )
+            missing = uncovered(main.app, scenarios)
+    return {"startup_s": round(startup, 3), "results": results, "uncovered": missing}
+
+
+def git_revision() -> str:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return revision + ("-dirty" if dirty else "")
+
+
+def bench_size(name: str, args: argparse.Namespace) -> Dict[str, Any]:
+    from benchmarks.dataset import generate, write
+
+    travelers, journeys = SIZES[name]
+    with tempfile.TemporaryDirectory() as workdir:
+        started = time.perf_counter()
+        write(workdir, generate(travelers, journeys, seed=args.seed))
+        print(
+            f"{name}: {travelers} пользователей, {journeys} постов "
+            f"(данные за {time.perf_counter() - started:.1f} с)",
+            flush=True,
+        )
+        # Шаблоны приложение ищет относительно рабочего каталога
+        os.symlink(os.path.join(ROOT, "templates"), os.path.join(workdir, "templates"))
+        output = os.path.join(workdir, "result.json")
+        command = [
+            sys.executable,
+            "-m",
+            "benchmarks.bench_routes",
+            "--run-here",
+            "--output",
+            output,
+            "--requests",
+            str(args.requests),
+            "--seed",
+            str(args.seed),
+            "--concurrency",
+            *map(str, args.concurrency),
+        ]
+        if args.routes:
+            command += ["--routes", args.routes]
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        subprocess.run(command, cwd=workdir, env=env, check=True)
+        with open(output, encoding="utf-8") as f:
+            measured = json.load(f)
+    return {
+        "size": name,
+        "travelers": travelers,
+        "journeys": journeys,
+        **measured,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замер всех маршрутов main.py")
+    parser.add_argument("--sizes", nargs="+", choices=SIZES, default=list(SIZES))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=CONCURRENCY)
+    parser.add_argument("--requests", type=int, default=REQUESTS)
+    parser.add_argument("--routes", help="только маршруты, содержащие строку")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON с результатами")
+    parser.add_argument("--run-here", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_here:
+        measured = asyncio.run(run_size(args))
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(measured, f)
+        return
+
+    revision = git_revision()
+    report = {
+        "schema": SCHEMA_VERSION,
+        "revision": revision,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "requests": args.requests,
+        "runs": [bench_size(name, args) for name in args.sizes],
+    }
+    for run in report["runs"]:
+        if run["uncovered"]:
+            print(f"Маршруты без сценария: {', '.join(run['uncovered'])}")
+    output = args.output or os.path.join(RESULTS_DIR, f"routes-{revision}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from search import SearchIndex
+
+JOURNEYS = 100_000
+QUERIES = 500
+
+PLACES = [
+    "Алтай",
+    "Байкал",
+    "Камчатка",
+    "Карелия",
+    "Кавказ",
+    "Крым",
+    "Сочи",
+    "Казань",
+    "Москва",
+    "Петербург",
+    "Мурманск",
+    "Владивосток",
+    "Урал",
+]
+COMMON_WORDS = (
+    "горы озеро река лес дорога поезд самолёт палатка костёр рассвет закат "
+    "море берег тропа перевал вершина деревня город музей храм рынок кухня "
+    "погода снег дождь солнце ветер друзья семья маршрут поход неделя утро "
+    "вечер ночь чистый прозрачный холодный тёплый высокий далёкий красивый"
+).split()
+SYLLABLES = "ка ла ма на ра со то ве ги ду бе ли мо ру пе зо ша чи ю ё".split()
+ENDINGS = ["", "а", "ы", "ой", "ами", "ого", "ий", "ую", "ах"]
+
+
+def make_vocabulary(size: int) -> List[str]:
+    words = set(COMMON_WORDS)
+    while len(words) < size:
+        stem = "".join(random.choices(SYLLABLES, k=random.randint(2, 4)))
+        words.add(stem + random.choice(ENDINGS))
+    return sorted(words)
+
+
+WORDS: List[str] = []
+# Частоты слов по закону Ципфа, как в живом тексте
+WEIGHTS: List[float] = []
+
+
+def make_journeys(count: int) -> List[Dict[str, Any]]:
+    now = datetime.now()
+    return [
+        {
+            "id": i,
+            "destination": f"{random.choice(PLACES)} {random.choice(COMMON_WORDS)}",
+            "story": " ".join(
+                random.choices(WORDS, WEIGHTS, k=random.randint(30, 120))
+            ),
+            "updatedAt": now,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def main() -> None:
+    random.seed(1)
+    WORDS.extend(make_vocabulary(30_000))
+    random.shuffle(WORDS)
+    WEIGHTS.extend(1 / rank for rank in range(1, len(WORDS) + 1))
+    journeys = make_journeys(JOURNEYS)
+
+    started = time.perf_counter()
+    index = SearchIndex()
+    for journey in journeys:
+        index.add(journey)
+    build_time = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.search")
+        index.save(path)
+        started = time.perf_counter()
+        loaded = SearchIndex.load(path)
+        assert loaded is not None
+        changed = loaded.sync_with(journeys)
+        load_time = time.perf_counter() - started
+
+    queries = [
+        " ".join(random.choices(WORDS, k=random.randint(1, 3))) for _ in range(QUERIES)
+    ]
+    queries += [random.choice(PLACES) for _ in range(QUERIES // 5)]
+    queries += [random.choice(WORDS)[:4] for _ in range(QUERIES // 5)]
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, 20)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+
+    print(f"Постов: {JOURNEYS}")
+    print(f"Построение индекса: {build_time:.2f} с")
+    print(
+        f"Загрузка сохранённого индекса + сверка: {load_time:.2f} с "
+        f"(переиндексировано {changed})"
+    )
+    print(
+        f"Запрос, мс: p50={statistics.median(latencies):.2f} "
+        f"p95={latencies[int(len(latencies) * 0.95)]:.2f} "
+        f"p99={latencies[int(len(latencies) * 0.99)]:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import gc
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+import storage
+from repository import BlogRepository
+from storage import JournalStore
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+def make_journeys(size: int) -> List[Dict[str, Any]]:
+    # Короткие рассказы, чтобы миллион записей поместился в память
+    started = datetime(2024, 1, 1)
+    journeys = []
+    for journey_id in range(1, size + 1):
+        created_at = started + timedelta(seconds=journey_id)
+        journeys.append(
+            {
+                "id": journey_id,
+                "travelerId": journey_id % 100 + 1,
+                "destination": f"Место {journey_id}",
+                "story": f"Короткий рассказ номер {journey_id}",
+                "createdAt": created_at,
+                "updatedAt": created_at,
+            }
+        )
+    return journeys
+
+
+def seed(path: str, size: int) -> None:
+    travelers = [
+        {
+            "id": i,
+            "email": f"user{i}@example.com",
+            "username": f"user{i}",
+            "password": "123456",
+            "createdAt": datetime(2024, 1, 1),
+            "updatedAt": datetime(2024, 1, 1),
+        }
+        for i in range(1, 101)
+    ]
+    data = {
+        "travelers": travelers,
+        "journeys": make_journeys(size),
+        "next_traveler_id": 101,
+        "next_journey_id": size + 1,
+    }
+    storage._write_snapshot(path, data, binary=True)
+
+
+def cold_start(path: str, binary: bool) -> float:
+    storage.BINARY_SNAPSHOT = binary
+    gc.collect()
+    started = time.perf_counter()
+    store = JournalStore(path, path + ".journal")
+    repo = BlogRepository(*store.load()[:4])
+    elapsed = time.perf_counter() - started
+    store.close()
+    del repo
+    return elapsed
+
+
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(
+        f"{'records':>10} {'json, с':>10} {'binary, с':>10} "
+        f"{'json, МБ':>10} {'bin, МБ':>10}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f"startup-{size}.json")
+            seed(path, size)
+            json_time = cold_start(path, binary=False)
+            binary_time = cold_start(path, binary=True)
+            json_size = os.path.getsize(path) / 2**20
+            binary_size = os.path.getsize(storage._binary_file(path)) / 2**20
+            print(
+                f"{size:>10} {json_time:>10.2f} {binary_time:>10.2f}"
+                f" {json_size:>10.1f} {binary_size:>10.1f}"
+            )
+            os.remove(path)
+            os.remove(storage._binary_file(path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from storage import JournalStore, SnapshotStore, Store
+
+SIZES = [1_000, 10_000, 50_000]
+WRITES = 200
+
+
+def make_journey(journey_id: int) -> Dict[str, Any]:
+    now = datetime.now()
+    return {
+        "id": journey_id,
+        "travelerId": 1,
+        "destination": f"Место {journey_id}",
+        "story": "Рассказ о путешествии по горам и озёрам " * 5,
+        "createdAt": now,
+        "updatedAt": now,
+    }
+
+
+def seed(path: str, size: int) -> None:
+    journeys = [make_journey(i) for i in range(1, size + 1)]
+    traveler = {"id": 1, "email": "a@b.ru", "username": "ab", "password": "123456"}
+    data = {
+        "travelers": [traveler],
+        "journeys": journeys,
+        "next_traveler_id": 2,
+        "next_journey_id": size + 1,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, default=str, ensure_ascii=False, indent=2)
+
+
+def writes_per_second(store: Store, size: int) -> float:
+    store.load()
+    changes: List[Dict[str, Any]] = [
+        {"op": "put", "c": "journeys", "rec": make_journey(size + i)}
+        for i in range(1, WRITES + 1)
+    ]
+    started = time.perf_counter()
+    for change in changes:
+        store.apply([change])
+    elapsed = time.perf_counter() - started
+    store.close()
+    return WRITES / elapsed
+
+
+def main() -> None:
+    print(
+        f"{'records':>10} {'snapshot':>12} {'journal':>12} {'journal+fsync':>14}"
+        "  (записей/с)"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        for size in SIZES:
+            results = []
+            for kind in ("snapshot", "journal", "journal+fsync"):
+                path = os.path.join(tmp, f"{kind}.json")
+                journal = os.path.join(tmp, f"{kind}.journal")
+                seed(path, size)
+                store: Store
+                if kind == "snapshot":
+                    store = SnapshotStore(path)
+                else:
+                    store = JournalStore(
+                        path,
+                        journal,
+                        compact_every=10**9,
+                        fsync=kind.endswith("fsync"),
+                    )
+                results.append(writes_per_second(store, size))
+            print(
+                f"{size:>10} {results[0]:>12.0f} {results[1]:>12.0f} {results[2]:>14.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
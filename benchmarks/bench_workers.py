@@ -0,0 +1,242 @@
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+from storage import JournalStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORT = 8765
+WORKERS = [1, 2, 4]
+CLIENTS = 8
+READ_SECONDS = 5
+# Запись: каждый клиент создаёт посты, лайкает и смотрит один и тот же пост
+WRITES_PER_CLIENT = 50
+LIKES_PER_CLIENT = 100
+VIEWS_PER_CLIENT = 50
+# Чтения на процесс больше, чем у вдвое меньшего числа процессов, хотя бы
+# во столько раз. Проверяется, пока процессов не больше, чем ядер
+MIN_SCALING = 1.2
+READ_PATHS = ["/api/journeys/?limit=20", "/api/journeys/1", "/api/travelers/1"]
+
+
+def request(
+    connection: http.client.HTTPConnection,
+    method: str,
+    path: str,
+    body: Any = None,
+) -> Tuple[int, Any]:
+    payload = json.dumps(body).encode() if body is not None else None
+    headers = {"Content-Type": "application/json"} if payload else {}
+    connection.request(method, path, body=payload, headers=headers)
+    response = connection.getresponse()
+    data = response.read()
+    return response.status, json.loads(data) if data else None
+
+
+def start_server(workdir: str, workers: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        BLOG_WORKERS=str(workers),
+        BLOG_COUNTER_FLUSH_SECONDS="1",
+        PYTHONPATH=ROOT,
+    )
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            f"from cluster import serve; serve('main:app', '127.0.0.1', {PORT})",
+        ],
+        cwd=workdir,
+        env=env,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", PORT, timeout=5)
+            request(connection, "GET", "/api/travelers/1")
+            connection.close()
+            # Даём подняться остальным процессам
+            time.sleep(2)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Сервер не запустился")
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.send_signal(signal.SIGINT)
+    server.wait(timeout=60)
+
+
+def prepare(workdir: str) -> None:
+    # Шаблоны ищутся относительно рабочего каталога, данные пишутся в него
+    os.symlink(os.path.join(ROOT, "templates"), os.path.join(workdir, "templates"))
+
+
+def reader(seconds: float) -> int:
+    connection = http.client.HTTPConnection("127.0.0.1", PORT, timeout=10)
+    done = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        status, _ = request(connection, "GET", READ_PATHS[done % len(READ_PATHS)])
+        assert status == 200, status
+        done += 1
+    return done
+
+
+def writer(client: int) -> List[int]:
+    # Новое соединение на каждую запись — запросы расходятся по процессам
+    created = []
+    for number in range(WRITES_PER_CLIENT):
+        connection = http.client.HTTPConnection("127.0.0.1", PORT, timeout=30)
+        status, journey = request(
+            connection,
+            "POST",
+            "/api/journeys/",
+            {
+                "travelerId": 1,
+                "destination": f"Клиент {client}, пост {number}",
+                "story": "Рассказ для проверки записи из нескольких процессов",
+            },
+        )
+        assert status == 200, (status, journey)
+        created.append(journey["id"])
+        connection.close()
+    for _ in range(LIKES_PER_CLIENT):
+        connection = http.client.HTTPConnection("127.0.0.1", PORT, timeout=30)
+        status, _ = request(connection, "POST", "/api/journeys/1/like")
+        assert status == 200, status
+        connection.close()
+    for _ in range(VIEWS_PER_CLIENT):
+        connection = http.client.HTTPConnection("127.0.0.1", PORT, timeout=30)
+        connection.request("GET", "/journeys/1")
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 200, response.status
+        connection.close()
+    return created
+
+
+def check_visible(ids: List[int]) -> int:
+    # Каждый пост должен читаться через любой процесс
+    missing = 0
+    for journey_id in ids:
+        connection = http.client.HTTPConnection("127.0.0.1", PORT, timeout=10)
+        status, _ = request(connection, "GET", f"/api/journeys/{journey_id}")
+        missing += status != 200
+        connection.close()
+    return missing
+
+
+def run(workers: int, pool: Any) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare(workdir)
+        server = start_server(workdir, workers)
+        try:
+            reads = sum(pool.map(reader, [READ_SECONDS] * CLIENTS))
+            connection = http.client.HTTPConnection("127.0.0.1", PORT, timeout=10)
+            _, before = request(connection, "GET", "/api/journeys/1/stats")
+            connection.close()
+            started = time.perf_counter()
+            results = pool.map(writer, range(CLIENTS))
+            write_seconds = time.perf_counter() - started
+            ids = [journey_id for created in results for journey_id in created]
+            missing = check_visible(ids)
+        finally:
+            stop_server(server)
+
+        # Перезапуск: всё записанное должно прочитаться из общего журнала
+        store = JournalStore(
+            os.path.join(workdir, "blog_data.json"),
+            os.path.join(workdir, "blog_data.journal"),
+        )
+        _, journeys, *_ = store.load()
+        store.close()
+    stored = {journey["id"]: journey for journey in journeys}
+    unique = sorted(set(ids))
+    return {
+        "workers": workers,
+        "reads": reads / READ_SECONDS,
+        "writes": CLIENTS * (WRITES_PER_CLIENT + LIKES_PER_CLIENT) / write_seconds,
+        "duplicates": len(ids) - len(unique),
+        # id выдаются подряд из общего счётчика: пропуск — потерянный пост
+        "gaps": unique[-1] - unique[0] + 1 - len(unique) if unique else 0,
+        "missing": missing,
+        "lost": sum(journey_id not in stored for journey_id in ids),
+        "likes_lost": before["likes"]
+        + CLIENTS * LIKES_PER_CLIENT
+        - stored[1].get("likeCount", 0),
+        "views_lost": before["views"]
+        + CLIENTS * VIEWS_PER_CLIENT
+        - stored[1].get("viewCount", 0),
+    }
+
+
+def failures(results: List[Dict[str, Any]]) -> List[str]:
+    problems = []
+    for result in results:
+        for field, label in (
+            ("duplicates", "повторных id"),
+            ("gaps", "пропущенных id"),
+            ("missing", "постов не видно"),
+            ("lost", "постов потеряно"),
+            ("likes_lost", "лайков потеряно"),
+            ("views_lost", "просмотров потеряно"),
+        ):
+            if result[field]:
+                problems.append(
+                    f"{result['workers']} процессов: {label}: {result[field]}"
+                )
+    # Рост пропускной способности с числом процессов — пока хватает ядер
+    scaling = sorted(
+        (result for result in results if result["workers"] <= (os.cpu_count() or 1)),
+        key=lambda result: result["workers"],
+    )
+    for fewer, more in zip(scaling, scaling[1:]):
+        if more["reads"] < fewer["reads"] * MIN_SCALING:
+            problems.append(
+                f"{more['workers']} процессов: {more['reads']:.0f} чтений/с, "
+                f"не больше, чем у {fewer['workers']} ({fewer['reads']:.0f})"
+            )
+    return problems
+
+
+def main() -> None:
+    workers = [int(arg) for arg in sys.argv[1:]] or WORKERS
+    print(f"ядер: {os.cpu_count()}, клиентов: {CLIENTS}")
+    print(
+        f"{'workers':>8} {'чтений/с':>12} {'записей/с':>12} {'дубли id':>10} "
+        f"{'пропуски':>9} {'не видно':>9} "
+        f"{'потеряно постов/лайков/просмотров':>34}"
+    )
+    results = []
+    with multiprocessing.Pool(CLIENTS) as pool:
+        for count in workers:
+            result = run(count, pool)
+            results.append(result)
+            print(
+                f"{count:>8} {result['reads']:>12.0f} {result['writes']:>12.0f} "
+                f"{result['duplicates']:>10} {result['gaps']:>9} "
+                f"{result['missing']:>9} "
+                f"{result['lost']:>20}/{result['likes_lost']}/{result['views_lost']}"
+            )
+    problems = failures(results)
+    if (os.cpu_count() or 1) < max(workers):
+        print(f"Рост с числом процессов проверен до {os.cpu_count()} (по числу ядер)")
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print("✅ Данные не потеряны")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import json
+import sys
+from typing import Any, Dict, Tuple
+
+# Замедление, после которого маршрут считается регрессией
+THRESHOLD = 0.2
+# Разница меньше этой — шум таймера и планировщика
+MIN_DELTA_MS = 0.2
+
+Key = Tuple[str, int, str]
+
+
+def load(path: str) -> Tuple[Dict[str, Any], Dict[Key, Dict[str, Any]]]:
+    # Результаты bench_routes: (размер данных, конкурентность, маршрут) -> замер
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    rows = {
+        (run["size"], result["concurrency"], result["route"]): result
+        for run in report["runs"]
+        for result in run["results"]
+    }
+    return report, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сравнение двух прогонов bench_routes")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument(
+        "--metric", default="p50_ms", choices=["p50_ms", "p95_ms", "p99_ms"]
+    )
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    before_report, before = load(args.before)
+    after_report, after = load(args.after)
+    print(f"{before_report['revision']} -> {after_report['revision']}, {args.metric}")
+    print(
+        f"{'размер':<7} {'c':>3} {'маршрут':<58} {'было':>9} {'стало':>9} {'изм.':>8}"
+    )
+    regressions = 0
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key][args.metric], after[key][args.metric]
+        change = (new - old) / old if old else 0.0
+        mark = ""
+        if change > args.threshold and new - old > MIN_DELTA_MS:
+            mark = "  ▲ медленнее"
+            regressions += 1
+        elif change < -args.threshold and old - new > MIN_DELTA_MS:
+            mark = "  ▼ быстрее"
+        size, concurrency, route = key
+        print(
+            f"{size:<7} {concurrency:>3} {route:<58} {old:>9.3f} {new:>9.3f} "
+            f"{change:>+8.0%}{mark}"
+        )
+    for label, keys in (
+        ("только в первом", before.keys() - after.keys()),
+        ("только во втором", after.keys() - before.keys()),
+    ):
+        if keys:
+            print(
+                f"{label}: {', '.join(' '.join(map(str, key)) for key in sorted(keys))}"
+            )
+    if regressions:
+        print(f"Регрессий: {regressions}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
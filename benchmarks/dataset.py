@@ -0,0 +1,247 @@
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import storage
+from passwords import hash_password
+
+# Пароль всех сгенерированных пользователей: для замеров входа
+PASSWORD = "путешествие2024"
+# Данные охватывают два года до этой даты
+END = datetime(2025, 6, 1)
+SPAN = timedelta(days=730)
+
+PLACES = [
+    ("Горы Алтая", 50.8, 86.8),
+    ("Байкал", 53.5, 108.0),
+    ("Камчатка", 56.1, 159.9),
+    ("Карелия", 63.0, 33.0),
+    ("Казань", 55.79, 49.12),
+    ("Санкт-Петербург", 59.94, 30.31),
+    ("Сочи", 43.6, 39.73),
+    ("Эльбрус", 43.35, 42.44),
+    ("Калининград", 54.71, 20.51),
+    ("Мурманск", 68.97, 33.07),
+    ("Владивосток", 43.12, 131.89),
+    ("Суздаль", 56.42, 40.45),
+    ("Дагестан", 42.98, 47.5),
+    ("Плато Путорана", 69.0, 94.0),
+    ("Куршская коса", 55.2, 20.9),
+    ("Тбилиси", 41.72, 44.79),
+    ("Стамбул", 41.01, 28.98),
+    ("Ереван", 40.18, 44.51),
+    ("Самарканд", 39.65, 66.96),
+    ("Рим", 41.9, 12.5),
+]
+WORDS = (
+    "дорога утро рассвет туман озеро река берег гора перевал тропа лес поле "
+    "деревня город рынок музей храм крепость мост вокзал поезд автобус палатка "
+    "костёр чай хлеб сыр рыба ветер дождь снег солнце закат звёзды небо камни "
+    "песок волны лодка маяк карта рюкзак друзья местные жители гостеприимство "
+    "тишина дорогу назад впечатления фотографии восхождение привал ночёвка"
+).split()
+CATEGORIES = [
+    ("Горы", "mountains"),
+    ("Море", "sea"),
+    ("Города", "cities"),
+    ("Поход", "hiking"),
+    ("Еда", "food"),
+    ("Зима", "winter"),
+    ("Автопутешествие", "road-trip"),
+    ("Север", "north"),
+]
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def story(rng: random.Random) -> str:
+    # Рассказы разной длины: от пары фраз до нескольких абзацев
+    paragraphs = []
+    for _ in range(rng.choice((1, 1, 2, 3, 5))):
+        paragraphs.append(
+            " ".join(
+                sentence(rng, rng.randint(6, 16)) for _ in range(rng.randint(2, 6))
+            )
+        )
+    return "\n\n".join(paragraphs)
+
+
+def timestamp(rng: random.Random, after: Optional[datetime] = None) -> datetime:
+    start = after or END - SPAN
+    return start + (END - start) * rng.random()
+
+
+def generate(
+    travelers: int,
+    journeys: int,
+    comments_per_journey: float = 3,
+    seed: int = 42,
+) -> Dict[str, Any]:
+    # Снимок в формате storage: все коллекции и счётчики следующих id
+    rng = random.Random(seed)
+    # Один хэш на всех: scrypt на каждого занял бы минуты
+    password = hash_password(PASSWORD)
+    traveler_records = []
+    for traveler_id in range(1, travelers + 1):
+        created_at = timestamp(rng)
+        traveler_records.append(
+            {
+                "id": traveler_id,
+                "email": f"traveler{traveler_id}@example.com",
+                "username": f"Путешественник {traveler_id}",
+                "password": password,
+                "createdAt": created_at,
+                "updatedAt": timestamp(rng, created_at),
+            }
+        )
+
+    # Авторы по закону Ципфа: немногие пишут большую часть постов
+    weights = [1 / rank for rank in range(1, travelers + 1)]
+    authors = rng.choices(range(1, travelers + 1), weights, k=journeys)
+    # id растут вместе с датой создания, как при обычной работе блога
+    created = sorted(timestamp(rng) for _ in range(journeys))
+    journey_records = []
+    for journey_id, (author, created_at) in enumerate(zip(authors, created), 1):
+        place, lat, lng = rng.choice(PLACES)
+        located = rng.random() < 0.7
+        journey_records.append(
+            {
+                "id": journey_id,
+                "travelerId": author,
+                "destination": f"{place}: {sentence(rng, 3)[:-1].lower()}",
+                "story": story(rng),
+                "locationLat": round(rng.gauss(lat, 0.5), 5) if located else None,
+                "locationLng": round(rng.gauss(lng, 0.5), 5) if located else None,
+                "viewCount": int(rng.paretovariate(1.2)) * 10,
+                "likeCount": int(rng.paretovariate(1.5)),
+                "createdAt": created_at,
+                "updatedAt": (
+                    timestamp(rng, created_at) if rng.random() < 0.2 else created_at
+                ),
+            }
+        )
+
+    comments: List[Dict[str, Any]] = []
+    # comments_per_journey=0 — без комментариев
+    for journey in journey_records if comments_per_journey else ():
+        thread: List[int] = []
+        count = int(rng.expovariate(1 / comments_per_journey))
+        for created_at in sorted(
+            timestamp(rng, journey["createdAt"]) for _ in range(count)
+        ):
+            comment_id = len(comments) + 1
+            comments.append(
+                {
+                    "id": comment_id,
+                    "journeyId": journey["id"],
+                    "authorId": rng.randint(1, travelers),
+                    # Половина — ответы на уже написанные под этим постом
+                    "parentId": (
+                        rng.choice(thread) if thread and rng.random() < 0.5 else None
+                    ),
+                    "content": sentence(rng, rng.randint(3, 20)),
+                    "createdAt": created_at,
+                    "updatedAt": created_at,
+                }
+            )
+            thread.append(comment_id)
+
+    subscriptions = []
+    pairs = set()
+    for subscriber in range(1, travelers + 1):
+        targets = rng.choices(range(1, travelers + 1), weights, k=rng.randint(0, 20))
+        for target in targets:
+            if target != subscriber and (subscriber, target) not in pairs:
+                pairs.add((subscriber, target))
+                subscriptions.append(
+                    {
+                        "id": len(subscriptions) + 1,
+                        "subscriberId": subscriber,
+                        "targetUserId": target,
+                        "createdAt": timestamp(rng),
+                    }
+                )
+
+    categories = [
+        {
+            "id": category_id,
+            "name": name,
+            "slug": slug,
+            "description": f"Посты о теме «{name}»",
+            "createdAt": END - SPAN,
+        }
+        for category_id, (name, slug) in enumerate(CATEGORIES, 1)
+    ]
+    links = []
+    for journey in journey_records:
+        chosen = rng.sample(range(1, len(CATEGORIES) + 1), rng.randint(0, 3))
+        for category_id in chosen:
+            links.append(
+                {
+                    "id": len(links) + 1,
+                    "journeyId": journey["id"],
+                    "categoryId": category_id,
+                    "createdAt": journey["createdAt"],
+                }
+            )
+
+    favorites = []
+    seen = set()
+    for _ in range(journeys):
+        pair = (rng.randint(1, travelers), rng.randint(1, journeys))
+        if pair not in seen:
+            seen.add(pair)
+            favorites.append(
+                {
+                    "id": len(favorites) + 1,
+                    "userId": pair[0],
+                    "journeyId": pair[1],
+                    "createdAt": timestamp(rng),
+                }
+            )
+
+    data = {
+        "travelers": traveler_records,
+        "journeys": journey_records,
+        "comments": comments,
+        "subscriptions": subscriptions,
+        "categories": categories,
+        "journey_categories": links,
+        "favorites": favorites,
+    }
+    for collection, sequence in storage.SEQUENCES.items():
+        data[sequence] = len(data[collection]) + 1
+    return data
+
+
+def write(directory: str, data: Dict[str, Any]) -> str:
+    # Снимок и его бинарная копия — как после уплотнения журнала
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, storage.DATA_FILE)
+    storage._write_snapshot(path, data, binary=True)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Синтетические данные блога")
+    parser.add_argument("--travelers", type=int, default=1_000)
+    parser.add_argument("--journeys", type=int, default=10_000)
+    parser.add_argument("--comments-per-journey", type=float, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=".", help="каталог для blog_data.json")
+    args = parser.parse_args()
+    data = generate(args.travelers, args.journeys, args.comments_per_journey, args.seed)
+    path = write(args.out, data)
+    counts = ", ".join(
+        f"{collection}: {len(data[collection])}" for collection in storage.SEQUENCES
+    )
+    print(f"{path} — {counts}")
+
+
+if __name__ == "__main__":
+    main()
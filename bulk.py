@@ -0,0 +1,233 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from json_cache import json_default
+from passwords import HasherBusy, PasswordHasher, is_hashed
+from repository import BlogRepository
+
+# Сколько строк проверяем одним вызовом pydantic
+IMPORT_CHUNK_SIZE = int(os.environ.get("BLOG_BULK_CHUNK_SIZE", "500"))
+# Сколько записей выгружаем за один шаг по курсору
+EXPORT_PAGE_SIZE = 500
+# Больше ошибок в ответе не перечисляем, только считаем
+MAX_REPORTED_ERRORS = 100
+# Пауза перед повтором, если пул хэширования паролей переполнен
+BUSY_RETRY_DELAY = 0.05
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Строка выгрузки: {"type": "traveler" | "journey", ...поля записи}
+RECORD_TYPES = {"traveler": "travelers", "journey": "journeys"}
+
+_Line = Tuple[int, Dict[str, Any]]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    # Режем поток тела запроса на строки, не собирая его целиком
+    line_number = 0
+    tail = b""
+    async for chunk in chunks:
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        for line in lines:
+            line_number += 1
+            yield line_number, line
+    if tail:
+        yield line_number + 1, tail
+
+
+class BulkImporter:
+    # Принимает строки выгрузки, проверяет их пачками и создаёт записи.
+    # Сохранение — забота вызывающего: один persist() на весь импорт
+    def __init__(
+        self,
+        repo: BlogRepository,
+        traveler_model: Type[BaseModel],
+        journey_model: Type[BaseModel],
+        hasher: PasswordHasher,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+    ) -> None:
+        self.repo = repo
+        self.hasher = hasher
+        self.chunk_size = chunk_size
+        self._adapters = {
+            "travelers": TypeAdapter(List[traveler_model]),  # type: ignore[valid-type]
+            "journeys": TypeAdapter(List[journey_model]),  # type: ignore[valid-type]
+        }
+        self._pending: List[Tuple[int, str, Dict[str, Any]]] = []
+        # id пользователя в выгрузке -> id, под которым он создан здесь
+        self._traveler_ids: Dict[int, int] = {}
+        self.created = {"travelers": 0, "journeys": 0}
+        self.error_count = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    async def feed(self, line_number: int, raw: bytes) -> None:
+        if not raw.strip():
+            return
+        try:
+            item = json.loads(raw)
+        except ValueError:
+            self._error(line_number, "Некорректный JSON")
+            return
+        if not isinstance(item, dict) or item.get("type") not in RECORD_TYPES:
+            self._error(line_number, "Ожидается объект с type traveler или journey")
+            return
+        self._pending.append((line_number, RECORD_TYPES[item["type"]], item))
+        if len(self._pending) >= self.chunk_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        validated: Dict[int, BaseModel] = {}
+        for collection in RECORD_TYPES.values():
+            lines = [(number, item) for number, c, item in pending if c == collection]
+            validated.update(self._validate(collection, lines))
+        passwords = await self._hash_passwords(validated)
+        # Создаём в исходном порядке: пост может ссылаться на автора из той же пачки
+        for line_number, collection, item in pending:
+            model = validated.get(line_number)
+            if model is not None:
+                self._create(line_number, collection, item, model, passwords)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "created": dict(self.created),
+            "error_count": self.error_count,
+            "errors": sorted(self.errors, key=lambda error: error["line"]),
+        }
+
+    def _validate(self, collection: str, lines: List[_Line]) -> Dict[int, BaseModel]:
+        if not lines:
+            return {}
+        adapter = self._adapters[collection]
+        try:
+            models = adapter.validate_python([item for _, item in lines])
+            return {number: model for (number, _), model in zip(lines, models)}
+        except ValidationError:
+            pass
+        # В пачке есть ошибки — проверяем по одной, чтобы указать строки
+        result = {}
+        for number, item in lines:
+            try:
+                result[number] = adapter.validate_python([item])[0]
+            except ValidationError as e:
+                self._error(number, _describe(e))
+        return result
+
+    async def _hash_passwords(self, validated: Dict[int, Any]) -> Dict[int, str]:
+        # Пароли из выгрузки уже хэшированы, открытые хэшируем в пуле.
+        # Отправляем по числу потоков, чтобы вход на сайт не ждал весь импорт
+        plain = [
+            (number, model.password)
+            for number, model in validated.items()
+            if hasattr(model, "password") and not is_hashed(model.password)
+        ]
+        hashes: Dict[int, str] = {}
+        for start in range(0, len(plain), self.hasher.workers):
+            wave = plain[start : start + self.hasher.workers]
+            while True:
+                try:
+                    results = await asyncio.gather(
+                        *(self.hasher.hash(password) for _, password in wave)
+                    )
+                    break
+                except HasherBusy:
+                    # Очередь занята входами пользователей — импорт подождёт
+                    await asyncio.sleep(BUSY_RETRY_DELAY)
+            hashes.update(zip((number for number, _ in wave), results))
+        return hashes
+
+    def _create(
+        self,
+        line_number: int,
+        collection: str,
+        item: Dict[str, Any],
+        model: Any,
+        passwords: Dict[int, str],
+    ) -> None:
+        try:
+            created_at = _parse_timestamp(item.get("createdAt"))
+        except ValueError:
+            self._error(line_number, "Некорректная дата createdAt")
+            return
+
+        if collection == "travelers":
+            if self.repo.get_traveler_by_email(model.email):
+                self._error(line_number, "Email уже используется")
+                return
+            traveler = self.repo.create_traveler(
+                model.email,
+                model.username,
+                passwords.get(line_number, model.password),
+                created_at=created_at,
+            )
+            if isinstance(item.get("id"), int):
+                self._traveler_ids[item["id"]] = traveler["id"]
+        else:
+            traveler_id = self._traveler_ids.get(model.travelerId, model.travelerId)
+            if not self.repo.traveler_exists(traveler_id):
+                self._error(line_number, "Пользователь не найден")
+                return
+            self.repo.create_journey(
+                traveler_id,
+                model.destination,
+                model.story,
+                created_at=created_at,
+                location_lat=model.locationLat,
+                location_lng=model.locationLng,
+            )
+        self.created[collection] += 1
+
+    def _error(self, line_number: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_number, "error": message})
+
+
+def _describe(error: ValidationError) -> str:
+    # loc начинается с индекса в списке — его отбрасываем
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'][1:])}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(value)
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def encode_line(record_type: str, record: Dict[str, Any]) -> bytes:
+    line = json.dumps(
+        {"type": record_type, **record}, default=json_default, ensure_ascii=False
+    )
+    return (line + "\n").encode("utf-8")
+
+
+async def export_lines(repo: BlogRepository) -> AsyncIterator[bytes]:
+    # Идём по курсорам, а не по спискам: в памяти одна страница,
+    # и правки между отправками страниц не сбивают обход. Генератор
+    # асинхронный, чтобы читать репозиторий из цикла событий, а не из потока
+    pages = (("traveler", repo.page_travelers), ("journey", repo.page_journeys))
+    for record_type, page_records in pages:
+        cursor: Optional[str] = None
+        while True:
+            records, page = page_records(EXPORT_PAGE_SIZE, cursor)
+            if records:
+                yield b"".join(encode_line(record_type, record) for record in records)
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+            # Отправка страницы обычно не ждёт сокета, и без уступки вся
+            # выгрузка шла бы одним куском, задерживая остальные запросы
+            await asyncio.sleep(0)
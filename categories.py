@@ -0,0 +1,207 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pagination import KeysetIndex, Page
+from repository import BlogRepository
+
+
+class CategoryIndex:
+    # Категории и их связи с постами (journey_categories). У каждой
+    # категории — свой KeysetIndex постов: фильтр по категории стоит
+    # O(log n + размер страницы), а число постов в ней — длина индекса,
+    # которая меняется вместе со связями, без подсчёта по всем постам
+    def __init__(
+        self,
+        repo: BlogRepository,
+        categories: List[Dict[str, Any]],
+        links: List[Dict[str, Any]],
+        next_category_id: int = 1,
+        next_link_id: int = 1,
+    ) -> None:
+        self.repo = repo
+        self.next_category_id = next_category_id
+        self.next_link_id = next_link_id
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        self._by_slug: Dict[str, Dict[str, Any]] = {}
+        self._by_name: Dict[str, Dict[str, Any]] = {}
+        # категория -> её посты; пост -> {категория: связь}
+        self._journeys: Dict[int, KeysetIndex] = {}
+        self._links: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        self._links_by_id: Dict[int, Dict[str, Any]] = {}
+        for category in categories:
+            self._index(category)
+        members: Dict[int, List[Dict[str, Any]]] = {}
+        for link in links:
+            journey = repo.get_journey(link["journeyId"])
+            if journey is None or link["categoryId"] not in self._by_id:
+                continue
+            self._links.setdefault(link["journeyId"], {})[link["categoryId"]] = link
+            self._links_by_id[link["id"]] = link
+            members.setdefault(link["categoryId"], []).append(journey)
+        for category_id, journeys in members.items():
+            self._journeys[category_id] = KeysetIndex(journeys)
+        repo.add_listener(self._on_change)
+        repo.add_replayer("categories", self._replay_category, self._by_id.values)
+        repo.add_replayer(
+            "journey_categories", self._replay_link, self._links_by_id.values
+        )
+
+    def _index(self, category: Dict[str, Any]) -> None:
+        self._by_id[category["id"]] = category
+        self._by_slug[category["slug"]] = category
+        self._by_name[category["name"]] = category
+        self._journeys.setdefault(category["id"], KeysetIndex([]))
+
+    # Категории
+
+    def get(self, category_id: int) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(category_id)
+
+    def get_by_slug(self, slug: str) -> Optional[Dict[str, Any]]:
+        return self._by_slug.get(slug)
+
+    def get_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        return self._by_name.get(name)
+
+    def all(self) -> List[Dict[str, Any]]:
+        return list(self._by_id.values())
+
+    def count(self, category_id: int) -> int:
+        return len(self._journeys.get(category_id, ()))
+
+    def counts(self) -> List[Tuple[Dict[str, Any], int]]:
+        # Для боковой панели: категория и число постов в ней
+        return [(c, len(self._journeys[c["id"]])) for c in self._by_id.values()]
+
+    def create(
+        self, name: str, slug: str, description: Optional[str] = None
+    ) -> Dict[str, Any]:
+        # Уникальность name и slug проверяет вызывающий
+        category = {
+            "id": self.next_category_id,
+            "name": name,
+            "slug": slug,
+            "description": description,
+            "createdAt": datetime.now(),
+        }
+        self.next_category_id += 1
+        self._index(category)
+        self.repo.emit("create", "categories", category)
+        return category
+
+    def delete(self, category_id: int) -> bool:
+        category = self._by_id.pop(category_id, None)
+        if category is None:
+            return False
+        del self._by_slug[category["slug"]]
+        del self._by_name[category["name"]]
+        # Связи удаляются вместе с категорией, как ON DELETE CASCADE
+        for journey_id in self._journeys[category_id].ids():
+            self._drop_link(self._links[journey_id][category_id])
+        del self._journeys[category_id]
+        self.repo.emit("delete", "categories", category)
+        return True
+
+    # Связи с постами
+
+    def categories_of(self, journey_id: int) -> List[Dict[str, Any]]:
+        return [self._by_id[c] for c in self._links.get(journey_id, ())]
+
+    def categories_for(
+        self, journey_ids: Iterable[int]
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        # Категории целой страницы постов одним вызовом
+        return {
+            journey_id: self.categories_of(journey_id) for journey_id in journey_ids
+        }
+
+    def set_categories(
+        self, journey: Dict[str, Any], category_ids: Iterable[int]
+    ) -> None:
+        # Заменяет набор категорий поста; несуществующие id проверяет вызывающий
+        wanted = set(category_ids)
+        current = self._links.get(journey["id"], {})
+        for category_id in list(current):
+            if category_id not in wanted:
+                self._drop_link(current[category_id])
+        for category_id in wanted:
+            if category_id in current:
+                continue
+            link = {
+                "id": self.next_link_id,
+                "journeyId": journey["id"],
+                "categoryId": category_id,
+                "createdAt": datetime.now(),
+            }
+            self.next_link_id += 1
+            self._add_link(link, journey)
+
+    def _add_link(self, link: Dict[str, Any], journey: Dict[str, Any]) -> None:
+        self._links.setdefault(journey["id"], {})[link["categoryId"]] = link
+        self._links_by_id[link["id"]] = link
+        self._journeys[link["categoryId"]].add(journey)
+        self.repo.emit("create", "journey_categories", link)
+
+    def page_journeys(
+        self, category_id: int, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Page]:
+        page = self._journeys[category_id].page(limit, cursor)
+        journeys = [self.repo.get_journey(journey_id) for journey_id in page.ids]
+        return [journey for journey in journeys if journey is not None], page
+
+    def _drop_link(
+        self, link: Dict[str, Any], journey: Optional[Dict[str, Any]] = None
+    ) -> None:
+        journey_id, category_id = link["journeyId"], link["categoryId"]
+        links = self._links[journey_id]
+        del links[category_id]
+        del self._links_by_id[link["id"]]
+        if not links:
+            del self._links[journey_id]
+        journey = journey or self.repo.get_journey(journey_id)
+        if journey is not None:
+            self._journeys[category_id].remove(journey)
+        self.repo.emit("delete", "journey_categories", link)
+
+    def _replay_category(self, change: Dict[str, Any]) -> None:
+        if change["op"] == "del":
+            self.delete(change["id"])
+            return
+        record = change["rec"]
+        category = self._by_id.get(record["id"])
+        if category is None:
+            category = dict(record)
+            self.next_category_id = max(self.next_category_id, category["id"] + 1)
+            self._index(category)
+            self.repo.emit("create", "categories", category)
+            return
+        del self._by_slug[category["slug"]]
+        del self._by_name[category["name"]]
+        category.update(record)
+        self._index(category)
+        self.repo.emit("update", "categories", category)
+
+    def _replay_link(self, change: Dict[str, Any]) -> None:
+        if change["op"] == "del":
+            link = self._links_by_id.get(change["id"])
+            if link is not None:
+                self._drop_link(link)
+            return
+        link = change["rec"]
+        journey = self.repo.get_journey(link["journeyId"])
+        if (
+            link["id"] in self._links_by_id
+            or journey is None
+            or link["categoryId"] not in self._by_id
+            or link["categoryId"] in self._links.get(journey["id"], {})
+        ):
+            return
+        self.next_link_id = max(self.next_link_id, link["id"] + 1)
+        self._add_link(dict(link), journey)
+
+    def _on_change(self, op: str, collection: str, record: Dict[str, Any]) -> None:
+        # Связи удаляются вместе с постом. Из репозитория пост уже убран,
+        # поэтому запись для индекса категорий передаём сами
+        if collection == "journeys" and op == "delete":
+            for link in list(self._links.get(record["id"], {}).values()):
+                self._drop_link(link, record)
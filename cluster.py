@@ -0,0 +1,120 @@
+import asyncio
+import os
+import socket
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from repository import BlogRepository
+from storage import SEQUENCES, SharedJournalStore, Store
+
+# Число процессов uvicorn; больше одного — данные в общем журнале
+WORKERS = int(os.environ.get("BLOG_WORKERS", "1"))
+# Как часто простаивающий процесс дочитывает чужие изменения
+SYNC_INTERVAL = float(os.environ.get("BLOG_SYNC_INTERVAL_SECONDS", "0.5"))
+
+
+class WorkerSync:
+    # Согласует данные процессов, работающих с общим журналом. Каждый
+    # держит всё в памяти, как и один процесс, а перед ответом дочитывает
+    # хвост журнала и применяет чужие изменения к индексам. Запись —
+    # под блокировкой журнала: процесс сначала догоняет остальных, потом
+    # меняет данные и пишет их, поэтому id и счётчики не расходятся
+    def __init__(self, repo: BlogRepository, store: Store) -> None:
+        self.repo = repo
+        self.store = store
+        self.shared = isinstance(store, SharedJournalStore)
+        self._lock: Optional[asyncio.Lock] = None
+
+    def catch_up(self, locked: bool = False) -> int:
+        # Возвращает число применённых чужих изменений.
+        # locked=True — блокировка журнала уже у вызывающего
+        if not self.shared:
+            return 0
+        store = self.store
+        assert isinstance(store, SharedJournalStore)
+        changes = store.poll()
+        if changes is None:
+            # Хвост уже уплотнили в снимок: сверяем с ним все коллекции. Без
+            # блокировки снимок и журнал могут меняться — тогда сверка
+            # подождёт следующего вызова
+            if locked:
+                changes = self._diff(store.reload())
+            elif store.lock.acquire(blocking=False):
+                try:
+                    changes = self._diff(store.reload())
+                finally:
+                    store.lock.release()
+            else:
+                return 0
+        self.repo.replay(changes)
+        return len(changes)
+
+    def _diff(self, loaded: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        deletes: List[Dict[str, Any]] = []
+        puts: List[Dict[str, Any]] = []
+        for collection in SEQUENCES:
+            current = {record["id"]: record for record in self.repo.records(collection)}
+            fresh = {record["id"]: record for record in loaded[collection]}
+            # Удаления — от зависимых коллекций к основным, чтобы каскады
+            # не удаляли то, что ещё сверяется
+            deletes[:0] = [
+                {"op": "del", "c": collection, "id": record_id}
+                for record_id in current.keys() - fresh.keys()
+            ]
+            puts += [
+                {"op": "put", "c": collection, "rec": record}
+                for record_id, record in sorted(fresh.items())
+                if record_id not in current or dict(current[record_id]) != record
+            ]
+        return deletes + puts
+
+    @asynccontextmanager
+    async def exclusive(self) -> AsyncIterator[None]:
+        # Запись в общие данные: одна на все процессы. Внутри процесса
+        # очередь держит asyncio.Lock, flock ждём в потоке, не блокируя цикл
+        if not self.shared:
+            yield
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        store = self.store
+        assert isinstance(store, SharedJournalStore)
+        async with self._lock:
+            acquiring = asyncio.ensure_future(asyncio.to_thread(store.lock.acquire))
+            try:
+                await asyncio.shield(acquiring)
+            except asyncio.CancelledError:
+                # Поток всё равно получит блокировку — сразу отдаём её
+                acquiring.add_done_callback(lambda _: store.lock.release())
+                raise
+            try:
+                self.catch_up(locked=True)
+                yield
+            finally:
+                store.lock.release()
+
+    async def poll_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(SYNC_INTERVAL)
+            try:
+                self.catch_up()
+            except Exception as e:
+                print(f"Ошибка чтения общего журнала: {e}")
+
+
+def serve(app: str, host: str, port: int, workers: int = WORKERS) -> None:
+    # uvicorn --workers создаёт сокет с proto=0, и asyncio не включает
+    # TCP_NODELAY у принятых соединений: тело ответа ждёт ACK заголовков
+    # (задержанный ACK — около 40 мс на запрос). Создаём сокет сами,
+    # принятые соединения наследуют TCP_NODELAY от него
+    config = uvicorn.Config(app, host=host, port=port, workers=workers)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    server = uvicorn.Server(config)
+    Multiprocess(config, target=server.run, sockets=[sock]).run()
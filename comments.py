@@ -0,0 +1,224 @@
+import math
+import os
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from pagination import KeysetIndex, Page
+from repository import BlogRepository
+
+# Сколько ответов показываем под веткой на странице поста
+REPLIES_PREVIEW = int(os.environ.get("BLOG_COMMENT_REPLIES_PREVIEW", "20"))
+# Больше ответов за один запрос не отдаём
+MAX_REPLIES = 200
+
+# Материализованный путь: (id корня, ..., id самого комментария)
+CommentPath = Tuple[int, ...]
+# Больше любого id: путь + (_END,) стоит сразу за всеми потомками пути
+_END = math.inf
+
+
+class Thread(NamedTuple):
+    comment: Dict[str, Any]
+    # (ответ, глубина относительно корня ветки) в порядке обхода в глубину
+    replies: List[Tuple[Dict[str, Any], int]]
+    # Сколько всего ответов в ветке, включая не попавшие в replies
+    reply_count: int
+
+
+class CommentTree:
+    # Пути комментариев поста лежат в одном отсортированном списке. Порядок
+    # путей — это обход дерева в глубину, поэтому любая ветка — непрерывный
+    # отрезок списка: её выборка и подсчёт стоят два бинарных поиска и срез,
+    # без спуска по уровням. Верхние ветки постранично идут по KeysetIndex
+    def __init__(
+        self,
+        repo: BlogRepository,
+        comments: List[Dict[str, Any]],
+        next_comment_id: int = 1,
+    ) -> None:
+        self.repo = repo
+        self.next_comment_id = next_comment_id
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        self._paths: Dict[int, CommentPath] = {}
+        self._order: Dict[int, List[CommentPath]] = {}
+        self._threads: Dict[int, KeysetIndex] = {}
+        # Комментарии каждого автора: удаление пользователя уносит их сразу
+        self._by_author: Dict[int, Set[int]] = {}
+        self._load(comments)
+        repo.add_listener(self._on_change)
+        repo.add_replayer("comments", self._replay, self._by_id.values)
+
+    def _load(self, comments: List[Dict[str, Any]]) -> None:
+        # Родитель старше ответа: идём по возрастанию id, и путь родителя
+        # уже известен. Списки сортируем один раз в конце, а не вставками
+        roots: Dict[int, List[Dict[str, Any]]] = {}
+        for comment in sorted(comments, key=lambda c: c["id"]):
+            parent_path = self._paths.get(comment.get("parentId"))
+            path = (parent_path or ()) + (comment["id"],)
+            self._by_id[comment["id"]] = comment
+            self._paths[comment["id"]] = path
+            self._by_author.setdefault(comment["authorId"], set()).add(comment["id"])
+            self._order.setdefault(comment["journeyId"], []).append(path)
+            if len(path) == 1:
+                roots.setdefault(comment["journeyId"], []).append(comment)
+        for paths in self._order.values():
+            paths.sort()
+        for journey_id, records in roots.items():
+            self._threads[journey_id] = KeysetIndex(records)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def get(self, comment_id: int) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(comment_id)
+
+    def count(self, journey_id: int) -> int:
+        return len(self._order.get(journey_id, ()))
+
+    def create(
+        self,
+        journey_id: int,
+        author_id: int,
+        content: str,
+        parent: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        # Пост, автора и то, что parent из того же поста, проверяет вызывающий
+        now = datetime.now()
+        comment = {
+            "id": self.next_comment_id,
+            "journeyId": journey_id,
+            "authorId": author_id,
+            "parentId": parent["id"] if parent else None,
+            "content": content,
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        self.next_comment_id += 1
+        self._insert(comment, self._paths[parent["id"]] if parent else ())
+        return comment
+
+    def _insert(self, comment: Dict[str, Any], parent_path: CommentPath) -> None:
+        path = parent_path + (comment["id"],)
+        journey_id = comment["journeyId"]
+        self._by_id[comment["id"]] = comment
+        self._paths[comment["id"]] = path
+        self._by_author.setdefault(comment["authorId"], set()).add(comment["id"])
+        # id растёт, так что новый ответ встаёт в конец ветки родителя
+        insort(self._order.setdefault(journey_id, []), path)
+        if len(path) == 1:
+            self._threads.setdefault(journey_id, KeysetIndex([])).add(comment)
+        self.repo.emit("create", "comments", comment)
+
+    def delete(self, comment_id: int) -> int:
+        # Ветка удаляется целиком, как ON DELETE CASCADE у parent_comment_id.
+        # Возвращает число удалённых комментариев
+        comment = self._by_id.get(comment_id)
+        if comment is None:
+            return 0
+        start, end = self._span(comment)
+        return self._remove(comment["journeyId"], start, end)
+
+    def page_threads(
+        self,
+        journey_id: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        replies: int = REPLIES_PREVIEW,
+    ) -> Tuple[List[Thread], Page]:
+        # Страница верхних веток и первые replies ответов в каждой:
+        # объём работы зависит от размера страницы, а не от числа комментариев
+        index = self._threads.get(journey_id) or KeysetIndex([])
+        page = index.page(limit, cursor)
+        order = self._order.get(journey_id, [])
+        threads = []
+        for root_id in page.ids:
+            root = self._by_id[root_id]
+            start, end = self._span(root)
+            shown = order[start + 1 : min(end, start + 1 + replies)]
+            threads.append(
+                Thread(
+                    root,
+                    [(self._by_id[path[-1]], len(path) - 1) for path in shown],
+                    end - start - 1,
+                )
+            )
+        return threads, page
+
+    def subtree(
+        self, comment_id: int, limit: int, after: Optional[int] = None
+    ) -> Tuple[List[Tuple[Dict[str, Any], int]], bool]:
+        # Комментарий со всеми ответами в порядке обхода, по limit штук;
+        # after — id последнего полученного. Глубина — относительно comment_id.
+        # Второй элемент — есть ли продолжение
+        comment = self._by_id.get(comment_id)
+        if comment is None:
+            raise KeyError(comment_id)
+        path = self._paths[comment_id]
+        start, end = self._span(comment)
+        order = self._order[comment["journeyId"]]
+        if after is not None:
+            after_path = self._paths.get(after)
+            if after_path is None or after_path[: len(path)] != path:
+                raise ValueError("Комментарий не из этой ветки")
+            start = bisect_right(order, after_path)
+        stop = min(end, start + limit)
+        items = [
+            (self._by_id[item[-1]], len(item) - len(path)) for item in order[start:stop]
+        ]
+        return items, stop < end
+
+    def _span(self, comment: Dict[str, Any]) -> Tuple[int, int]:
+        order = self._order[comment["journeyId"]]
+        path = self._paths[comment["id"]]
+        return bisect_left(order, path), bisect_left(order, path + (_END,))
+
+    def _remove(self, journey_id: int, start: int, end: int) -> int:
+        order = self._order[journey_id]
+        removed = order[start:end]
+        del order[start:end]
+        if not order:
+            del self._order[journey_id]
+        # С конца обхода: ответы удаляются раньше комментариев, на которые отвечают
+        for path in reversed(removed):
+            comment = self._by_id.pop(path[-1])
+            del self._paths[path[-1]]
+            authored = self._by_author[comment["authorId"]]
+            authored.discard(comment["id"])
+            if not authored:
+                del self._by_author[comment["authorId"]]
+            if len(path) == 1:
+                self._threads[journey_id].remove(comment)
+            self.repo.emit("delete", "comments", comment)
+        if journey_id not in self._order:
+            self._threads.pop(journey_id, None)
+        return len(removed)
+
+    def _replay(self, change: Dict[str, Any]) -> None:
+        if change["op"] == "del":
+            self.delete(change["id"])
+            return
+        comment = change["rec"]
+        existing = self._by_id.get(comment["id"])
+        if existing is not None:
+            existing.update(comment)
+            self.repo.emit("update", "comments", existing)
+            return
+        parent_id = comment.get("parentId")
+        if parent_id is not None and parent_id not in self._paths:
+            # Ветку уже удалили — её удаление придёт следом
+            return
+        self.next_comment_id = max(self.next_comment_id, comment["id"] + 1)
+        self._insert(dict(comment), self._paths[parent_id] if parent_id else ())
+
+    def _on_change(self, op: str, collection: str, record: Dict[str, Any]) -> None:
+        # Комментарии удаляются вместе с постом и с автором, как ON DELETE
+        # CASCADE. Ветка комментария уходит целиком, с чужими ответами
+        if op != "delete":
+            return
+        if collection == "journeys" and record["id"] in self._order:
+            self._remove(record["id"], 0, len(self._order[record["id"]]))
+        elif collection == "travelers":
+            for comment_id in sorted(self._by_author.get(record["id"], ())):
+                # Ответ мог уйти вместе с веткой своего же раннего комментария
+                self.delete(comment_id)
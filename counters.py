@@ -0,0 +1,155 @@
+import heapq
+import os
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from repository import BlogRepository
+
+# Как часто накопленные просмотры и лайки записываются в посты
+FLUSH_INTERVAL = float(os.environ.get("BLOG_COUNTER_FLUSH_SECONDS", "5"))
+# Сколько лучших постов держим в рейтинге
+TOP_K = int(os.environ.get("BLOG_TOP_K", "100"))
+
+# Счётчик -> поле записи поста
+FIELDS = {"views": "viewCount", "likes": "likeCount"}
+
+
+class TopK:
+    # K наибольших значений. Счётчики только растут, поэтому пост может
+    # войти в рейтинг, лишь обогнав последнего — хватает кучи по минимуму
+    def __init__(self, k: int = TOP_K) -> None:
+        self.k = k
+        self._members: Dict[int, int] = {}
+        # (значение, id); устаревшие пары выбрасываются при просмотре вершины
+        self._heap: List[Tuple[int, int]] = []
+        self._ranking: Optional[List[Tuple[int, int]]] = None
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def __contains__(self, item: int) -> bool:
+        return item in self._members
+
+    def _minimum(self) -> Tuple[int, int]:
+        while True:
+            value, item = self._heap[0]
+            if self._members.get(item) == value:
+                return value, item
+            heapq.heappop(self._heap)
+
+    def update(self, item: int, value: int) -> None:
+        if item in self._members:
+            if self._members[item] == value:
+                return
+        elif len(self._members) >= self.k:
+            smallest, smallest_item = self._minimum()
+            if (value, item) <= (smallest, smallest_item):
+                return
+            heapq.heappop(self._heap)
+            del self._members[smallest_item]
+        self._members[item] = value
+        heapq.heappush(self._heap, (value, item))
+        if len(self._heap) > 4 * self.k:
+            # Частые приращения одних и тех же постов копят устаревшие пары
+            self._heap = [(v, i) for i, v in self._members.items()]
+            heapq.heapify(self._heap)
+        self._ranking = None
+
+    def rebuild(self, values: Iterable[Tuple[int, int]]) -> None:
+        best = heapq.nlargest(self.k, ((value, item) for item, value in values))
+        self._members = {item: value for value, item in best}
+        self._heap = [(value, item) for value, item in best]
+        heapq.heapify(self._heap)
+        self._ranking = None
+
+    def ranking(self, limit: int) -> List[Tuple[int, int]]:
+        # (id, значение) по убыванию; пересортировка — только после изменений
+        if self._ranking is None:
+            self._ranking = sorted(
+                self._members.items(), key=lambda pair: (-pair[1], -pair[0])
+            )
+        return self._ranking[:limit]
+
+
+class JourneyCounters:
+    # Приращения копятся в памяти процесса и раз в FLUSH_INTERVAL уходят
+    # в посты одной пачкой. Всё меняется только из цикла событий, поэтому
+    # блокировки не нужны. Рейтинги учитывают и ещё не сброшенные приращения
+    def __init__(self, repo: BlogRepository, k: int = TOP_K) -> None:
+        self.repo = repo
+        self._pending: Dict[str, Dict[int, int]] = {name: {} for name in FIELDS}
+        self._rankings = {name: TopK(k) for name in FIELDS}
+        # Рейтинги, из которых удалили пост: пересобираются при чтении
+        self._stale: Set[str] = set()
+        for name in FIELDS:
+            self._rebuild(name)
+        repo.add_listener(self._on_change)
+
+    def _rebuild(self, counter: str) -> None:
+        self._rankings[counter].rebuild(
+            (journey["id"], self._total(counter, journey))
+            for journey in self.repo.journeys
+        )
+
+    def _total(self, counter: str, journey: Dict[str, Any]) -> int:
+        persisted: int = journey.get(FIELDS[counter]) or 0
+        return persisted + self._pending[counter].get(journey["id"], 0)
+
+    def increment(self, counter: str, journey: Dict[str, Any], amount: int = 1) -> int:
+        pending = self._pending[counter]
+        pending[journey["id"]] = pending.get(journey["id"], 0) + amount
+        total = self._total(counter, journey)
+        self._rankings[counter].update(journey["id"], total)
+        return total
+
+    def get(self, journey: Dict[str, Any]) -> Dict[str, int]:
+        return {name: self._total(name, journey) for name in FIELDS}
+
+    def ranking(self, counter: str, limit: int) -> List[Tuple[Dict[str, Any], int]]:
+        if counter in self._stale:
+            self._stale.discard(counter)
+            self._rebuild(counter)
+        result = []
+        for journey_id, value in self._rankings[counter].ranking(limit):
+            journey = self.repo.get_journey(journey_id)
+            if journey is not None:
+                result.append((journey, value))
+        return result
+
+    def flush(self) -> int:
+        # Переносит накопленное в поля постов; возвращает число изменённых постов
+        drained = self._pending
+        self._pending = {name: {} for name in FIELDS}
+        journey_ids = set().union(*(pending.keys() for pending in drained.values()))
+        for journey_id in journey_ids:
+            journey = self.repo.get_journey(journey_id)
+            if journey is None:
+                continue
+            self.repo.update_journey_counters(
+                journey,
+                **{
+                    field: (journey.get(field) or 0) + drained[name].get(journey_id, 0)
+                    for name, field in FIELDS.items()
+                },
+            )
+        return len(journey_ids)
+
+    def has_pending(self) -> bool:
+        return any(self._pending.values())
+
+    def _on_change(self, op: str, collection: str, record: Dict[str, Any]) -> None:
+        if collection != "journeys":
+            return
+        if op == "counters":
+            # Сброс другого процесса: сохранённые значения выросли
+            for name in FIELDS:
+                self._rankings[name].update(record["id"], self._total(name, record))
+            return
+        if op != "delete":
+            return
+        for name, pending in self._pending.items():
+            pending.pop(record["id"], None)
+            if record["id"] in self._rankings[name]:
+                # Место удалённого займёт следующий — его ищет полный проход,
+                # один на все удаления до чтения рейтинга (каскад удаляет
+                # сразу много постов)
+                self._stale.add(name)
@@ -0,0 +1,134 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from pagination import KeysetIndex, Page
+from repository import BlogRepository
+
+
+class FavoriteIndex:
+    # Избранное: у каждого пользователя — множество id постов для проверок
+    # за O(1) и KeysetIndex для постраничного списка. Число добавлений
+    # в избранное по постам обновляется вместе с записями
+    def __init__(
+        self,
+        repo: BlogRepository,
+        favorites: List[Dict[str, Any]],
+        next_favorite_id: int = 1,
+    ) -> None:
+        self.repo = repo
+        self.next_favorite_id = next_favorite_id
+        # пользователь -> {пост: запись}
+        self._by_user: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        self._order: Dict[int, KeysetIndex] = {}
+        # пост -> кто добавил его в избранное
+        self._by_journey: Dict[int, Set[int]] = {}
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        journeys: Dict[int, List[Dict[str, Any]]] = {}
+        for favorite in favorites:
+            journey = repo.get_journey(favorite["journeyId"])
+            if journey is None:
+                continue
+            self._index(favorite)
+            journeys.setdefault(favorite["userId"], []).append(journey)
+        for user_id, records in journeys.items():
+            self._order[user_id] = KeysetIndex(records)
+        repo.add_listener(self._on_change)
+        repo.add_replayer("favorites", self._replay, self._by_id.values)
+
+    def _index(self, favorite: Dict[str, Any]) -> None:
+        user_id, journey_id = favorite["userId"], favorite["journeyId"]
+        self._by_user.setdefault(user_id, {})[journey_id] = favorite
+        self._by_journey.setdefault(journey_id, set()).add(user_id)
+        self._by_id[favorite["id"]] = favorite
+
+    def is_favorite(self, user_id: int, journey_id: int) -> bool:
+        return journey_id in self._by_user.get(user_id, {})
+
+    def favorites_among(self, user_id: int, journey_ids: Iterable[int]) -> Set[int]:
+        # Какие из постов страницы пользователь добавил в избранное — одним вызовом
+        favorites = self._by_user.get(user_id, {})
+        return {journey_id for journey_id in journey_ids if journey_id in favorites}
+
+    def count(self, journey_id: int) -> int:
+        return len(self._by_journey.get(journey_id, ()))
+
+    def counts_for(self, journey_ids: Iterable[int]) -> Dict[int, int]:
+        return {journey_id: self.count(journey_id) for journey_id in journey_ids}
+
+    def add(self, user_id: int, journey: Dict[str, Any]) -> Dict[str, Any]:
+        # Повторное добавление возвращает существующую запись
+        existing = self._by_user.get(user_id, {}).get(journey["id"])
+        if existing is not None:
+            return existing
+        favorite = {
+            "id": self.next_favorite_id,
+            "userId": user_id,
+            "journeyId": journey["id"],
+            "createdAt": datetime.now(),
+        }
+        self.next_favorite_id += 1
+        self._add(favorite, journey)
+        return favorite
+
+    def _add(self, favorite: Dict[str, Any], journey: Dict[str, Any]) -> None:
+        self._index(favorite)
+        self._order.setdefault(favorite["userId"], KeysetIndex([])).add(journey)
+        self.repo.emit("create", "favorites", favorite)
+
+    def remove(self, user_id: int, journey_id: int) -> bool:
+        favorite = self._by_user.get(user_id, {}).get(journey_id)
+        if favorite is None:
+            return False
+        self._drop(favorite, self.repo.get_journey(journey_id))
+        return True
+
+    def page(
+        self, user_id: int, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Page]:
+        page = (self._order.get(user_id) or KeysetIndex([])).page(limit, cursor)
+        journeys = [self.repo.get_journey(journey_id) for journey_id in page.ids]
+        return [journey for journey in journeys if journey is not None], page
+
+    def _drop(
+        self, favorite: Dict[str, Any], journey: Optional[Dict[str, Any]]
+    ) -> None:
+        user_id, journey_id = favorite["userId"], favorite["journeyId"]
+        favorites = self._by_user[user_id]
+        del favorites[journey_id]
+        del self._by_id[favorite["id"]]
+        users = self._by_journey[journey_id]
+        users.discard(user_id)
+        if not users:
+            del self._by_journey[journey_id]
+        if journey is not None:
+            self._order[user_id].remove(journey)
+        if not favorites:
+            del self._by_user[user_id]
+            self._order.pop(user_id, None)
+        self.repo.emit("delete", "favorites", favorite)
+
+    def _replay(self, change: Dict[str, Any]) -> None:
+        if change["op"] == "del":
+            favorite = self._by_id.get(change["id"])
+            if favorite is not None:
+                self._drop(favorite, self.repo.get_journey(favorite["journeyId"]))
+            return
+        favorite = change["rec"]
+        journey = self.repo.get_journey(favorite["journeyId"])
+        if favorite["id"] in self._by_id or journey is None:
+            return
+        if self.is_favorite(favorite["userId"], journey["id"]):
+            return
+        self.next_favorite_id = max(self.next_favorite_id, favorite["id"] + 1)
+        self._add(dict(favorite), journey)
+
+    def _on_change(self, op: str, collection: str, record: Dict[str, Any]) -> None:
+        # Избранное удаляется вместе с постом и с пользователем (ON DELETE CASCADE)
+        if op != "delete":
+            return
+        if collection == "journeys":
+            for user_id in list(self._by_journey.get(record["id"], ())):
+                self._drop(self._by_user[user_id][record["id"]], record)
+        elif collection == "travelers":
+            for favorite in list(self._by_user.get(record["id"], {}).values()):
+                self._drop(favorite, self.repo.get_journey(favorite["journeyId"]))
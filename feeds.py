@@ -0,0 +1,269 @@
+import heapq
+import os
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from pagination import Page, SortKey, decode_cursor, encode_cursor, sort_key
+from repository import BlogRepository
+
+# Сколько последних постов держим в ленте каждого подписчика
+TIMELINE_SIZE = int(os.environ.get("BLOG_FEED_TIMELINE_SIZE", "800"))
+# Авторам с большим числом подписчиков посты в ленты не раскладываем:
+# их свежие посты подмешиваются при чтении ленты
+FANOUT_LIMIT = int(os.environ.get("BLOG_FEED_FANOUT_LIMIT", "10000"))
+
+
+class FeedIndex:
+    # Лента — отсортированный по (createdAt, id) список ключей постов тех,
+    # на кого подписан пользователь. Новый пост раскладывается по лентам
+    # подписчиков при создании (fan-out on write), и чтение стоит
+    # O(log n + размер страницы) вместо прохода по всем постам.
+    # Ленты собираются при первом чтении: в памяти только ленты тех,
+    # кто их открывал. Всё меняется только из цикла событий
+    def __init__(
+        self,
+        repo: BlogRepository,
+        subscriptions: List[Dict[str, Any]],
+        next_subscription_id: int = 1,
+        timeline_size: int = TIMELINE_SIZE,
+        fanout_limit: int = FANOUT_LIMIT,
+    ) -> None:
+        self.repo = repo
+        self.next_subscription_id = next_subscription_id
+        self.timeline_size = timeline_size
+        self.fanout_limit = fanout_limit
+        self._subscriptions: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        self._following: Dict[int, Set[int]] = {}
+        self._followers: Dict[int, Set[int]] = {}
+        self._timelines: Dict[int, List[SortKey]] = {}
+        # Ключи постов авторов без раскладки — для слияния при чтении
+        self._author_keys: Dict[int, List[SortKey]] = {}
+        self.fanout_writes = 0
+        for subscription in subscriptions:
+            self._index(subscription)
+        repo.add_listener(self._on_change)
+        repo.add_replayer("subscriptions", self._replay, self._by_id.values)
+
+    def _index(self, subscription: Dict[str, Any]) -> None:
+        subscriber, target = subscription["subscriberId"], subscription["targetUserId"]
+        self._subscriptions[(subscriber, target)] = subscription
+        self._by_id[subscription["id"]] = subscription
+        self._following.setdefault(subscriber, set()).add(target)
+        self._followers.setdefault(target, set()).add(subscriber)
+
+    def _unindex(self, subscription: Dict[str, Any]) -> None:
+        subscriber, target = subscription["subscriberId"], subscription["targetUserId"]
+        del self._subscriptions[(subscriber, target)]
+        del self._by_id[subscription["id"]]
+        for index, key, value in (
+            (self._following, subscriber, target),
+            (self._followers, target, subscriber),
+        ):
+            members = index[key]
+            members.discard(value)
+            if not members:
+                del index[key]
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def is_fanout(self, author_id: int) -> bool:
+        return len(self._followers.get(author_id, ())) <= self.fanout_limit
+
+    def following(self, subscriber_id: int) -> Set[int]:
+        return self._following.get(subscriber_id, set())
+
+    def follower_count(self, author_id: int) -> int:
+        return len(self._followers.get(author_id, ()))
+
+    def subscribe(self, subscriber_id: int, target_id: int) -> Dict[str, Any]:
+        # Повторная подписка возвращает существующую запись
+        existing = self._subscriptions.get((subscriber_id, target_id))
+        if existing is not None:
+            return existing
+        subscription = {
+            "id": self.next_subscription_id,
+            "subscriberId": subscriber_id,
+            "targetUserId": target_id,
+            "createdAt": datetime.now(),
+        }
+        self.next_subscription_id += 1
+        self._add(subscription)
+        return subscription
+
+    def _add(self, subscription: Dict[str, Any]) -> None:
+        self._index(subscription)
+        # Ленту подписчика пересоберём при следующем чтении
+        self._timelines.pop(subscription["subscriberId"], None)
+        self.repo.emit("create", "subscriptions", subscription)
+
+    def unsubscribe(self, subscriber_id: int, target_id: int) -> bool:
+        subscription = self._subscriptions.get((subscriber_id, target_id))
+        if subscription is None:
+            return False
+        self._remove(subscription)
+        return True
+
+    def _remove(self, subscription: Dict[str, Any]) -> None:
+        target = subscription["targetUserId"]
+        was_fanout = self.is_fanout(target)
+        self._unindex(subscription)
+        self._timelines.pop(subscription["subscriberId"], None)
+        if not was_fanout and self.is_fanout(target):
+            # Автор снова раскладывает посты, но в собранных лентах
+            # его прежних постов нет — эти ленты пересоберутся при чтении
+            self._author_keys.pop(target, None)
+            for follower in self._followers.get(target, ()):
+                self._timelines.pop(follower, None)
+        self.repo.emit("delete", "subscriptions", subscription)
+
+    def _replay(self, change: Dict[str, Any]) -> None:
+        if change["op"] == "del":
+            subscription = self._by_id.get(change["id"])
+            if subscription is not None:
+                self._remove(subscription)
+            return
+        subscription = change["rec"]
+        # Подписки не меняются: повторная запись с тем же id ничего не даёт
+        pair = (subscription["subscriberId"], subscription["targetUserId"])
+        if subscription["id"] in self._by_id or pair in self._subscriptions:
+            return
+        self.next_subscription_id = max(
+            self.next_subscription_id, subscription["id"] + 1
+        )
+        self._add(dict(subscription))
+
+    def page(
+        self, subscriber_id: int, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Page]:
+        # Лента от новых к старым; курсор указывает на последний показанный пост.
+        # Глубина ленты ограничена timeline_size постами
+        before: Optional[SortKey] = None
+        if cursor is not None:
+            direction, before = decode_cursor(cursor)
+            if direction != "next":
+                raise ValueError("Некорректный курсор")
+
+        following = self.following(subscriber_id)
+        sources: List[Iterable[SortKey]] = [
+            _newest_first(self._timeline(subscriber_id), before)
+        ]
+        for author_id in following:
+            if not self.is_fanout(author_id):
+                sources.append(_newest_first(self._keys_of(author_id), before))
+
+        journeys: List[Dict[str, Any]] = []
+        last: Optional[SortKey] = None
+        for key in heapq.merge(*sources, reverse=True):
+            if key == last:
+                # Пост автора, ставшего популярным, уже лежал в собранной ленте
+                continue
+            last = key
+            journey = self.repo.get_journey(key[1])
+            # Пост мог сменить автора после раскладки
+            if journey is None or journey["travelerId"] not in following:
+                continue
+            if len(journeys) == limit:
+                return journeys, Page(
+                    [j["id"] for j in journeys],
+                    encode_cursor("next", sort_key(journeys[-1])),
+                    None,
+                )
+            journeys.append(journey)
+        return journeys, Page([j["id"] for j in journeys], None, None)
+
+    def _timeline(self, subscriber_id: int) -> List[SortKey]:
+        timeline = self._timelines.get(subscriber_id)
+        if timeline is None:
+            timeline = self._timelines[subscriber_id] = self._build_timeline(
+                subscriber_id
+            )
+        return timeline
+
+    def _build_timeline(self, subscriber_id: int) -> List[SortKey]:
+        keys = (
+            sort_key(journey)
+            for author_id in self.following(subscriber_id)
+            if self.is_fanout(author_id)
+            for journey in self.repo.get_journeys_by_traveler(author_id)
+        )
+        return sorted(heapq.nlargest(self.timeline_size, keys))
+
+    def _keys_of(self, author_id: int) -> List[SortKey]:
+        keys = self._author_keys.get(author_id)
+        if keys is None:
+            keys = self._author_keys[author_id] = sorted(
+                sort_key(journey)
+                for journey in self.repo.get_journeys_by_traveler(author_id)
+            )
+        return keys
+
+    def _on_change(self, op: str, collection: str, record: Dict[str, Any]) -> None:
+        if collection == "journeys" and op == "create":
+            self._add_post(record["travelerId"], sort_key(record))
+        elif collection == "journeys" and op == "delete":
+            self._remove_post(record["travelerId"], sort_key(record))
+        elif collection == "journeys" and op == "update":
+            # Смена автора (или даты) — как удаление поста у прежнего автора
+            # и новый пост у нынешнего: он уходит из лент одних подписчиков
+            # и появляется в лентах других
+            previous = self.repo.previous
+            if "travelerId" not in previous and "createdAt" not in previous:
+                return
+            before = {**record, **previous}
+            self._remove_post(before["travelerId"], sort_key(before))
+            self._add_post(record["travelerId"], sort_key(record))
+        elif collection == "travelers" and op == "delete":
+            # Подписки удаляются вместе с пользователем, как ON DELETE CASCADE
+            traveler_id = record["id"]
+            pairs = [(traveler_id, target) for target in self.following(traveler_id)]
+            pairs += [
+                (follower, traveler_id)
+                for follower in self._followers.get(traveler_id, ())
+            ]
+            for pair in pairs:
+                subscription = self._subscriptions.get(pair)
+                if subscription is not None:
+                    self._remove(subscription)
+            self._author_keys.pop(traveler_id, None)
+
+    def _add_post(self, author_id: int, key: SortKey) -> None:
+        if author_id in self._author_keys:
+            insort(self._author_keys[author_id], key)
+        if not self.is_fanout(author_id):
+            return
+        for follower in self._followers.get(author_id, ()):
+            timeline = self._timelines.get(follower)
+            if timeline is None:
+                continue
+            if not timeline or timeline[-1] < key:
+                timeline.append(key)
+            else:
+                insort(timeline, key)
+            if len(timeline) > self.timeline_size:
+                del timeline[0]
+            self.fanout_writes += 1
+
+    def _remove_post(self, author_id: int, key: SortKey) -> None:
+        if author_id in self._author_keys:
+            _discard(self._author_keys[author_id], key)
+        if not self.is_fanout(author_id):
+            return
+        for follower in self._followers.get(author_id, ()):
+            timeline = self._timelines.get(follower)
+            if timeline is not None:
+                _discard(timeline, key)
+
+
+def _newest_first(keys: List[SortKey], before: Optional[SortKey]) -> Iterator[SortKey]:
+    # Ключи старше before, от новых к старым, без копирования списка
+    end = len(keys) if before is None else bisect_left(keys, before)
+    return (keys[position] for position in range(end - 1, -1, -1))
+
+
+def _discard(keys: List[SortKey], key: SortKey) -> None:
+    position = bisect_left(keys, key)
+    if position < len(keys) and keys[position] == key:
+        del keys[position]
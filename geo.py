@@ -0,0 +1,246 @@
+import heapq
+import math
+import os
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pagination import sort_key
+from repository import BlogRepository
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# Сторона ячейки сетки в градусах: 0.5° — около 55 км по широте
+CELL_DEGREES = float(os.environ.get("BLOG_GEO_CELL_DEGREES", "0.5"))
+MAX_RADIUS_KM = 2000.0
+
+Cell = Tuple[int, int]
+
+
+def has_location(journey: Dict[str, Any]) -> bool:
+    return (
+        journey.get("locationLat") is not None
+        and journey.get("locationLng") is not None
+    )
+
+
+class _CellPoints:
+    # Точки одной ячейки по столбцам: id, широта и долгота в радианах,
+    # косинус широты. Расстояния до всех точек ячейки считаются одним
+    # проходом по массивам, без обращения к записям постов
+    __slots__ = ("ids", "lat", "lng", "cos_lat")
+
+    def __init__(self) -> None:
+        self.ids = array("q")
+        self.lat = array("d")
+        self.lng = array("d")
+        self.cos_lat = array("d")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def append(self, journey_id: int, lat: float, lng: float) -> int:
+        self.ids.append(journey_id)
+        self.lat.append(lat)
+        self.lng.append(lng)
+        self.cos_lat.append(math.cos(lat))
+        return len(self.ids) - 1
+
+    def pop(self, position: int) -> Optional[int]:
+        # Удаление за O(1): на место удалённой точки встаёт последняя.
+        # Возвращает id переставленной точки, если перестановка была
+        last = len(self.ids) - 1
+        moved = None
+        if position != last:
+            moved = self.ids[position] = self.ids[last]
+            self.lat[position] = self.lat[last]
+            self.lng[position] = self.lng[last]
+            self.cos_lat[position] = self.cos_lat[last]
+        for column in (self.ids, self.lat, self.lng, self.cos_lat):
+            column.pop()
+        return moved
+
+    def distances(
+        self, lat: float, lng: float, cos_lat: float
+    ) -> Iterable[Tuple[float, int]]:
+        # Гаверсинус без перевода обратно в километры: sin²(Δ/2)-член
+        # монотонен по расстоянию, asin считаем только для попавших в ответ
+        sin = math.sin
+        return (
+            (
+                sin((p_lat - lat) / 2) ** 2
+                + cos_lat * p_cos * sin((p_lng - lng) / 2) ** 2,
+                i,
+            )
+            for i, p_lat, p_lng, p_cos in zip(
+                self.ids, self.lat, self.lng, self.cos_lat
+            )
+        )
+
+
+class GeoIndex:
+    # Сетка по широте и долготе: точка лежит в ячейке (строка, столбец).
+    # Поиск в радиусе смотрит только ячейки, задевающие окружающий
+    # прямоугольник, и стоит пропорционально числу точек рядом, а не всех
+    # постов. Индекс обновляется вместе с постами через слушатель репозитория
+    def __init__(
+        self, repo: BlogRepository, cell_degrees: float = CELL_DEGREES
+    ) -> None:
+        self.repo = repo
+        self.cell_degrees = cell_degrees
+        self._columns = math.ceil(360 / cell_degrees)
+        self._rows = math.ceil(180 / cell_degrees)
+        self._cells: Dict[Cell, _CellPoints] = {}
+        # id поста -> (ячейка, позиция в ней)
+        self._positions: Dict[int, Tuple[Cell, int]] = {}
+        for journey in repo.journeys:
+            if has_location(journey):
+                self._add(journey)
+        repo.add_listener(self._on_change)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def _cell(self, lat: float, lng: float) -> Cell:
+        row = min(int((lat + 90) / self.cell_degrees), self._rows - 1)
+        column = int((lng + 180) / self.cell_degrees) % self._columns
+        return row, column
+
+    def _add(self, journey: Dict[str, Any]) -> None:
+        lat, lng = journey["locationLat"], journey["locationLng"]
+        cell = self._cell(lat, lng)
+        points = self._cells.get(cell)
+        if points is None:
+            points = self._cells[cell] = _CellPoints()
+        position = points.append(journey["id"], math.radians(lat), math.radians(lng))
+        self._positions[journey["id"]] = (cell, position)
+
+    def _remove(self, journey_id: int) -> None:
+        entry = self._positions.pop(journey_id, None)
+        if entry is None:
+            return
+        cell, position = entry
+        points = self._cells[cell]
+        moved = points.pop(position)
+        if moved is not None:
+            self._positions[moved] = (cell, position)
+        if not points:
+            del self._cells[cell]
+
+    def _on_change(self, op: str, collection: str, record: Dict[str, Any]) -> None:
+        if collection != "journeys" or op == "counters":
+            return
+        # При правке точку проще переложить: координаты могли смениться
+        self._remove(record["id"])
+        if op != "delete" and has_location(record):
+            self._add(record)
+
+    def _cells_in(
+        self, south: float, west: float, north: float, east: float
+    ) -> Iterable[Cell]:
+        # Ячейки прямоугольника; west > east — прямоугольник через 180-й меридиан.
+        # Если ячеек в прямоугольнике больше, чем занятых, перебираем занятые
+        first_row, first_column = self._cell(south, west)
+        last_row, last_column = self._cell(north, east)
+        if west <= east:
+            # east = 180 попадает в нулевой столбец, а нужен последний
+            last_column = min(int((east + 180) / self.cell_degrees), self._columns - 1)
+            columns = last_column - first_column + 1
+        else:
+            columns = (last_column - first_column) % self._columns + 1
+            if columns == 1:
+                columns = self._columns
+        if (last_row - first_row + 1) * columns > len(self._cells):
+            return [
+                (row, column)
+                for row, column in self._cells
+                if first_row <= row <= last_row
+                and (column - first_column) % self._columns < columns
+            ]
+        return [
+            (row, (first_column + offset) % self._columns)
+            for row in range(first_row, last_row + 1)
+            for offset in range(columns)
+            if (row, (first_column + offset) % self._columns) in self._cells
+        ]
+
+    def nearby(
+        self, lat: float, lng: float, radius_km: float, limit: int
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        # Ближайшие посты в радиусе, по возрастанию расстояния (км)
+        radius_km = min(radius_km, MAX_RADIUS_KM)
+        lat_span = radius_km / KM_PER_DEGREE
+        south, north = lat - lat_span, lat + lat_span
+        if south <= -90 or north >= 90:
+            # Круг задевает полюс: нужны все долготы
+            west, east = -180.0, 180.0
+        else:
+            # Шире всего круг на самой далёкой от экватора широте
+            widest = max(abs(south), abs(north))
+            lng_span = lat_span / math.cos(math.radians(widest))
+            if lng_span >= 180:
+                west, east = -180.0, 180.0
+            else:
+                west = _wrap(lng - lng_span)
+                east = _wrap(lng + lng_span)
+        cells = self._cells_in(max(south, -90.0), west, min(north, 90.0), east)
+
+        lat_r, lng_r = math.radians(lat), math.radians(lng)
+        cos_lat = math.cos(lat_r)
+        threshold = math.sin(radius_km / EARTH_RADIUS_KM / 2) ** 2
+        candidates = (
+            item
+            for cell in cells
+            for item in self._cells[cell].distances(lat_r, lng_r, cos_lat)
+            if item[0] <= threshold
+        )
+        results = []
+        for h, journey_id in heapq.nsmallest(limit, candidates):
+            journey = self.repo.get_journey(journey_id)
+            if journey is not None:
+                distance = 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(h, 1.0)))
+                results.append((journey, distance))
+        return results
+
+    def within(
+        self, south: float, west: float, north: float, east: float, limit: int
+    ) -> List[Dict[str, Any]]:
+        # Посты в окне карты, от новых к старым
+        if south > north:
+            raise ValueError("south больше north")
+        south_r, north_r = math.radians(south), math.radians(north)
+        west_r, east_r = math.radians(west), math.radians(east)
+        crosses = west > east
+
+        def inside(p_lat: float, p_lng: float) -> bool:
+            if not south_r <= p_lat <= north_r:
+                return False
+            if crosses:
+                return p_lng >= west_r or p_lng <= east_r
+            return west_r <= p_lng <= east_r
+
+        journeys = (
+            self.repo.get_journey(journey_id)
+            for cell in self._cells_in(south, west, north, east)
+            for journey_id, p_lat, p_lng in zip(
+                self._cells[cell].ids, self._cells[cell].lat, self._cells[cell].lng
+            )
+            if inside(p_lat, p_lng)
+        )
+        return heapq.nlargest(
+            limit,
+            (journey for journey in journeys if journey is not None),
+            key=sort_key,
+        )
+
+
+def _wrap(lng: float) -> float:
+    return (lng + 180) % 360 - 180
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    h = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(h, 1.0)))
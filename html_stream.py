@@ -0,0 +1,102 @@
+import asyncio
+import gzip
+import os
+import zlib
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple
+
+from jinja2 import Environment, FileSystemBytecodeCache, Template
+
+# Скомпилированные шаблоны переживают перезапуск: при старте читаются
+# отсюда, а не разбираются заново. Устаревшие файлы Jinja узнаёт сама
+TEMPLATE_CACHE_DIR = os.environ.get("BLOG_TEMPLATE_CACHE_DIR", "blog_templates.cache")
+# Сколько символов HTML копится перед отправкой: куски по одному тегу
+# стоили бы по вызову send и сжатия на каждый
+HTML_CHUNK_SIZE = int(os.environ.get("BLOG_HTML_CHUNK_SIZE", "16384"))
+# Средний уровень: страница сжимается в несколько раз, а процессор почти
+# не замечает
+GZIP_LEVEL = 6
+# charset Starlette допишет сама
+HTML_MEDIA_TYPE = "text/html"
+
+
+class CachedPage(NamedTuple):
+    # Готовая страница в кэше — сразу в двух видах, сжимать при каждом
+    # ответе не нужно
+    body: bytes
+    gzipped: bytes
+
+
+def cached_page_variants(body: bytes) -> CachedPage:
+    # mtime=0: одинаковые страницы дают одинаковые байты
+    return CachedPage(body, gzip.compress(body, GZIP_LEVEL, mtime=0))
+
+
+def precompile_templates(env: Environment, directory: str = TEMPLATE_CACHE_DIR) -> int:
+    # Компилируем все шаблоны при старте, а не на первом запросе к каждому.
+    # Вызывать до первого get_template: уже загруженные в кэш не попадут
+    os.makedirs(directory, exist_ok=True)
+    env.bytecode_cache = FileSystemBytecodeCache(directory)
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    # "gzip, deflate, br" или "gzip;q=0.8"; q=0 — явный отказ
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() != "gzip":
+            continue
+        params = params.strip().lower()
+        if not params.startswith("q="):
+            return True
+        try:
+            return float(params[2:]) > 0
+        except ValueError:
+            return False
+    return False
+
+
+async def render_chunks(
+    template: Template, context: Dict[str, Any]
+) -> AsyncIterator[bytes]:
+    # Шаблон рендерится по мере отправки: первый байт уходит сразу, а в
+    # памяти лишь кусок страницы. Генератор асинхронный, как у выгрузки:
+    # шаблон читает записи из цикла событий, а не из потока
+    buffer: List[str] = []
+    size = 0
+    for piece in template.generate(context):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= HTML_CHUNK_SIZE:
+            yield "".join(buffer).encode("utf-8")
+            buffer.clear()
+            size = 0
+            # Отправка куска обычно не ждёт сокета: уступаем цикл событий
+            await asyncio.sleep(0)
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    # Каждый кусок сжимается и досылается сразу (Z_SYNC_FLUSH), иначе
+    # zlib копил бы вывод, и сжатие съело бы выигрыш во времени до первого байта
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def collect_chunks(
+    chunks: AsyncIterator[bytes], done: Callable[[bytes], None]
+) -> AsyncIterator[bytes]:
+    # Отдаёт куски дальше и собирает страницу целиком для кэша. Оборванная
+    # отправка не вызывает done: недописанная страница в кэш не попадёт
+    parts: List[bytes] = []
+    async for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    done(b"".join(parts))
@@ -0,0 +1,96 @@
+import json
+import os
+from collections import OrderedDict
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from metrics import timed
+
+JSON_MEDIA_TYPE = "application/json"
+# Сколько записей держать закодированными: без предела кэш рос бы до копии
+# всех данных в JSON рядом с самими данными
+JSON_CACHE_SIZE = int(os.environ.get("BLOG_JSON_CACHE_SIZE", "50000"))
+
+
+def json_default(value: Any) -> str:
+    # Даты — как у jsonable_encoder, чтобы ответы не отличались
+    if isinstance(value, datetime):
+        return value.isoformat()
+    # Компактные записи (records.Record) — mapping, но не dict
+    if isinstance(value, Mapping):
+        return dict(value.items())
+    raise TypeError(f"Не умею сериализовать {type(value).__name__}")
+
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    # Те же параметры, что у JSONResponse
+    return json.dumps(
+        record,
+        default=json_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class JsonCache:
+    # Готовый JSON записей (LRU). Запись кодируется при первом запросе
+    # и заново — только после изменения, о котором сообщает репозиторий,
+    # или после вытеснения давно не запрошенных
+    def __init__(
+        self,
+        hidden_fields: Optional[Dict[str, Tuple[str, ...]]] = None,
+        max_entries: int = JSON_CACHE_SIZE,
+    ) -> None:
+        # Поля, которые не отдаются наружу (например, хэш пароля)
+        self.hidden_fields = hidden_fields or {}
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def encode(self, collection: str, record: Dict[str, Any]) -> bytes:
+        key = (collection, record["id"])
+        encoded = self._entries.get(key)
+        if encoded is None:
+            self.misses += 1
+            with timed("json_encode"):
+                encoded = self._entries[key] = encode_record(
+                    self.public(collection, record)
+                )
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return encoded
+
+    def public(self, collection: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        hidden = self.hidden_fields.get(collection)
+        if not hidden:
+            return record
+        return {field: value for field, value in record.items() if field not in hidden}
+
+    def encode_list(self, collection: str, records: Iterable[Dict[str, Any]]) -> bytes:
+        return b"[" + b",".join(self.encode(collection, r) for r in records) + b"]"
+
+    def invalidate(self, collection: str, record_id: int) -> None:
+        self._entries.pop((collection, record_id), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
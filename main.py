@@ -1,8 +1,35 @@
-from storage import save_data, load_data
-from fastapi import FastAPI, HTTPException, Request, Form
+from storage import open_store, SEQUENCES
+from repository import BlogRepository
+from persistence import start_writer, COMMIT_WINDOW
+from pagination import Page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from render_cache import RenderCache, PAGE_CACHE_SIZE, FRAGMENT_CACHE_SIZE
+from html_stream import (
+    CachedPage, HTML_MEDIA_TYPE, accepts_gzip, cached_page_variants, collect_chunks, gzip_chunks, precompile_templates,
+    render_chunks
+)
+from markupsafe import Markup
+from search import open_index
+from counters import JourneyCounters, FLUSH_INTERVAL as COUNTER_FLUSH_INTERVAL, TOP_K
+from json_cache import JsonCache, JSON_MEDIA_TYPE
+from passwords import PasswordHasher, HasherBusy, hash_password
+from bulk import BulkImporter, NDJSON_MEDIA_TYPE, export_lines, iter_lines
+from comments import CommentTree, Thread, REPLIES_PREVIEW, MAX_REPLIES
+from feeds import FeedIndex
+from categories import CategoryIndex
+from favorites import FavoriteIndex
+from geo import GeoIndex, MAX_RADIUS_KM
+from tombstones import COMPACT_INTERVAL, BACKGROUND_COMPACT_RATIO
+from cluster import WorkerSync, WORKERS, serve
+from versions import ChangeLog, ChangesExpired, CHANGES_PAGE_SIZE, MAX_CHANGES_PAGE_SIZE
+from metrics import (
+    MetricsMiddleware, SlowRequestProfiler, REGISTRY, CONTENT_TYPE, PROFILE_SLOW_MS, instrument_templates, timed
+)
+from admission import AdmissionMiddleware, load_config as load_admission_config
+from fastapi import FastAPI, HTTPException, Request, Form, Query, Response
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse
-from pydantic import BaseModel, EmailStr, validator
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, EmailStr, ValidationError, validator
 from datetime import datetime
 import threading
 import uvicorn
@@ -10,12 +37,40 @@ import os
 import json
 import webbrowser
 import time
-from typing import List, Dict, Any, Optional, Union
-
-
-app = FastAPI(title="апи самого крутого блога")
+import asyncio
+import re
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, Union, AsyncIterator, Callable, Hashable, Set, Tuple
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    writer.start()
+    counter_flusher = asyncio.create_task(flush_counters_periodically())
+    compactor = asyncio.create_task(compact_periodically())
+    # Несколько процессов: простаивающий тоже дочитывает чужие изменения
+    poller = asyncio.create_task(sync.poll_periodically()) if sync.shared else None
+    yield
+    counter_flusher.cancel()
+    compactor.cancel()
+    if poller is not None:
+        poller.cancel()
+    async with sync.exclusive():
+        counters.flush()
+        await persist()
+    # Не выходим, пока очередь изменений не сброшена на диск
+    await asyncio.to_thread(writer.stop)
+    await asyncio.to_thread(search_index.save)
+    await asyncio.to_thread(hasher.shutdown)
+
+
+app = FastAPI(title="апи самого крутого блога", lifespan=lifespan)
 
 templates = Jinja2Templates(directory="templates")
+# Время рендеринга каждого шаблона — в /metrics
+instrument_templates(templates.env)
+# Все шаблоны компилируются сразу, байт-код сохраняется между запусками
+precompile_templates(templates.env)
 current_dir = os.path.dirname(os.path.abspath(__file__))
 template_dir = os.path.join(current_dir, "templates")
 
@@ -44,7 +99,33 @@ class TravelerUpdate(BaseModel):
     password: Optional[str] = None
 
 
-class Journey(BaseModel):
+class LoginRequest(BaseModel):
+    email: EmailStr
+    password: str
+
+
+class JourneyLocation(BaseModel):
+    # Координаты места: либо обе, либо ни одной
+    locationLat: Optional[float] = None
+    locationLng: Optional[float] = None
+
+    @validator("locationLat")
+    def validate_location_lat(cls, v: Optional[float]) -> Optional[float]:
+        if v is not None and not -90 <= v <= 90:
+            raise ValueError("Широта должна быть от -90 до 90")
+        return v
+
+    @validator("locationLng", always=True)
+    def validate_location_lng(cls, v: Optional[float], values: Dict[str, Any]) -> Optional[float]:
+        if v is not None and not -180 <= v <= 180:
+            raise ValueError("Долгота должна быть от -180 до 180")
+        # Если широта не прошла проверку, её нет в values — об этом уже сказано
+        if "locationLat" in values and (v is None) != (values["locationLat"] is None):
+            raise ValueError("Укажите и широту, и долготу")
+        return v
+
+
+class Journey(JourneyLocation):
     travelerId: int
     destination: str
     story: str
@@ -62,11 +143,93 @@ class Journey(BaseModel):
         return v
 
 
-class JourneyUpdate(BaseModel):
+class JourneyUpdate(JourneyLocation):
     destination: Optional[str] = None
     story: Optional[str] = None
 
 
+class Category(BaseModel):
+    name: str
+    slug: str
+    description: Optional[str] = None
+
+    @validator("name")
+    def validate_name(cls, v: str) -> str:
+        if len(v) < 2:
+            raise ValueError("Название категории должно быть не менее 2 символов")
+        return v
+
+    @validator("slug")
+    def validate_slug(cls, v: str) -> str:
+        if not v or not all(ch.isascii() and (ch.isalnum() or ch == "-") for ch in v):
+            raise ValueError("Slug может содержать только латиницу, цифры и дефис")
+        return v.lower()
+
+
+class JourneyCategories(BaseModel):
+    categoryIds: List[int]
+
+
+class Favorite(BaseModel):
+    journeyId: int
+
+
+class Subscription(BaseModel):
+    targetUserId: int
+
+
+class Comment(BaseModel):
+    authorId: int
+    content: str
+    parentId: Optional[int] = None
+
+    @validator("content")
+    def validate_content(cls, v: str) -> str:
+        if not v.strip():
+            raise ValueError("Комментарий не может быть пустым")
+        return v
+
+
+# Сколько записей можно запросить или изменить одним пакетным запросом
+MAX_BATCH_SIZE = 1000
+BATCH_OPERATIONS = ("create", "update", "delete")
+
+
+class BatchGet(BaseModel):
+    ids: List[int]
+
+    @validator("ids")
+    def validate_ids(cls, v: List[int]) -> List[int]:
+        if len(v) > MAX_BATCH_SIZE:
+            raise ValueError(f"Не более {MAX_BATCH_SIZE} id за запрос")
+        return v
+
+
+class BatchOperation(BaseModel):
+    # data — поля для create/update, проверяются моделью записи
+    op: str
+    id: Optional[int] = None
+    data: Dict[str, Any] = {}
+
+    @validator("op")
+    def validate_op(cls, v: str) -> str:
+        if v not in BATCH_OPERATIONS:
+            raise ValueError("Операция должна быть create, update или delete")
+        return v
+
+
+class Batch(BaseModel):
+    operations: List[BatchOperation]
+
+    @validator("operations")
+    def validate_operations(cls, v: List[BatchOperation]) -> List[BatchOperation]:
+        if not v:
+            raise ValueError("Пакет не может быть пустым")
+        if len(v) > MAX_BATCH_SIZE:
+            raise ValueError(f"Не более {MAX_BATCH_SIZE} операций за запрос")
+        return v
+
+
 # Инициализация данных
 travelers: List[Dict[str, Any]] = []
 journeys: List[Dict[str, Any]] = []
@@ -76,77 +239,504 @@ DATA_FILE: str = "travel_blog.json"
 
 
 # Загружаем данные
-travelers, journeys, next_traveler_id, next_journey_id = load_data()
-
-if not travelers:
-    travelers.append({
-        "id": 1,
-        "email": "wanderer@travel.com",
-        "username": "Челик",
-        "password": "wander123",
-        "createdAt": datetime.now(),
-        "updatedAt": datetime.now()
-    })
-    next_traveler_id = 2
-
-if not journeys:
-    journeys.append({
-        "id": 1,
-        "travelerId": 1,
-        "destination": "Горы Алтая",
-        "story": "Мои первые впечатления от путешествия по Алтайским горам...",
-        "createdAt": datetime.now(),
-        "updatedAt": datetime.now()
-    })
-    next_journey_id = 2
-    save_data(travelers, journeys, next_traveler_id, next_journey_id)
+# При BLOG_WORKERS > 1 процессы uvicorn пишут в общий журнал по очереди
+store = open_store(shared=WORKERS > 1)
+with timed("storage_load"):
+    travelers, journeys, next_traveler_id, next_journey_id, collections = store.load()
+repo = BlogRepository(travelers, journeys, next_traveler_id, next_journey_id)
+# Дальше записи живут только в репозитории: удалённые освобождаются при сжатии
+del travelers, journeys
+# Комментарии: деревья по постам, ветка выбирается одним срезом
+comment_tree = CommentTree(repo, *collections["comments"])
+# Ленты подписок: новые посты раскладываются по лентам подписчиков
+feeds = FeedIndex(repo, *collections["subscriptions"])
+# Категории и избранное: множества по категориям и пользователям,
+# чтобы отвечать за страницу постов одним вызовом
+category_records, next_category_id = collections["categories"]
+link_records, next_link_id = collections["journey_categories"]
+category_index = CategoryIndex(
+    repo, category_records, link_records, next_category_id, next_link_id
+)
+favorite_index = FavoriteIndex(repo, *collections["favorites"])
+# Сетка по координатам: посты рядом с точкой и в окне карты
+geo_index = GeoIndex(repo)
+# Чужие изменения из общего журнала применяются через те же индексы
+sync = WorkerSync(repo, store)
+
+# Начальные данные создаёт только первый из одновременно стартовавших процессов
+with store.exclusive():
+    sync.catch_up(locked=True)
+    if not repo.travelers:
+        repo.create_traveler("wanderer@travel.com", "Челик", hash_password("wander123"))
+
+    if not repo.journeys:
+        repo.create_journey(
+            1, "Горы Алтая", "Мои первые впечатления от путешествия по Алтайским горам..."
+        )
+
+    store.apply(repo.drain_changes())
+# Общий журнал пишется под блокировкой: ждать попутные изменения незачем
+writer = start_writer(store, window=0 if sync.shared else COMMIT_WINDOW)
+
+
+async def persist(durable: bool = False) -> None:
+    # durable=True — дожидаемся fsync, иначе запись уходит в фоне.
+    # С общим журналом ждём всегда: запись должна лечь до снятия блокировки
+    future = writer.submit(repo.drain_changes(), durable=durable)
+    if durable or sync.shared:
+        await asyncio.wrap_future(future)
+
+
+# Изменения, которые сами берут блокировку журнала, или вовсе не трогают
+# общие данные (лайк копится в памяти, batch-get только читает). Путь
+# сравнивается с шаблоном целиком: "/api/travelers/" не покрывает ".../batch".
+# Регистрация, правка пользователя и пакетная запись пользователей хэшируют
+# пароли до блокировки (scrypt — десятки миллисекунд на пароль, остальные
+# процессы столько не ждут) и берут её сами. Пакет под блокировкой
+# проверяется заново и применяется целиком, так что он остаётся атомарным.
+# Под блокировкой прослойки обработчик взять её повторно не смог бы
+UNLOCKED_WRITES = [
+    ("POST", re.compile(r"/api/travelers/")),
+    ("POST", re.compile(r"/api/travelers/batch")),
+    ("PUT", re.compile(r"/api/travelers/\d+")),
+    ("POST", re.compile(r"/api/(journeys|travelers)/batch-get")),
+    ("POST", re.compile(r"/api/login")),
+    ("POST", re.compile(r"/api/journeys/\d+/like")),
+]
+
+
+async def sync_workers(request: Request, call_next: Callable[[Request], Any]) -> Response:
+    # С несколькими процессами: чтение видит изменения, записанные другими,
+    # а изменение выполняется под блокировкой журнала целиком
+    sync.catch_up()
+    method, path = request.method, request.url.path
+    if method in ("GET", "HEAD", "OPTIONS") or any(
+        method == unlocked and pattern.fullmatch(path)
+        for unlocked, pattern in UNLOCKED_WRITES
+    ):
+        return await call_next(request)
+    async with sync.exclusive():
+        response = await call_next(request)
+        # Изменения, которые обработчик не сохранил сам
+        await persist()
+    return response
+
+
+if sync.shared:
+    # Одному процессу прослойка не нужна
+    app.middleware("http")(sync_workers)
+
+# Контроль допуска — снаружи блокировки журнала: запрос в очереди допуска
+# её не держит. Лимиты классов маршрутов — BLOG_ADMISSION_CONFIG
+app.add_middleware(AdmissionMiddleware, config=load_admission_config())
+
+# Метрики добавляются последними, то есть снаружи: время ответа включает
+# ожидание блокировки журнала и очереди допуска, отказы тоже считаются.
+# BLOG_PROFILE_SLOW_MS включает профилировщик
+app.add_middleware(
+    MetricsMiddleware,
+    profiler=SlowRequestProfiler(PROFILE_SLOW_MS / 1000) if PROFILE_SLOW_MS else None,
+)
+
+
+# Кэш готового HTML: целые страницы и карточки постов/пользователей
+page_cache: RenderCache[CachedPage] = RenderCache(PAGE_CACHE_SIZE)
+fragment_cache: RenderCache[str] = RenderCache(FRAGMENT_CACHE_SIZE)
+
+
+def invalidate_rendered(op: str, collection: str, record: Dict[str, Any]) -> None:
+    # Сбрасываем только те страницы и карточки, где выводилась запись.
+    # Просмотры и лайки в HTML не выводятся
+    if op == "counters":
+        return
+    tags = []
+    if collection == "journeys":
+        tags.append(f"journey:{record['id']}")
+        if op == "create":
+            # Новый пост обычно попадает в конец ленты — на последнюю
+            # страницу. Пост с датой в прошлом (импорт) встаёт в середину
+            # и сдвигает все страницы после себя: сбрасываем ленту целиком
+            tags.append("journeys:tail" if repo.is_latest_journey(record) else "journeys")
+    elif collection == "travelers":
+        tags += [f"traveler:{record['id']}", "travelers"]
+    elif collection == "comments":
+        tags.append(f"comments:{record['journeyId']}")
+    elif collection == "categories":
+        tags += [f"category:{record['id']}", "categories"]
+    elif collection == "journey_categories":
+        # Меняются и карточка поста, и счётчики в боковой панели
+        tags += [f"journey:{record['journeyId']}", "categories"]
+    for cache in (page_cache, fragment_cache):
+        for tag in tags:
+            cache.invalidate(tag)
+
+
+repo.add_listener(invalidate_rendered)
+
+# Готовый JSON записей для API: списки склеиваются из кусков байтов
+json_cache = JsonCache(hidden_fields={"travelers": ("password",)})
+
+
+def invalidate_json(op: str, collection: str, record: Dict[str, Any]) -> None:
+    json_cache.invalidate(collection, record["id"])
+
+
+repo.add_listener(invalidate_json)
+
+
+def json_response(content: bytes) -> Response:
+    return Response(content=content, media_type=JSON_MEDIA_TYPE)
+
+
+# Версии изменений: ETag ответов API и дельты для GET /api/changes
+change_log = ChangeLog(repo, *store.tombstones())
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    # If-None-Match сравнивается слабо (RFC 9110): W/"v" совпадает с "v"
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return None
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    if "*" in tags or etag in tags:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+def collection_etag() -> str:
+    # Списки меняются вместе с глобальной версией: проверка — до сборки страницы
+    return f'"{change_log.version}"'
+
+
+def record_etag(record: Dict[str, Any]) -> str:
+    return f'"{change_log.record_version(record)}"'
+
+
+def tagged_json(content: bytes, etag: str) -> Response:
+    response = json_response(content)
+    response.headers["ETag"] = etag
+    return response
+
+
+# Пароли хэшируются в пуле потоков, чтобы не задерживать остальные запросы
+hasher = PasswordHasher()
+
+
+@app.exception_handler(HasherBusy)
+async def hasher_busy_handler(request: Request, exc: HasherBusy) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Сервер перегружен, повторите попытку позже"},
+        headers={"Retry-After": "1"}
+    )
+
+# Поисковый индекс: читаем сохранённый и доиндексируем только изменения
+search_index = open_index(repo.journeys)
+
+
+def update_search_index(op: str, collection: str, record: Dict[str, Any]) -> None:
+    if collection != "journeys" or op == "counters":
+        return
+    if op == "delete":
+        search_index.remove(record["id"])
+    else:
+        search_index.add(record)
+
+
+repo.add_listener(update_search_index)
+
+
+# Просмотры и лайки: приращения в памяти, в посты — раз в COUNTER_FLUSH_INTERVAL
+counters = JourneyCounters(repo)
+
+
+async def flush_counters_periodically() -> None:
+    while True:
+        await asyncio.sleep(COUNTER_FLUSH_INTERVAL)
+        if not counters.has_pending():
+            continue
+        # Сброс прибавляет к значениям в постах: сначала догоняем другие процессы
+        async with sync.exclusive():
+            if counters.flush():
+                await persist()
+
+
+async def compact_periodically() -> None:
+    # Удаление только помечает запись в списке; сжатие — вне запросов.
+    # Данные не меняются, блокировка журнала не нужна
+    while True:
+        await asyncio.sleep(COMPACT_INTERVAL)
+        repo.compact(BACKGROUND_COMPACT_RATIO)
+
+
+def search_journeys(q: str, limit: int) -> List[Dict[str, Any]]:
+    results = []
+    for journey_id, _ in search_index.search(q, limit):
+        journey = repo.get_journey(journey_id)
+        if journey is not None:
+            results.append(journey)
+    return results
+
+
+def stream_page(
+        request: Request,
+        template_name: str,
+        context: Dict[str, Any],
+        done: Optional[Callable[[bytes], None]] = None
+) -> StreamingResponse:
+    # Страница уходит по мере рендеринга, сжатой — если клиент это принимает
+    chunks = render_chunks(templates.get_template(template_name), context)
+    if done is not None:
+        chunks = collect_chunks(chunks, done)
+    headers = {"Vary": "Accept-Encoding"}
+    if accepts_gzip(request.headers.get("accept-encoding", "")):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=HTML_MEDIA_TYPE, headers=headers)
+
+
+def cached_page(
+        request: Request,
+        key: Hashable,
+        render: Callable[[], Tuple[str, Dict[str, Any], Set[str]]]
+) -> Response:
+    # render возвращает шаблон, контекст и теги страницы. Из кэша страница
+    # отдаётся готовыми байтами, при промахе — потоком и попадает в кэш,
+    # когда отправлена целиком
+    page = page_cache.get(key)
+    if page is not None:
+        if accepts_gzip(request.headers.get("accept-encoding", "")):
+            return Response(page.gzipped, media_type=HTML_MEDIA_TYPE, headers={
+                "Content-Encoding": "gzip", "Vary": "Accept-Encoding"
+            })
+        return Response(page.body, media_type=HTML_MEDIA_TYPE, headers={"Vary": "Accept-Encoding"})
+    template_name, context, tags = render()
+    # Пока страница отправлялась, записи могли измениться — тогда в кэш её
+    # не кладём, а отрендерим заново при следующем запросе
+    epoch = page_cache.epoch
+
+    def store(body: bytes) -> None:
+        page_cache.put(key, cached_page_variants(body), tags, epoch)
+
+    return stream_page(request, template_name, context, store)
+
+
+def render_fragment(key: Hashable, template_name: str, context: Dict[str, Any], tags: Set[str]) -> Markup:
+    html = fragment_cache.get(key)
+    if html is None:
+        html = templates.get_template(template_name).render(context)
+        fragment_cache.put(key, html, tags)
+    return Markup(html)
+
+
+def journey_tags(journey: Dict[str, Any]) -> Set[str]:
+    return {f"journey:{journey['id']}", f"traveler:{journey['travelerId']}"}
+
+
+def journey_card(journey: Dict[str, Any], categories: List[Dict[str, Any]]) -> Tuple[Markup, Set[str]]:
+    tags = journey_tags(journey) | {f"category:{category['id']}" for category in categories}
+    return render_fragment(("journey-card", journey["id"]), "_journey_card.html", {
+        "journey": journey,
+        "traveler": repo.get_traveler(journey["travelerId"]),
+        "categories": categories
+    }, tags), tags
+
+
+def journey_cards(journeys_page: List[Dict[str, Any]]) -> Tuple[List[Markup], Set[str]]:
+    # Категории всей страницы — одним обращением к индексу, а не по посту
+    categories = category_index.categories_for(journey["id"] for journey in journeys_page)
+    cards = []
+    tags: Set[str] = set()
+    for journey in journeys_page:
+        card, card_tags = journey_card(journey, categories[journey["id"]])
+        cards.append(card)
+        tags |= card_tags
+    return cards, tags
+
+
+def traveler_card(traveler: Dict[str, Any]) -> Markup:
+    return render_fragment(("traveler-card", traveler["id"]), "_traveler_card.html", {
+        "traveler": traveler
+    }, {f"traveler:{traveler['id']}"})
+
+
+API_INFO_SAMPLE_SIZE = 5
+
+
+def page_urls(request: Request, page: Page) -> Dict[str, Optional[str]]:
+    # Относительные ссылки: страница из кэша годится для любого хоста
+    def url(cursor: str) -> str:
+        return f"{request.url.path}?{request.url.include_query_params(cursor=cursor).query}"
+
+    return {
+        rel: url(cursor) if cursor else None
+        for rel, cursor in (("next", page.next_cursor), ("prev", page.prev_cursor))
+    }
+
+
+def set_link_header(request: Request, response: Response, page: Page) -> None:
+    links = [f'<{url}>; rel="{rel}"' for rel, url in page_urls(request, page).items() if url]
+    if links:
+        response.headers["Link"] = ", ".join(links)
+
+
+def comment_entry(comment: Dict[str, Any], depth: int, hidden: int = 0) -> Dict[str, Any]:
+    # hidden — сколько ответов ветки не поместилось в превью
+    return {
+        "comment": comment,
+        "author": repo.get_traveler(comment["authorId"]),
+        "depth": depth,
+        "hidden": hidden
+    }
+
+
+def comment_entries(threads: List[Thread]) -> List[Dict[str, Any]]:
+    # Ветки разворачиваются в плоский список: шаблон лишь сдвигает по глубине
+    entries = []
+    for thread in threads:
+        entries.append(comment_entry(thread.comment, 0, thread.reply_count - len(thread.replies)))
+        entries += [comment_entry(reply, depth) for reply, depth in thread.replies]
+    return entries
+
+
+def encode_comment_items(items: List[Tuple[Dict[str, Any], int]]) -> List[bytes]:
+    return [
+        b'{"depth":%d,"comment":%s}' % (depth, json_cache.encode("comments", comment))
+        for comment, depth in items
+    ]
 
 
 @app.get("/")
-async def home_page(request: Request) -> HTMLResponse:
-    journeys_with_authors = []
-    for journey in journeys:
-        traveler = next((t for t in travelers if t["id"] == journey["travelerId"]), None)
-        journeys_with_authors.append({
-            "journey": journey,
-            "traveler": traveler
+async def home_page(
+        request: Request,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        q: Optional[str] = None,
+        category: Optional[str] = None
+) -> Response:
+    if q:
+        # Результаты поиска не кэшируем: их меняет любая правка постов
+        return stream_page(request, "index.html", {
+            "cards": journey_cards(search_journeys(q, limit))[0],
+            "categories": category_index.counts(),
+            "page_urls": {},
+            "q": q
         })
-    return templates.TemplateResponse("index.html", {
-        "request": request,
-        "journeys": journeys_with_authors
-    })
+
+    selected = category_index.get_by_slug(category) if category else None
+    if category and selected is None:
+        return HTMLResponse(
+            "<h1>404 - Категория не найдена</h1><p>Такой категории не существует</p><a href='/'>На главную</a>",
+            status_code=404
+        )
+
+    def render() -> Tuple[str, Dict[str, Any], Set[str]]:
+        if selected is not None:
+            journeys_page, page = category_index.page_journeys(selected["id"], limit, cursor)
+        else:
+            journeys_page, page = repo.page_journeys(limit, cursor)
+        cards, tags = journey_cards(journeys_page)
+        # Боковая панель с числом постов по категориям есть на каждой странице
+        tags.add("categories")
+        tags.add("journeys")
+        if page.next_cursor is None:
+            tags.add("journeys:tail")
+        return "index.html", {
+            "cards": cards,
+            "categories": category_index.counts(),
+            "selected_category": selected,
+            "page_urls": page_urls(request, page)
+        }, tags
+
+    try:
+        return cached_page(request, ("home", limit, cursor, category), render)
+    except ValueError:
+        return HTMLResponse(
+            "<h1>400 - Некорректная ссылка</h1><p>Такой страницы не существует</p><a href='/'>На главную</a>",
+            status_code=400
+        )
 
 
 @app.get("/api-info", response_class=HTMLResponse)
-async def api_info_page(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse("api_info.html", {
-        "request": request,
-        "travelers": travelers,
-        "journeys": journeys
+async def api_info_page(request: Request) -> Response:
+    travelers_sample, _ = repo.page_travelers(API_INFO_SAMPLE_SIZE)
+    journeys_sample, _ = repo.page_journeys(API_INFO_SAMPLE_SIZE)
+    return stream_page(request, "api_info.html", {
+        "traveler_count": len(repo.travelers),
+        "journey_count": len(repo.journeys),
+        "travelers": jsonable_encoder([json_cache.public("travelers", t) for t in travelers_sample]),
+        "journeys": jsonable_encoder(journeys_sample)
     })
 
 
 @app.get("/users", response_class=HTMLResponse)
-async def users_page(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse("users.html", {
-        "request": request,
-        "travelers": travelers
-    })
+async def users_page(request: Request) -> Response:
+    def render() -> Tuple[str, Dict[str, Any], Set[str]]:
+        return "users.html", {
+            "cards": [traveler_card(traveler) for traveler in repo.travelers]
+        }, {"travelers"}
+
+    return cached_page(request, "users", render)
 
 
 @app.get("/journeys/{journey_id}")
-async def view_journey(request: Request, journey_id: int) -> HTMLResponse:
-    journey = next((j for j in journeys if j["id"] == journey_id), None)
+async def view_journey(request: Request, journey_id: int, cursor: Optional[str] = None) -> Response:
+    journey = repo.get_journey(journey_id)
     if not journey:
         return HTMLResponse(
             "<h1>404 - Пост не найден</h1><p>Такой публикации не существует</p><a href='/'>На главную</a>",
             status_code=404
         )
-    traveler = next((t for t in travelers if t["id"] == journey["travelerId"]), None)
-    return templates.TemplateResponse("post.html", {
-        "request": request,
-        "journey": journey,
-        "traveler": traveler
+    counters.increment("views", journey)
+
+    def render() -> Tuple[str, Dict[str, Any], Set[str]]:
+        threads, page = comment_tree.page_threads(journey_id, DEFAULT_PAGE_SIZE, cursor)
+        entries = comment_entries(threads)
+        categories = category_index.categories_of(journey_id)
+        tags = journey_tags(journey) | {f"comments:{journey_id}"}
+        tags |= {f"traveler:{entry['comment']['authorId']}" for entry in entries}
+        tags |= {f"category:{category['id']}" for category in categories}
+        return "post.html", {
+            "journey": journey,
+            "traveler": repo.get_traveler(journey["travelerId"]),
+            "categories": categories,
+            "comments": entries,
+            "comment_count": comment_tree.count(journey_id),
+            "page_urls": page_urls(request, page)
+        }, tags
+
+    try:
+        return cached_page(request, ("post", journey_id, cursor), render)
+    except ValueError:
+        return HTMLResponse(
+            "<h1>400 - Некорректная ссылка</h1><p>Такой страницы комментариев не существует</p><a href='/'>На главную</a>",
+            status_code=400
+        )
+
+
+@app.get("/comments/{comment_id}")
+async def view_comment_thread(request: Request, comment_id: int, after: Optional[int] = None) -> Response:
+    # Ветка целиком, по странице за раз: для обсуждений длиннее превью на странице поста
+    comment = comment_tree.get(comment_id)
+    if not comment:
+        return HTMLResponse(
+            "<h1>404 - Комментарий не найден</h1><p>Такого комментария не существует</p><a href='/'>На главную</a>",
+            status_code=404
+        )
+    try:
+        items, has_more = comment_tree.subtree(comment_id, MAX_REPLIES, after)
+    except ValueError:
+        return HTMLResponse(
+            "<h1>400 - Некорректная ссылка</h1><p>Такой страницы комментариев не существует</p><a href='/'>На главную</a>",
+            status_code=400
+        )
+    next_url = None
+    if has_more:
+        next_url = f"{request.url.path}?{request.url.include_query_params(after=items[-1][0]['id']).query}"
+    return stream_page(request, "comment_thread.html", {
+        "journey": repo.get_journey(comment["journeyId"]),
+        "comments": [comment_entry(item, depth) for item, depth in items],
+        "next_url": next_url
     })
 
 
@@ -154,13 +744,13 @@ async def view_journey(request: Request, journey_id: int) -> HTMLResponse:
 async def create_journey_page(request: Request) -> HTMLResponse:
     return templates.TemplateResponse("create_post.html", {
         "request": request,
-        "travelers": travelers
+        "travelers": repo.travelers
     })
 
 
 @app.get("/edit-journey/{journey_id}")
 async def edit_journey_page(request: Request, journey_id: int) -> HTMLResponse:
-    journey = next((j for j in journeys if j["id"] == journey_id), None)
+    journey = repo.get_journey(journey_id)
     if not journey:
         return HTMLResponse(
             "<h1>404 - Пост не найдено</h1><p>Нельзя редактировать несуществующую публикацию</p><a href='/'>На главную</a>",
@@ -169,84 +759,110 @@ async def edit_journey_page(request: Request, journey_id: int) -> HTMLResponse:
     return templates.TemplateResponse("edit_post.html", {
         "request": request,
         "journey": journey,
-        "travelers": travelers
+        "travelers": repo.travelers
     })
 
 
-@app.post("/create-journey")
+def validation_message(e: ValidationError) -> str:
+    return e.errors()[0]["msg"].removeprefix("Value error, ")
+
+
+def parse_location(lat: str, lng: str) -> Tuple[Optional[float], Optional[float]]:
+    # Поля координат в форме необязательны; пустые — координат нет
+    lat, lng = lat.strip().replace(",", "."), lng.strip().replace(",", ".")
+    try:
+        values = [float(value) if value else None for value in (lat, lng)]
+    except ValueError:
+        raise ValueError("Координаты должны быть числами")
+    try:
+        location = JourneyLocation(locationLat=values[0], locationLng=values[1])
+    except ValidationError as e:
+        raise ValueError(validation_message(e))
+    return location.locationLat, location.locationLng
+
+
+@app.post("/create-journey", response_model=None)
 async def create_journey_form(
         request: Request,
         travelerId: int = Form(...),
         destination: str = Form(...),
-        story: str = Form(...)
+        story: str = Form(...),
+        locationLat: str = Form(""),
+        locationLng: str = Form("")
 ) -> Union[HTMLResponse, RedirectResponse]:
-    global next_journey_id
-
+    form_data = {
+        "travelerId": travelerId,
+        "destination": destination,
+        "story": story,
+        "locationLat": locationLat,
+        "locationLng": locationLng
+    }
     # Проверяем существование пользователя
-    traveler_exists = any(t["id"] == travelerId for t in travelers)
-    if not traveler_exists:
+    if not repo.traveler_exists(travelerId):
         return templates.TemplateResponse("create_post.html", {
             "request": request,
-            "travelers": travelers,
+            "travelers": repo.travelers,
             "error": "❌ Пользователь не найден",
-            "form_data": {"travelerId": travelerId, "destination": destination, "story": story}
+            "form_data": form_data
         })
 
     # Валидация названия
     if len(destination) < 2:
         return templates.TemplateResponse("create_post.html", {
             "request": request,
-            "travelers": travelers,
+            "travelers": repo.travelers,
             "error": "❌ Название слишком короткое (минимум 2 символа)",
-            "form_data": {"travelerId": travelerId, "destination": destination, "story": story}
+            "form_data": form_data
         })
 
     # Валидация сообщения
     if len(story) < 10:
         return templates.TemplateResponse("create_post.html", {
             "request": request,
-            "travelers": travelers,
+            "travelers": repo.travelers,
             "error": "❌ Сообщение слишком короткое (минимум 10 символов)",
-            "form_data": {"travelerId": travelerId, "destination": destination, "story": story}
+            "form_data": form_data
         })
 
-    new_journey = {
-        "id": next_journey_id,
-        "travelerId": travelerId,
-        "destination": destination,
-        "story": story,
-        "createdAt": datetime.now(),
-        "updatedAt": datetime.now()
-    }
-    journeys.append(new_journey)
-    next_journey_id += 1
-    save_data(travelers, journeys, next_traveler_id, next_journey_id)
+    try:
+        lat, lng = parse_location(locationLat, locationLng)
+    except ValueError as e:
+        return templates.TemplateResponse("create_post.html", {
+            "request": request,
+            "travelers": repo.travelers,
+            "error": f"❌ {e}",
+            "form_data": form_data
+        })
+
+    repo.create_journey(travelerId, destination, story, location_lat=lat, location_lng=lng)
+    await persist(durable=True)
     return RedirectResponse(url="/", status_code=303)
 
 
-@app.post("/edit-journey/{journey_id}")
+@app.post("/edit-journey/{journey_id}", response_model=None)
 async def edit_journey_form(
         request: Request,
         journey_id: int,
         travelerId: int = Form(...),
         destination: str = Form(...),
-        story: str = Form(...)
+        story: str = Form(...),
+        locationLat: str = Form(""),
+        locationLng: str = Form("")
 ) -> Union[HTMLResponse, RedirectResponse]:
-    journey = next((j for j in journeys if j["id"] == journey_id), None)
+    journey = repo.get_journey(journey_id)
     if not journey:
         return templates.TemplateResponse("edit_post.html", {
             "request": request,
             "journey": journey,
-            "travelers": travelers,
+            "travelers": repo.travelers,
             "error": "❌ Путешествие не найдено"
         })
 
-    traveler_exists = any(t["id"] == travelerId for t in travelers)
-    if not traveler_exists:
+    if not repo.traveler_exists(travelerId):
         return templates.TemplateResponse("edit_post.html", {
             "request": request,
             "journey": journey,
-            "travelers": travelers,
+            "travelers": repo.travelers,
             "error": "❌ Пользователь не найден"
         })
 
@@ -254,7 +870,7 @@ async def edit_journey_form(
         return templates.TemplateResponse("edit_post.html", {
             "request": request,
             "journey": journey,
-            "travelers": travelers,
+            "travelers": repo.travelers,
             "error": "❌ Название слишком короткое (минимум 2 символа)"
         })
 
@@ -262,62 +878,287 @@ async def edit_journey_form(
         return templates.TemplateResponse("edit_post.html", {
             "request": request,
             "journey": journey,
-            "travelers": travelers,
+            "travelers": repo.travelers,
             "error": "❌ Сообщение слишком короткое (минимум 10 символов)"
         })
 
-    journey["travelerId"] = travelerId
-    journey["destination"] = destination
-    journey["story"] = story
-    journey["updatedAt"] = datetime.now()
-    save_data(travelers, journeys, next_traveler_id, next_journey_id)
+    try:
+        lat, lng = parse_location(locationLat, locationLng)
+    except ValueError as e:
+        return templates.TemplateResponse("edit_post.html", {
+            "request": request,
+            "journey": journey,
+            "travelers": repo.travelers,
+            "error": f"❌ {e}"
+        })
+
+    # Пустые поля координат в форме правки убирают координаты поста
+    repo.update_journey(
+        journey,
+        travelerId=travelerId,
+        destination=destination,
+        story=story,
+        locationLat=lat,
+        locationLng=lng
+    )
+    await persist(durable=True)
     return RedirectResponse(url=f"/journeys/{journey_id}", status_code=303)
 
 
 @app.post("/delete-journey/{journey_id}")
 async def delete_journey(journey_id: int) -> RedirectResponse:
-    global journeys
-    journeys = [j for j in journeys if j["id"] != journey_id]
-    save_data(travelers, journeys, next_traveler_id, next_journey_id)
+    if repo.delete_journey(journey_id):
+        await persist(durable=True)
     return RedirectResponse(url="/", status_code=303)
 
 
+def parse_ids(ids: str, limit: int = MAX_BATCH_SIZE) -> List[int]:
+    # ?ids=1,2,3 — то же, что тело batch-get
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный список id")
+    if len(parsed) > limit:
+        raise HTTPException(status_code=400, detail=f"Не более {limit} id за запрос")
+    return parsed
+
+
+def journey_changes(journey_update: JourneyUpdate) -> Dict[str, Any]:
+    changes: Dict[str, Any] = {}
+    if journey_update.destination:
+        changes["destination"] = journey_update.destination
+    if journey_update.story:
+        changes["story"] = journey_update.story
+    if journey_update.locationLat is not None:
+        changes["locationLat"] = journey_update.locationLat
+        changes["locationLng"] = journey_update.locationLng
+    return changes
+
+
+def traveler_changes(traveler_update: TravelerUpdate, password_hash: Optional[str]) -> Dict[str, Any]:
+    changes: Dict[str, Any] = {}
+    if traveler_update.email:
+        changes["email"] = traveler_update.email
+    if traveler_update.username:
+        changes["username"] = traveler_update.username
+    if password_hash:
+        changes["password"] = password_hash
+    return changes
+
+
+# Пакетные операции: (операция, изменяемая запись, проверенные данные).
+# Пакет сначала проверяется целиком и применяется, только если ошибок нет
+BatchStep = Tuple[str, Optional[Dict[str, Any]], Optional[BaseModel]]
+BatchErrors = Dict[int, Tuple[int, str]]
+
+
+def batch_target(
+        operation: BatchOperation,
+        get: Callable[[int], Optional[Dict[str, Any]]],
+        deleted: Set[int],
+        missing: str
+) -> Dict[str, Any]:
+    # Запись для update/delete; удалённая раньше в том же пакете — как отсутствующая
+    record = get(operation.id) if operation.id is not None else None
+    if record is None or operation.id in deleted:
+        raise HTTPException(status_code=404, detail=missing)
+    if operation.op == "delete":
+        deleted.add(operation.id)
+    return record
+
+
+def plan_batch(
+        operations: List[BatchOperation],
+        check: Callable[[BatchOperation, Set[int]], BatchStep]
+) -> Tuple[List[BatchStep], BatchErrors]:
+    steps: List[BatchStep] = []
+    errors: BatchErrors = {}
+    deleted: Set[int] = set()
+    for index, operation in enumerate(operations):
+        try:
+            steps.append(check(operation, deleted))
+        except ValidationError as e:
+            errors[index] = (422, validation_message(e))
+        except HTTPException as e:
+            errors[index] = (e.status_code, e.detail)
+    return steps, errors
+
+
+def check_journey_operation(operation: BatchOperation, deleted: Set[int]) -> BatchStep:
+    if operation.op == "create":
+        journey = Journey(**operation.data)
+        if not repo.traveler_exists(journey.travelerId):
+            raise HTTPException(status_code=400, detail="Пользователь не найден")
+        return operation.op, None, journey
+    target = batch_target(operation, repo.get_journey, deleted, "Пост не найден")
+    if operation.op == "update":
+        return operation.op, target, JourneyUpdate(**operation.data)
+    return operation.op, target, None
+
+
+def traveler_checker(claimed: Set[str]) -> Callable[[BatchOperation, Set[int]], BatchStep]:
+    # claimed — email, занятые предыдущими операциями пакета
+    def check(operation: BatchOperation, deleted: Set[int]) -> BatchStep:
+        if operation.op == "create":
+            traveler = Traveler(**operation.data)
+            if repo.get_traveler_by_email(traveler.email) or traveler.email in claimed:
+                raise HTTPException(status_code=400, detail="Email уже используется")
+            claimed.add(traveler.email)
+            return operation.op, None, traveler
+        target = batch_target(operation, repo.get_traveler, deleted, "Пользователь не найден")
+        if operation.op == "delete":
+            return operation.op, target, None
+        traveler_update = TravelerUpdate(**operation.data)
+        if traveler_update.email:
+            owner = repo.get_traveler_by_email(traveler_update.email)
+            if (owner is not None and owner is not target) or traveler_update.email in claimed:
+                raise HTTPException(status_code=400, detail="Email уже используется")
+            claimed.add(traveler_update.email)
+        return operation.op, target, traveler_update
+
+    return check
+
+
+def batch_failed(operations: List[BatchOperation], errors: BatchErrors) -> JSONResponse:
+    results = []
+    for index, operation in enumerate(operations):
+        status, detail = errors.get(index, (424, "Не применено из-за ошибок в других операциях"))
+        result: Dict[str, Any] = {"op": operation.op, "status": status, "detail": detail}
+        if operation.id is not None:
+            result["id"] = operation.id
+        results.append(result)
+    return JSONResponse(
+        status_code=400,
+        content={"detail": "Пакет не применён: есть ошибки", "results": results}
+    )
+
+
+def batch_result(op: str, status: int, collection: str, record: Dict[str, Any]) -> bytes:
+    return b'{"op":"%s","status":%d,"record":%s}' % (op.encode(), status, json_cache.encode(collection, record))
+
+
+def batch_deleted(record_id: int) -> bytes:
+    return b'{"op":"delete","status":204,"id":%d}' % record_id
+
+
+def batch_response(results: List[bytes]) -> Response:
+    return json_response(b'{"results":[' + b",".join(results) + b"]}")
+
+
+def apply_journey_batch(steps: List[BatchStep]) -> List[bytes]:
+    results = []
+    for op, journey, model in steps:
+        if op == "create":
+            journey = repo.create_journey(
+                model.travelerId,
+                model.destination,
+                model.story,
+                location_lat=model.locationLat,
+                location_lng=model.locationLng
+            )
+            results.append(batch_result(op, 201, "journeys", journey))
+        elif op == "update":
+            repo.update_journey(journey, **journey_changes(model))
+            results.append(batch_result(op, 200, "journeys", journey))
+        else:
+            repo.delete_journey(journey["id"])
+            results.append(batch_deleted(journey["id"]))
+    return results
+
+
+def apply_traveler_batch(steps: List[BatchStep], password_hashes: List[Optional[str]]) -> List[bytes]:
+    results = []
+    for (op, traveler, model), password_hash in zip(steps, password_hashes):
+        if op == "create":
+            traveler = repo.create_traveler(model.email, model.username, password_hash)
+            results.append(batch_result(op, 201, "travelers", traveler))
+        elif op == "update":
+            repo.update_traveler(traveler, **traveler_changes(model, password_hash))
+            results.append(batch_result(op, 200, "travelers", traveler))
+        else:
+            # Посты пользователя удаляются вместе с ним
+            repo.delete_traveler(traveler["id"])
+            results.append(batch_deleted(traveler["id"]))
+    return results
+
+
+async def hash_passwords(passwords: List[Optional[str]]) -> List[Optional[str]]:
+    # Не больше хэшей за раз, чем потоков: большой пакет не переполняет
+    # очередь хэширования и не отнимает её у одиночных регистраций
+    hashes: List[Optional[str]] = [None] * len(passwords)
+    pending = [(index, password) for index, password in enumerate(passwords) if password]
+    for start in range(0, len(pending), hasher.workers):
+        chunk = pending[start:start + hasher.workers]
+        computed = await asyncio.gather(*(hasher.hash(password) for _, password in chunk))
+        for (index, _), password_hash in zip(chunk, computed):
+            hashes[index] = password_hash
+    return hashes
+
+
 @app.post("/api/travelers/")
 async def create_traveler(traveler: Traveler) -> Dict[str, Any]:
-    global next_traveler_id
+    if repo.get_traveler_by_email(traveler.email):
+        raise HTTPException(status_code=400, detail="Email уже используется")
 
-    for t in travelers:
-        if t["email"] == traveler.email:
+    password_hash = await hasher.hash(traveler.password)
+    async with sync.exclusive():
+        # Пока считался хэш, email мог занять другой запрос или процесс
+        if repo.get_traveler_by_email(traveler.email):
             raise HTTPException(status_code=400, detail="Email уже используется")
 
-    if len(traveler.password) < 6:
-        raise HTTPException(status_code=400, detail="Пароль должен быть не менее 6 символов")
+        new_traveler = repo.create_traveler(traveler.email, traveler.username, password_hash)
+        await persist()
+    return json_cache.public("travelers", new_traveler)
 
-    new_traveler = {
-        "id": next_traveler_id,
-        "email": traveler.email,
-        "username": traveler.username,
-        "password": traveler.password,
-        "createdAt": datetime.now(),
-        "updatedAt": datetime.now()
-    }
-    travelers.append(new_traveler)
-    next_traveler_id += 1
-    save_data(travelers, journeys, next_traveler_id, next_journey_id)
-    return new_traveler
+
+@app.post("/api/login")
+async def login(credentials: LoginRequest) -> Dict[str, Any]:
+    traveler = repo.get_traveler_by_email(credentials.email)
+    stored = traveler["password"] if traveler else None
+    matches, needs_rehash = await hasher.verify(credentials.password, stored)
+    if traveler is None or not matches:
+        raise HTTPException(status_code=401, detail="Неверный email или пароль")
+
+    if needs_rehash:
+        # Пароль из старых данных или со старыми параметрами — перехэшируем
+        password_hash = await hasher.hash(credentials.password)
+        async with sync.exclusive():
+            if traveler["password"] == stored:
+                repo.update_traveler(traveler, touch=False, password=password_hash)
+                await persist(durable=True)
+    return json_cache.public("travelers", traveler)
 
 
 @app.get("/api/travelers/")
-async def get_travelers() -> List[Dict[str, Any]]:
-    return travelers
+async def get_travelers(
+        request: Request,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        ids: Optional[str] = None
+) -> Response:
+    etag = collection_etag()
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    if ids is not None:
+        # Выборка по id — в порядке запроса, без постраничной навигации
+        return tagged_json(json_cache.encode_list("travelers", repo.get_travelers(parse_ids(ids))), etag)
+    try:
+        travelers_page, page = repo.page_travelers(limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    response = tagged_json(json_cache.encode_list("travelers", travelers_page), etag)
+    set_link_header(request, response, page)
+    return response
 
 
 @app.get("/api/travelers/{traveler_id}")
-async def get_traveler(traveler_id: int) -> Dict[str, Any]:
-    traveler = next((t for t in travelers if t["id"] == traveler_id), None)
+async def get_traveler(request: Request, traveler_id: int) -> Response:
+    traveler = repo.get_traveler(traveler_id)
     if not traveler:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
-    return traveler
+    etag = record_etag(traveler)
+    return not_modified(request, etag) or tagged_json(json_cache.encode("travelers", traveler), etag)
 
 
 @app.put("/api/travelers/{traveler_id}")
@@ -325,63 +1166,318 @@ async def update_traveler(
         traveler_id: int,
         traveler_update: TravelerUpdate
 ) -> Dict[str, Any]:
-    traveler = next((t for t in travelers if t["id"] == traveler_id), None)
-    if not traveler:
-        raise HTTPException(status_code=404, detail="Пользователь не найден")
-
-    if traveler_update.email:
-        traveler["email"] = traveler_update.email
-    if traveler_update.username:
-        traveler["username"] = traveler_update.username
+    password_hash = None
     if traveler_update.password:
-        traveler["password"] = traveler_update.password
+        password_hash = await hasher.hash(traveler_update.password)
 
-    traveler["updatedAt"] = datetime.now()
-    save_data(travelers, journeys, next_traveler_id, next_journey_id)
-    return traveler
+    async with sync.exclusive():
+        traveler = repo.get_traveler(traveler_id)
+        if not traveler:
+            raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+        owner = repo.get_traveler_by_email(traveler_update.email) if traveler_update.email else None
+        if owner is not None and owner is not traveler:
+            raise HTTPException(status_code=400, detail="Email уже используется")
+
+        repo.update_traveler(traveler, **traveler_changes(traveler_update, password_hash))
+        await persist()
+    return json_cache.public("travelers", traveler)
 
 
 @app.delete("/api/travelers/{traveler_id}")
 async def delete_traveler(traveler_id: int) -> Dict[str, str]:
-    global travelers
-    travelers = [t for t in travelers if t["id"] != traveler_id]
-    save_data(travelers, journeys, next_traveler_id, next_journey_id)
+    if repo.delete_traveler(traveler_id):
+        await persist()
     return {"message": "Пользователь удален"}
 
 
+@app.post("/api/travelers/batch-get")
+async def get_travelers_batch(batch: BatchGet) -> Response:
+    return json_response(json_cache.encode_list("travelers", repo.get_travelers(batch.ids)))
+
+
+@app.post("/api/travelers/batch")
+async def travelers_batch(batch: Batch) -> Response:
+    steps, errors = plan_batch(batch.operations, traveler_checker(set()))
+    if errors:
+        return batch_failed(batch.operations, errors)
+
+    # Хэши — до блокировки журнала, как при одиночной регистрации
+    password_hashes = await hash_passwords([model.password if model else None for _, _, model in steps])
+    async with sync.exclusive():
+        # Пока считались хэши, данные могли измениться: проверяем заново
+        steps, errors = plan_batch(batch.operations, traveler_checker(set()))
+        if errors:
+            return batch_failed(batch.operations, errors)
+        results = apply_traveler_batch(steps, password_hashes)
+        await persist()
+    return batch_response(results)
+
+
+@app.post("/api/travelers/{traveler_id}/subscriptions")
+async def subscribe(traveler_id: int, subscription: Subscription) -> Dict[str, Any]:
+    if not repo.traveler_exists(traveler_id) or not repo.traveler_exists(subscription.targetUserId):
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+    if traveler_id == subscription.targetUserId:
+        raise HTTPException(status_code=400, detail="Нельзя подписаться на себя")
+
+    new_subscription = feeds.subscribe(traveler_id, subscription.targetUserId)
+    await persist()
+    return new_subscription
+
+
+@app.delete("/api/travelers/{traveler_id}/subscriptions")
+async def unsubscribe(traveler_id: int, targetUserId: int) -> Dict[str, str]:
+    if feeds.unsubscribe(traveler_id, targetUserId):
+        await persist()
+    return {"message": "Подписка удалена"}
+
+
+@app.get("/api/travelers/{traveler_id}/feed")
+async def get_feed(
+        request: Request,
+        traveler_id: int,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None
+) -> Response:
+    # Посты тех, на кого подписан пользователь, от новых к старым
+    if not repo.traveler_exists(traveler_id):
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+    try:
+        journeys_page, page = feeds.page(traveler_id, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    response = json_response(json_cache.encode_list("journeys", journeys_page))
+    set_link_header(request, response, page)
+    return response
+
+
+@app.post("/api/travelers/{traveler_id}/favorites")
+async def add_favorite(traveler_id: int, favorite: Favorite) -> Dict[str, Any]:
+    if not repo.traveler_exists(traveler_id):
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+    journey = repo.get_journey(favorite.journeyId)
+    if not journey:
+        raise HTTPException(status_code=404, detail="Пост не найден")
+
+    new_favorite = favorite_index.add(traveler_id, journey)
+    await persist()
+    return new_favorite
+
+
+@app.delete("/api/travelers/{traveler_id}/favorites/{journey_id}")
+async def remove_favorite(traveler_id: int, journey_id: int) -> Dict[str, str]:
+    if favorite_index.remove(traveler_id, journey_id):
+        await persist()
+    return {"message": "Пост удален из избранного"}
+
+
+@app.get("/api/travelers/{traveler_id}/favorites")
+async def get_favorites(
+        request: Request,
+        traveler_id: int,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None
+) -> Response:
+    if not repo.traveler_exists(traveler_id):
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+    try:
+        journeys_page, page = favorite_index.page(traveler_id, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    response = json_response(json_cache.encode_list("journeys", journeys_page))
+    set_link_header(request, response, page)
+    return response
+
+
 @app.post("/api/journeys/")
 async def create_journey(journey: Journey) -> Dict[str, Any]:
-    global next_journey_id
-
-    traveler_exists = any(t["id"] == journey.travelerId for t in travelers)
-    if not traveler_exists:
+    if not repo.traveler_exists(journey.travelerId):
         raise HTTPException(status_code=400, detail="Пользователь не найден")
 
-    new_journey = {
-        "id": next_journey_id,
-        "travelerId": journey.travelerId,
-        "destination": journey.destination,
-        "story": journey.story,
-        "createdAt": datetime.now(),
-        "updatedAt": datetime.now()
-    }
-    journeys.append(new_journey)
-    next_journey_id += 1
-    save_data(travelers, journeys, next_traveler_id, next_journey_id)
+    new_journey = repo.create_journey(
+        journey.travelerId,
+        journey.destination,
+        journey.story,
+        location_lat=journey.locationLat,
+        location_lng=journey.locationLng
+    )
+    await persist()
     return new_journey
 
 
 @app.get("/api/journeys/")
-async def get_journeys() -> List[Dict[str, Any]]:
-    return journeys
+async def get_journeys(
+        request: Request,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        category: Optional[str] = None,
+        ids: Optional[str] = None
+) -> Response:
+    etag = collection_etag()
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    if ids is not None:
+        return tagged_json(json_cache.encode_list("journeys", repo.get_journeys(parse_ids(ids))), etag)
+    # category — slug: посты берутся из индекса категории, без прохода по всем
+    selected = category_index.get_by_slug(category) if category else None
+    if category and selected is None:
+        raise HTTPException(status_code=404, detail="Категория не найдена")
+    try:
+        if selected is not None:
+            journeys_page, page = category_index.page_journeys(selected["id"], limit, cursor)
+        else:
+            journeys_page, page = repo.page_journeys(limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    response = tagged_json(json_cache.encode_list("journeys", journeys_page), etag)
+    set_link_header(request, response, page)
+    return response
+
+
+@app.get("/api/journeys/search")
+async def search_journeys_api(
+        q: str = Query(..., min_length=1),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+) -> Response:
+    return json_response(json_cache.encode_list("journeys", search_journeys(q, limit)))
+
+
+@app.get("/api/journeys/top")
+async def top_journeys(
+        by: str = Query("views", pattern="^(views|likes)$"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=TOP_K)
+) -> Response:
+    items = [
+        b'{"count":%d,"journey":%s}' % (count, json_cache.encode("journeys", journey))
+        for journey, count in counters.ranking(by, limit)
+    ]
+    return json_response(b"[" + b",".join(items) + b"]")
+
+
+@app.get("/api/journeys/nearby")
+async def nearby_journeys(
+        lat: float = Query(..., ge=-90, le=90),
+        lng: float = Query(..., ge=-180, le=180),
+        radius_km: float = Query(10, gt=0, le=MAX_RADIUS_KM),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+) -> Response:
+    # Посты в радиусе от точки, от ближних к дальним; расстояние — по гаверсинусу
+    items = [
+        b'{"distanceKm":%.3f,"journey":%s}' % (distance, json_cache.encode("journeys", journey))
+        for journey, distance in geo_index.nearby(lat, lng, radius_km, limit)
+    ]
+    return json_response(b"[" + b",".join(items) + b"]")
+
+
+@app.get("/api/journeys/bbox")
+async def journeys_in_bbox(
+        south: float = Query(..., ge=-90, le=90),
+        west: float = Query(..., ge=-180, le=180),
+        north: float = Query(..., ge=-90, le=90),
+        east: float = Query(..., ge=-180, le=180),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+) -> Response:
+    # Посты в окне карты, от новых к старым. west > east — окно через 180-й меридиан
+    if south > north:
+        raise HTTPException(status_code=400, detail="south должен быть не больше north")
+    return json_response(
+        json_cache.encode_list("journeys", geo_index.within(south, west, north, east, limit))
+    )
+
+
+@app.get("/api/journeys/meta")
+async def journeys_meta(
+        ids: str = Query(..., min_length=1),
+        viewer: Optional[int] = None
+) -> Response:
+    # Категории, число добавлений в избранное и (для viewer) отметка
+    # «в избранном» для страницы постов — одним запросом вместо N
+    journey_ids = [
+        journey_id for journey_id in parse_ids(ids, MAX_PAGE_SIZE) if repo.get_journey(journey_id)
+    ]
+    categories = category_index.categories_for(journey_ids)
+    favorite_counts = favorite_index.counts_for(journey_ids)
+    favorite_ids = favorite_index.favorites_among(viewer, journey_ids) if viewer is not None else set()
+    items = []
+    for journey_id in journey_ids:
+        item = b'{"journeyId":%d,"categories":%s,"favoriteCount":%d' % (
+            journey_id,
+            json_cache.encode_list("categories", categories[journey_id]),
+            favorite_counts[journey_id]
+        )
+        if viewer is not None:
+            item += b',"favorite":%s' % (b"true" if journey_id in favorite_ids else b"false")
+        items.append(item + b"}")
+    return json_response(b"[" + b",".join(items) + b"]")
+
+
+@app.put("/api/journeys/{journey_id}/categories")
+async def set_journey_categories(journey_id: int, update: JourneyCategories) -> Response:
+    journey = repo.get_journey(journey_id)
+    if not journey:
+        raise HTTPException(status_code=404, detail="Пост не найден")
+    if not all(category_index.get(category_id) for category_id in update.categoryIds):
+        raise HTTPException(status_code=400, detail="Категория не найдена")
+
+    category_index.set_categories(journey, update.categoryIds)
+    await persist()
+    return json_response(json_cache.encode_list("categories", category_index.categories_of(journey_id)))
+
+
+@app.get("/api/categories/")
+async def get_categories() -> Response:
+    # Для боковой панели: число постов в категории хранится, а не считается
+    items = [
+        b'{"journeyCount":%d,"category":%s}' % (count, json_cache.encode("categories", category))
+        for category, count in category_index.counts()
+    ]
+    return json_response(b"[" + b",".join(items) + b"]")
+
+
+@app.post("/api/categories/")
+async def create_category(category: Category) -> Dict[str, Any]:
+    if category_index.get_by_name(category.name) or category_index.get_by_slug(category.slug):
+        raise HTTPException(status_code=400, detail="Категория с таким названием или slug уже есть")
+
+    new_category = category_index.create(category.name, category.slug, category.description)
+    await persist()
+    return new_category
+
+
+@app.delete("/api/categories/{category_id}")
+async def delete_category(category_id: int) -> Dict[str, str]:
+    if category_index.delete(category_id):
+        await persist()
+    return {"message": "Категория удалена"}
 
 
 @app.get("/api/journeys/{journey_id}")
-async def get_journey(journey_id: int) -> Dict[str, Any]:
-    journey = next((j for j in journeys if j["id"] == journey_id), None)
+async def get_journey(request: Request, journey_id: int) -> Response:
+    journey = repo.get_journey(journey_id)
     if not journey:
         raise HTTPException(status_code=404, detail="Пост не найден")
-    return journey
+    etag = record_etag(journey)
+    return not_modified(request, etag) or tagged_json(json_cache.encode("journeys", journey), etag)
+
+
+@app.get("/api/journeys/{journey_id}/stats")
+async def journey_stats(journey_id: int) -> Dict[str, int]:
+    # Сохранённые значения плюс ещё не сброшенные приращения
+    journey = repo.get_journey(journey_id)
+    if not journey:
+        raise HTTPException(status_code=404, detail="Пост не найден")
+    return {**counters.get(journey), "comments": comment_tree.count(journey_id)}
+
+
+@app.post("/api/journeys/{journey_id}/like")
+async def like_journey(journey_id: int) -> Dict[str, int]:
+    journey = repo.get_journey(journey_id)
+    if not journey:
+        raise HTTPException(status_code=404, detail="Пост не найден")
+    counters.increment("likes", journey)
+    return counters.get(journey)
 
 
 @app.put("/api/journeys/{journey_id}")
@@ -389,28 +1485,252 @@ async def update_journey(
         journey_id: int,
         journey_update: JourneyUpdate
 ) -> Dict[str, Any]:
-    journey = next((j for j in journeys if j["id"] == journey_id), None)
+    journey = repo.get_journey(journey_id)
     if not journey:
         raise HTTPException(status_code=404, detail="Пост не найден")
 
-    if journey_update.destination:
-        journey["destination"] = journey_update.destination
-    if journey_update.story:
-        journey["story"] = journey_update.story
-
-    journey["updatedAt"] = datetime.now()
-    save_data(travelers, journeys, next_traveler_id, next_journey_id)
+    repo.update_journey(journey, **journey_changes(journey_update))
+    await persist()
     return journey
 
 
 @app.delete("/api/journeys/{journey_id}")
 async def delete_journey_api(journey_id: int) -> Dict[str, str]:
-    global journeys
-    journeys = [j for j in journeys if j["id"] != journey_id]
-    save_data(travelers, journeys, next_traveler_id, next_journey_id)
+    if repo.delete_journey(journey_id):
+        await persist()
     return {"message": "Пост удален"}
 
 
+@app.post("/api/journeys/batch-get")
+async def get_journeys_batch(batch: BatchGet) -> Response:
+    return json_response(json_cache.encode_list("journeys", repo.get_journeys(batch.ids)))
+
+
+@app.post("/api/journeys/batch")
+async def journeys_batch(batch: Batch) -> Response:
+    steps, errors = plan_batch(batch.operations, check_journey_operation)
+    if errors:
+        return batch_failed(batch.operations, errors)
+    results = apply_journey_batch(steps)
+    # Один persist на весь пакет
+    await persist()
+    return batch_response(results)
+
+
+@app.post("/journeys/{journey_id}/comments", response_model=None)
+async def create_comment_form(
+        journey_id: int,
+        authorId: int = Form(...),
+        content: str = Form(...),
+        parentId: Optional[int] = Form(None)
+) -> Union[HTMLResponse, RedirectResponse]:
+    journey = repo.get_journey(journey_id)
+    if not journey:
+        return HTMLResponse(
+            "<h1>404 - Пост не найден</h1><p>Такой публикации не существует</p><a href='/'>На главную</a>",
+            status_code=404
+        )
+    error = comment_error(journey_id, authorId, content, parentId)
+    if error:
+        return HTMLResponse(
+            f"<h1>400 - Комментарий не добавлен</h1><p>❌ {error}</p><a href='/journeys/{journey_id}'>К посту</a>",
+            status_code=400
+        )
+
+    comment = comment_tree.create(journey_id, authorId, content, comment_tree.get(parentId) if parentId else None)
+    await persist(durable=True)
+    return RedirectResponse(url=f"/journeys/{journey_id}#comment-{comment['id']}", status_code=303)
+
+
+@app.post("/delete-comment/{comment_id}")
+async def delete_comment(comment_id: int) -> RedirectResponse:
+    comment = comment_tree.get(comment_id)
+    if not comment:
+        return RedirectResponse(url="/", status_code=303)
+    comment_tree.delete(comment_id)
+    await persist(durable=True)
+    return RedirectResponse(url=f"/journeys/{comment['journeyId']}", status_code=303)
+
+
+def comment_error(journey_id: int, author_id: int, content: str, parent_id: Optional[int]) -> Optional[str]:
+    if not repo.traveler_exists(author_id):
+        return "Пользователь не найден"
+    if not content.strip():
+        return "Комментарий не может быть пустым"
+    if parent_id is not None:
+        parent = comment_tree.get(parent_id)
+        if parent is None or parent["journeyId"] != journey_id:
+            return "Комментарий, на который вы отвечаете, не найден"
+    return None
+
+
+@app.post("/api/journeys/{journey_id}/comments")
+async def create_comment(journey_id: int, comment: Comment) -> Response:
+    if not repo.get_journey(journey_id):
+        raise HTTPException(status_code=404, detail="Пост не найден")
+    error = comment_error(journey_id, comment.authorId, comment.content, comment.parentId)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+    parent = comment_tree.get(comment.parentId) if comment.parentId else None
+    new_comment = comment_tree.create(journey_id, comment.authorId, comment.content, parent)
+    await persist()
+    return json_response(json_cache.encode("comments", new_comment))
+
+
+@app.get("/api/journeys/{journey_id}/comments")
+async def get_comments(
+        request: Request,
+        journey_id: int,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        replies: int = Query(REPLIES_PREVIEW, ge=0, le=MAX_REPLIES)
+) -> Response:
+    # Страница верхних веток; в каждой — первые replies ответов и их общее число.
+    # Остаток ветки — через /api/comments/{id}
+    if not repo.get_journey(journey_id):
+        raise HTTPException(status_code=404, detail="Пост не найден")
+    try:
+        threads, page = comment_tree.page_threads(journey_id, limit, cursor, replies)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    items = [
+        b'{"comment":%s,"replyCount":%d,"replies":[%s]}' % (
+            json_cache.encode("comments", thread.comment),
+            thread.reply_count,
+            b",".join(encode_comment_items(thread.replies))
+        )
+        for thread in threads
+    ]
+    response = json_response(b"[" + b",".join(items) + b"]")
+    response.headers["X-Total-Count"] = str(comment_tree.count(journey_id))
+    set_link_header(request, response, page)
+    return response
+
+
+@app.get("/api/comments/{comment_id}")
+async def get_comment_subtree(
+        comment_id: int,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_REPLIES),
+        after: Optional[int] = None
+) -> Response:
+    # Комментарий и все ответы на него в порядке обхода; after — id последнего полученного
+    if not comment_tree.get(comment_id):
+        raise HTTPException(status_code=404, detail="Комментарий не найден")
+    try:
+        items, has_more = comment_tree.subtree(comment_id, limit, after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный параметр after")
+    response = json_response(b"[" + b",".join(encode_comment_items(items)) + b"]")
+    if has_more:
+        response.headers["Link"] = f'</api/comments/{comment_id}?limit={limit}&after={items[-1][0]["id"]}>; rel="next"'
+    return response
+
+
+@app.delete("/api/comments/{comment_id}")
+async def delete_comment_api(comment_id: int) -> Dict[str, Any]:
+    # Ответы удаляются вместе с комментарием
+    deleted = comment_tree.delete(comment_id)
+    if deleted:
+        await persist()
+    return {"message": "Комментарий удален", "deleted": deleted}
+
+
+@app.post("/api/bulk/import")
+async def bulk_import(request: Request) -> Dict[str, Any]:
+    # Тело — NDJSON: по строке {"type": "traveler" | "journey", ...} на запись.
+    # Ошибочные строки пропускаются и попадают в отчёт, остальное сохраняется разом
+    importer = BulkImporter(repo, Traveler, Journey, hasher)
+    async for line_number, line in iter_lines(request.stream()):
+        await importer.feed(line_number, line)
+    await importer.flush()
+    await persist(durable=True)
+    return importer.report()
+
+
+@app.get("/api/bulk/export")
+async def bulk_export() -> StreamingResponse:
+    return StreamingResponse(
+        export_lines(repo),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": 'attachment; filename="blog_export.ndjson"'}
+    )
+
+
+@app.get("/api/changes")
+async def get_changes(
+        request: Request,
+        since: int = Query(..., ge=0),
+        limit: int = Query(CHANGES_PAGE_SIZE, ge=1, le=MAX_CHANGES_PAGE_SIZE),
+        collections: Optional[str] = None
+) -> Response:
+    # Созданные, изменённые и удалённые после версии since записи — каждая
+    # один раз, в текущем виде. Следующий запрос — с since=version из ответа
+    etag = collection_etag()
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    selected = set(collections.split(",")) if collections else None
+    try:
+        content = change_log.encode_changes(json_cache, since, limit, selected)
+    except ChangesExpired:
+        raise HTTPException(
+            status_code=410,
+            detail="Изменения с этой версии уже не хранятся, загрузите данные заново"
+        )
+    return tagged_json(content, etag)
+
+
+@app.get("/api/render-cache/stats")
+async def render_cache_stats() -> Dict[str, Dict[str, int]]:
+    return {
+        "pages": page_cache.stats(),
+        "fragments": fragment_cache.stats(),
+        "json": json_cache.stats(),
+    }
+
+
+# Размеры данных и кэшей считаются в момент запроса /metrics
+REGISTRY.gauge_callback(
+    "blog_records", "Число записей в коллекции", ("collection",),
+    lambda: {(collection,): len(repo.records(collection)) for collection in SEQUENCES},
+)
+REGISTRY.gauge_callback(
+    "blog_deleted_records", "Удалённых записей, ждущих сжатия списка", ("collection",),
+    lambda: {("travelers",): repo.travelers.dead, ("journeys",): repo.journeys.dead},
+)
+REGISTRY.gauge_callback(
+    "blog_cache_entries", "Записей в кэше", ("cache",),
+    lambda: {
+        ("pages",): len(page_cache), ("fragments",): len(fragment_cache), ("json",): len(json_cache)
+    },
+)
+REGISTRY.gauge_callback(
+    "blog_cache_hit_ratio", "Доля попаданий в кэш с запуска", ("cache",),
+    lambda: {
+        (name,): stats["hits"] / (stats["hits"] + stats["misses"] or 1)
+        for name, stats in (
+            ("pages", page_cache.stats()), ("fragments", fragment_cache.stats()), ("json", json_cache.stats())
+        )
+    },
+)
+REGISTRY.counter_callback(
+    "blog_persisted_batches_total", "Пачек изменений, записанных на диск", (),
+    lambda: {(): writer.batches},
+)
+REGISTRY.counter_callback(
+    "blog_persisted_changes_total", "Изменений, записанных на диск", (),
+    lambda: {(): writer.changes},
+)
+
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    # Текстовый формат Prometheus: ответы по маршрутам, время операций
+    # хранилища, шаблонов и сериализации, размеры данных и кэшей
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 def open_browser() -> None:
     time.sleep(2)
     webbrowser.open("http://127.0.0.1:8000")
@@ -425,4 +1745,8 @@ if __name__ == "__main__":
     print("   API путешествий: http://127.0.0.1:8000/api/journeys/")
 
     threading.Thread(target=open_browser, daemon=True).start()
-    uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
+    if WORKERS > 1:
+        # Каждый процесс импортирует модуль заново и читает общий журнал
+        serve("main:app", host="127.0.0.1", port=8000)
+    else:
+        uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
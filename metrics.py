@@ -0,0 +1,448 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from types import FrameType
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from jinja2 import Environment
+
+# Медленнее этого (мс) запрос попадает в профиль; 0 — профилировщик выключен
+PROFILE_SLOW_MS = float(os.environ.get("BLOG_PROFILE_SLOW_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.environ.get("BLOG_PROFILE_INTERVAL_MS", "5"))
+# Стеки в свёрнутом виде (folded): flamegraph.pl, speedscope, inferno
+PROFILE_FILE = os.environ.get("BLOG_PROFILE_FILE", "blog_profile.folded")
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)  # fmt: skip
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+# charset=utf-8 к text/* дописывает сам Response
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+Labels = Tuple[str, ...]
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+ASGIApp = Callable[
+    [Scope, Callable[[], Awaitable[Message]], Callable[[Message], Awaitable[None]]],
+    Awaitable[None],
+]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    # Значения по наборам меток. Пишут и цикл событий, и фоновые потоки
+    # (запись на диск), поэтому изменения — под блокировкой
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return super().render() + [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class CallbackGauge(Metric):
+    # Значение считается в момент выдачи /metrics: размеры коллекций и кэшей
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str],
+        collect: Callable[[], Dict[Labels, float]],
+    ) -> None:
+        super().__init__(name, help_text, labels)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        return super().render() + [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in sorted(self.collect().items())
+        ]
+
+
+class CallbackCounter(CallbackGauge):
+    # Счётчик, который уже ведёт другой объект (например, поток записи)
+    kind = "counter"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        # метки -> [число значений по корзинам (последняя — +Inf), сумма]
+        self._values: Dict[Labels, List[Any]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), total))
+                for key, (counts, total) in self._values.items()
+            )
+        names = self.labels + ("le",)
+        lines = super().render()
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(names, key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, labels))
+
+    def gauge_callback(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str],
+        collect: Callable[[], Dict[Labels, float]],
+    ) -> CallbackGauge:
+        return self.register(CallbackGauge(name, help_text, labels, collect))
+
+    def counter_callback(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str],
+        collect: Callable[[], Dict[Labels, float]],
+    ) -> CallbackCounter:
+        return self.register(CallbackCounter(name, help_text, labels, collect))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> bytes:
+        lines = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+# Общий реестр процесса: его пишут хранилище, шаблоны и middleware
+REGISTRY = Registry()
+OPERATION_SECONDS = REGISTRY.histogram(
+    "blog_operation_duration_seconds",
+    "Время внутренних операций: запись на диск, рендеринг, сериализация",
+    ("operation",),
+)
+TEMPLATE_SECONDS = REGISTRY.histogram(
+    "blog_template_render_duration_seconds", "Время рендеринга шаблона", ("template",)
+)
+
+
+@contextmanager
+def timed(operation: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        OPERATION_SECONDS.observe(time.perf_counter() - started, operation)
+
+
+def instrument_templates(env: Environment) -> None:
+    # Подменяем класс шаблонов окружения: время рендеринга меряется и для
+    # get_template().render(), и для TemplateResponse. Вызывать до загрузки
+    # шаблонов — уже загруженные остаются в кэше со старым классом
+    class TimedTemplate(env.template_class):  # type: ignore[name-defined, misc]
+        def render(self, *args: Any, **kwargs: Any) -> str:
+            started = time.perf_counter()
+            try:
+                return super().render(*args, **kwargs)
+            finally:
+                TEMPLATE_SECONDS.observe(
+                    time.perf_counter() - started, self.name or "<string>"
+                )
+
+        def generate(self, *args: Any, **kwargs: Any) -> Iterator[str]:
+            # Потоковый рендеринг: считаем только время внутри шаблона,
+            # без ожидания отправки между кусками
+            pieces = super().generate(*args, **kwargs)
+            spent = 0.0
+            try:
+                while True:
+                    started = time.perf_counter()
+                    try:
+                        piece = next(pieces)
+                    except StopIteration:
+                        return
+                    finally:
+                        spent += time.perf_counter() - started
+                    yield piece
+            finally:
+                TEMPLATE_SECONDS.observe(spent, self.name or "<string>")
+
+    env.template_class = TimedTemplate
+
+
+class SlowRequestProfiler:
+    # Выборочный профилировщик: фоновый поток каждые interval секунд снимает
+    # стек потока цикла событий и приписывает его задаче, которая сейчас
+    # выполняется. Запрос — это задача uvicorn, поэтому стеки разных
+    # одновременных запросов не смешиваются. Запросы медленнее threshold
+    # дописываются в файл в свёрнутом виде: "маршрут;кадр;кадр число"
+    def __init__(
+        self,
+        threshold: float,
+        interval: float = PROFILE_INTERVAL_MS / 1000,
+        path: str = PROFILE_FILE,
+    ) -> None:
+        self.threshold = threshold
+        self.interval = interval
+        self.path = path
+        self._samples: Dict["asyncio.Task[Any]", List[Tuple[str, ...]]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_id = 0
+        self._thread: Optional[threading.Thread] = None
+        self._file_lock = threading.Lock()
+        self.dumped = 0
+
+    def begin(self) -> Optional["asyncio.Task[Any]"]:
+        task = asyncio.current_task()
+        if task is None:
+            return None
+        if self._thread is None:
+            self._loop = task.get_loop()
+            self._thread_id = threading.get_ident()
+            self._thread = threading.Thread(
+                target=self._run, name="slow-request-profiler", daemon=True
+            )
+            self._thread.start()
+        self._samples[task] = []
+        return task
+
+    def end(
+        self, task: Optional["asyncio.Task[Any]"], label: str, elapsed: float
+    ) -> None:
+        if task is None:
+            return
+        samples = self._samples.pop(task, [])
+        if elapsed < self.threshold or not samples:
+            return
+        folded: Dict[Tuple[str, ...], int] = {}
+        for stack in samples:
+            folded[stack] = folded.get(stack, 0) + 1
+        root = label.replace(";", ",").replace(" ", "_")
+        lines = "".join(
+            f"{';'.join((root,) + stack)} {count}\n" for stack, count in folded.items()
+        )
+        with self._file_lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+        self.dumped += 1
+        print(f"Медленный запрос {label}: {elapsed * 1000:.0f} мс, стеки в {self.path}")
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            if not self._samples:
+                continue
+            try:
+                task = asyncio.current_task(self._loop)
+            except RuntimeError:
+                continue
+            samples = self._samples.get(task) if task is not None else None
+            frame = sys._current_frames().get(self._thread_id)
+            if samples is not None and frame is not None:
+                samples.append(_stack(frame))
+
+
+def _stack(frame: Optional[FrameType]) -> Tuple[str, ...]:
+    # От корня к листу, как принято в свёрнутом формате
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+        )
+        frame = frame.f_back
+    return tuple(reversed(names))
+
+
+class MetricsMiddleware:
+    # Чистый ASGI, без BaseHTTPMiddleware: не заводит лишнюю задачу на запрос
+    # и не буферизует потоковые ответы. Маршрут в метках — шаблон пути из
+    # декоратора, а не сам путь, иначе число рядов росло бы с числом постов
+    def __init__(
+        self,
+        app: ASGIApp,
+        registry: Registry = REGISTRY,
+        profiler: Optional[SlowRequestProfiler] = None,
+    ) -> None:
+        self.app = app
+        self.profiler = profiler
+        self._routes: Optional[Dict[Any, str]] = None
+        self.requests = registry.counter(
+            "blog_http_requests_total", "Число запросов", ("method", "route", "status")
+        )
+        self.latency = registry.histogram(
+            "blog_http_request_duration_seconds",
+            "Время ответа до последнего байта",
+            ("method", "route"),
+        )
+        self.sizes = registry.histogram(
+            "blog_http_response_size_bytes",
+            "Размер тела ответа",
+            ("method", "route"),
+            SIZE_BUCKETS,
+        )
+        self.in_flight = registry.gauge(
+            "blog_http_requests_in_flight", "Запросы в обработке", ("method",)
+        )
+        self._in_flight: Dict[str, int] = {}
+
+    def _route(self, scope: Scope) -> str:
+        # Маршрутизатор кладёт в scope обработчик; шаблон пути ищем по нему
+        if self._routes is None:
+            app = scope.get("app")
+            self._routes = {
+                route.endpoint: route.path
+                for route in getattr(app, "routes", ())
+                if hasattr(route, "endpoint")
+            }
+        endpoint = scope.get("endpoint")
+        return self._routes.get(endpoint, "unmatched") if endpoint else "unmatched"
+
+    def _track(self, method: str, delta: int) -> None:
+        count = self._in_flight.get(method, 0) + delta
+        self._in_flight[method] = count
+        self.in_flight.set(method, value=count)
+
+    async def __call__(
+        self,
+        scope: Scope,
+        receive: Callable[[], Awaitable[Message]],
+        send: Callable[[Message], Awaitable[None]],
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+        size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        task = self.profiler.begin() if self.profiler is not None else None
+        self._track(method, 1)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._track(method, -1)
+            route = self._route(scope)
+            self.requests.inc(method, route, str(status))
+            self.latency.observe(elapsed, method, route)
+            self.sizes.observe(size, method, route)
+            if self.profiler is not None:
+                self.profiler.end(task, f"{method} {route}", elapsed)
@@ -0,0 +1,147 @@
+import base64
+import binascii
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from records import from_stamp, stamp_of, to_stamp
+from tombstones import COMPACT_RATIO
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# (createdAt в микросекундах от эпохи, id)
+SortKey = Tuple[int, int]
+
+
+class Page(NamedTuple):
+    ids: List[int]
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+
+
+def sort_key(record: Dict[str, Any]) -> SortKey:
+    return stamp_of(record), record["id"]
+
+
+def encode_cursor(direction: str, key: SortKey) -> str:
+    raw = f"{direction}|{from_stamp(key[0]).isoformat()}|{key[1]}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, SortKey]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        direction, created_at, record_id = (
+            base64.urlsafe_b64decode(padded).decode().split("|")
+        )
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return direction, (to_stamp(datetime.fromisoformat(created_at)), int(record_id))
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ValueError("Некорректный курсор")
+
+
+class KeysetIndex:
+    # Отсортированный по (createdAt, id) список ключей: страница по курсору
+    # ищется бинарным поиском и стоит O(log n + размер страницы).
+    # Удаление помечает ключ, а не сдвигает хвост списка; помеченные
+    # страницы пропускают, список сжимается потом (compact)
+    def __init__(self, records: Iterable[Dict[str, Any]]) -> None:
+        self._keys: List[SortKey] = sorted(sort_key(record) for record in records)
+        self._dead: Set[SortKey] = set()
+
+    def __len__(self) -> int:
+        return len(self._keys) - len(self._dead)
+
+    def add(self, record: Dict[str, Any]) -> None:
+        key = sort_key(record)
+        if key in self._dead:
+            # Ключ ещё лежит в списке — достаточно снять пометку
+            self._dead.remove(key)
+            return
+        # Новые записи почти всегда самые свежие — дописываем в конец
+        if not self._keys or self._keys[-1] < key:
+            self._keys.append(key)
+        else:
+            insort(self._keys, key)
+
+    def remove(self, record: Dict[str, Any]) -> None:
+        key = sort_key(record)
+        position = bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            self._dead.add(key)
+            if len(self._dead) > len(self._keys) * COMPACT_RATIO:
+                self.compact()
+
+    def compact(self, min_ratio: float = 0.0) -> int:
+        removed = len(self._dead)
+        if not removed or removed < len(self._keys) * min_ratio:
+            return 0
+        dead = self._dead
+        self._keys = [key for key in self._keys if key not in dead]
+        self._dead = set()
+        return removed
+
+    def last(self) -> Optional[SortKey]:
+        # Самый свежий живой ключ; помеченные в конце списка пропускаем
+        for key in reversed(self._keys):
+            if key not in self._dead:
+                return key
+        return None
+
+    def ids(self) -> List[int]:
+        dead = self._dead
+        return [key[1] for key in self._keys if key not in dead]
+
+    def page(self, limit: int, cursor: Optional[str] = None) -> Page:
+        if cursor is None:
+            direction, start = "next", 0
+        else:
+            direction, key = decode_cursor(cursor)
+            if direction == "next":
+                start = bisect_right(self._keys, key)
+            else:
+                start = bisect_left(self._keys, key)
+        if self._dead:
+            return self._live_page(direction, start, limit)
+
+        if direction == "next":
+            end = min(start + limit, len(self._keys))
+        else:
+            start, end = max(start - limit, 0), start
+        keys = self._keys[start:end]
+        next_cursor = None
+        prev_cursor = None
+        if keys and end < len(self._keys):
+            next_cursor = encode_cursor("next", keys[-1])
+        if keys and start > 0:
+            prev_cursor = encode_cursor("prev", keys[0])
+        return Page([key[1] for key in keys], next_cursor, prev_cursor)
+
+    def _live_page(self, direction: str, position: int, limit: int) -> Page:
+        # Та же страница, что без помеченных ключей: набираем limit живых
+        # и проверяем, есть ли живые ключи дальше в каждую сторону
+        keys, dead = self._keys, self._dead
+        found: List[SortKey] = []
+        if direction == "next":
+            start = end = position
+            while end < len(keys) and len(found) < limit:
+                if keys[end] not in dead:
+                    found.append(keys[end])
+                end += 1
+        else:
+            start = end = position
+            while start > 0 and len(found) < limit:
+                start -= 1
+                if keys[start] not in dead:
+                    found.append(keys[start])
+            found.reverse()
+        next_cursor = None
+        prev_cursor = None
+        if found and any(key not in dead for key in islice(keys, end, None)):
+            next_cursor = encode_cursor("next", found[-1])
+        if found and any(keys[i] not in dead for i in range(start - 1, -1, -1)):
+            prev_cursor = encode_cursor("prev", found[0])
+        return Page([key[1] for key in found], next_cursor, prev_cursor)
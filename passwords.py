@@ -0,0 +1,121 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+# Параметры scrypt: n=2**14, r=8 — около 16 МБ памяти и десятков мс на хэш
+SCRYPT_N = int(os.environ.get("BLOG_SCRYPT_N", str(2**14)))
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_SIZE = 16
+KEY_SIZE = 32
+
+# hashlib.scrypt отпускает GIL, поэтому хватает пула потоков.
+# Сверх workers + queue одновременных запросов пул отвечает отказом
+HASH_WORKERS = int(os.environ.get("BLOG_HASH_WORKERS", "2"))
+HASH_QUEUE_LIMIT = int(os.environ.get("BLOG_HASH_QUEUE_LIMIT", "32"))
+
+PREFIX = "scrypt"
+
+T = TypeVar("T")
+
+
+class HasherBusy(Exception):
+    pass
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii")
+
+
+def _derive(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode("utf-8"),
+        salt=salt,
+        n=n,
+        r=r,
+        p=p,
+        maxmem=2 * 128 * r * n + 2**20,
+        dklen=KEY_SIZE,
+    )
+
+
+def hash_password(password: str) -> str:
+    # Формат: scrypt$n$r$p$соль$ключ, соль и ключ в base64
+    salt = os.urandom(SALT_SIZE)
+    key = _derive(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return "$".join(
+        (PREFIX, str(SCRYPT_N), str(SCRYPT_R), str(SCRYPT_P))
+        + (_b64encode(salt), _b64encode(key))
+    )
+
+
+def is_hashed(stored: str) -> bool:
+    return stored.startswith(PREFIX + "$")
+
+
+def _parse(stored: str) -> Optional[Tuple[int, int, int, bytes, bytes]]:
+    try:
+        _, n, r, p, salt, key = stored.split("$")
+        return int(n), int(r), int(p), base64.b64decode(salt), base64.b64decode(key)
+    except ValueError:
+        return None
+
+
+def verify_password(password: str, stored: str) -> Tuple[bool, bool]:
+    # Возвращает (пароль верен, хэш пора пересчитать). Старые записи
+    # хранят пароль как есть — сверяем напрямую и просим перехэшировать
+    if not is_hashed(stored):
+        matches = hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+        return matches, matches
+    parsed = _parse(stored)
+    if parsed is None:
+        return False, False
+    n, r, p, salt, key = parsed
+    matches = hmac.compare_digest(_derive(password, salt, n, r, p), key)
+    outdated = (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return matches, matches and outdated
+
+
+class PasswordHasher:
+    # Хэширование и проверка паролей вне цикла событий, с ограниченной очередью
+    def __init__(
+        self, workers: int = HASH_WORKERS, queue_limit: int = HASH_QUEUE_LIMIT
+    ) -> None:
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hasher"
+        )
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        # Хэш для проверки несуществующих пользователей: ответ занимает
+        # столько же времени, и по нему не узнать, есть ли такой email
+        self._dummy_hash: Optional[str] = None
+
+    async def _run(self, function: Callable[..., T], *args: Any) -> T:
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._executor.submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, stored: Optional[str]) -> Tuple[bool, bool]:
+        if stored is None:
+            if self._dummy_hash is None:
+                self._dummy_hash = await self.hash("")
+            await self._run(verify_password, password, self._dummy_hash)
+            return False, False
+        return await self._run(verify_password, password, stored)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,125 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from metrics import timed
+from storage import Store
+
+# Сколько ждать попутные изменения, прежде чем сбросить пачку на диск
+COMMIT_WINDOW = float(os.environ.get("BLOG_COMMIT_WINDOW_MS", "5")) / 1000
+MAX_BATCH = int(os.environ.get("BLOG_COMMIT_MAX_BATCH", "1000"))
+
+_Request = Tuple[List[Dict[str, Any]], bool, "Future[None]"]
+
+
+class PersistenceWriter:
+    def __init__(
+        self,
+        store: Store,
+        window: float = COMMIT_WINDOW,
+        max_batch: int = MAX_BATCH,
+    ) -> None:
+        self.store = store
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.changes = 0
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="persistence-writer", daemon=True
+            )
+            self._thread.start()
+
+    def submit(
+        self, changes: List[Dict[str, Any]], durable: bool = False
+    ) -> "Future[None]":
+        future: "Future[None]" = Future()
+        if not changes:
+            future.set_result(None)
+            return future
+        self.start()
+        self._queue.put((changes, durable, future))
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        future: "Future[None]" = Future()
+        self.start()
+        self._queue.put(([], True, future))
+        future.result(timeout)
+
+    def stop(self) -> None:
+        # Дописываем всё, что осталось в очереди, и закрываем хранилище
+        with self._start_lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+        self.store.sync()
+        self.store.close()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    next_item = (
+                        self._queue.get(timeout=remaining)
+                        if remaining > 0
+                        else self._queue.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+                if next_item is None:
+                    stopping = True
+                    break
+                batch.append(next_item)
+
+            self._commit(batch)
+            if stopping:
+                return
+
+    def _commit(self, batch: List[_Request]) -> None:
+        changes = [change for item in batch for change in item[0]]
+        durable = any(item[1] for item in batch)
+        try:
+            with timed("storage_apply"):
+                self.store.apply(changes)
+            if durable:
+                with timed("storage_sync"):
+                    self.store.sync()
+        except Exception as e:
+            print(f"Ошибка сохранения данных: {e}")
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.changes += len(changes)
+        for _, _, future in batch:
+            future.set_result(None)
+
+
+def start_writer(store: Store, window: float = COMMIT_WINDOW) -> PersistenceWriter:
+    writer = PersistenceWriter(store, window)
+    writer.start()
+    # Страховка на случай, если lifespan-обработчик не отработал
+    atexit.register(writer.stop)
+    return writer
@@ -0,0 +1,206 @@
+import os
+import sys
+import zlib
+from collections.abc import Mapping, MutableMapping
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, ClassVar, Dict, Iterator, List, Optional, Tuple, Type
+
+# Рассказы длиннее этого (байт в UTF-8) хранятся сжатыми и распаковываются
+# при чтении; 0 — не сжимать. Готовый JSON постов и так лежит в JsonCache,
+# поэтому распаковка нужна только на промахе кэша и при показе поста
+COMPRESS_STORY_BYTES = int(os.environ.get("BLOG_COMPRESS_STORY_BYTES", "0"))
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_UTC = EPOCH.replace(tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+DATE_FIELDS = ("createdAt", "updatedAt")
+
+
+def to_stamp(value: datetime) -> int:
+    # Микросекунды от эпохи: int занимает 32 байта против 48 у datetime,
+    # и такие ключи сравниваются быстрее
+    if value.tzinfo is None:
+        return (value - EPOCH) // MICROSECOND
+    return (value - EPOCH_UTC) // MICROSECOND
+
+
+def from_stamp(stamp: int) -> datetime:
+    return EPOCH + timedelta(microseconds=stamp)
+
+
+def stamp_of(record: Mapping, field: str = "createdAt") -> int:
+    # Ключ сортировки без сборки datetime, если запись компактная
+    if isinstance(record, Record):
+        value = getattr(record, "_" + field)
+        return value if value.__class__ is int else to_stamp(value)
+    return to_stamp(record[field])
+
+
+def _encode_date(value: Any) -> Any:
+    # Даты с часовым поясом (редкость) храним как есть, чтобы не терять пояс
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return to_stamp(value)
+    return value
+
+
+def _decode_date(value: Any) -> Any:
+    return from_stamp(value) if value.__class__ is int else value
+
+
+def _encode_text(value: Any) -> Any:
+    if COMPRESS_STORY_BYTES and isinstance(value, str):
+        encoded = value.encode("utf-8")
+        if len(encoded) >= COMPRESS_STORY_BYTES:
+            compressed = zlib.compress(encoded)
+            if len(compressed) < sys.getsizeof(value) - sys.getsizeof(""):
+                return compressed
+    return value
+
+
+def _decode_text(value: Any) -> Any:
+    if value.__class__ is bytes:
+        return zlib.decompress(value).decode("utf-8")
+    return value
+
+
+Codec = Tuple[Callable[[Any], Any], Callable[[Any], Any]]
+DATE_CODEC: Codec = (_encode_date, _decode_date)
+TEXT_CODEC: Codec = (_encode_text, _decode_text)
+
+
+def _slots(fields: Tuple[str, ...], codecs: Dict[str, Codec]) -> Tuple[str, ...]:
+    # Поля с преобразованием лежат под именем с "_": шаблон, обратившись
+    # к journey.createdAt, не получит сырое число и возьмёт значение через []
+    return tuple("_" + field if field in codecs else field for field in fields)
+
+
+class Record(MutableMapping):
+    # Запись на __slots__ вместо словаря: ключи общие на класс, значения
+    # лежат в слотах объекта. Снаружи это по-прежнему mapping — шаблоны,
+    # JSON и индексы обращаются к полям через record["field"] и .get().
+    # Незаполненный слот — отсутствующий ключ, поля вне схемы — в _extra
+    __slots__ = ("_extra",)
+    FIELDS: ClassVar[Tuple[str, ...]] = ()
+    CODECS: ClassVar[Dict[str, Codec]] = {}
+    _SLOT_OF: ClassVar[Dict[str, str]] = {}
+
+    def __init_subclass__(cls) -> None:
+        super().__init_subclass__()
+        cls._SLOT_OF = dict(zip(cls.FIELDS, _slots(cls.FIELDS, cls.CODECS)))
+
+    def __init__(self, fields: Optional[Mapping] = None, **values: Any) -> None:
+        self._extra: Optional[Dict[str, Any]] = None
+        if fields is not None:
+            for key, value in fields.items():
+                self[key] = value
+        for key, value in values.items():
+            self[key] = value
+
+    def __getitem__(self, key: str) -> Any:
+        slot = self._SLOT_OF.get(key)
+        if slot is None:
+            if self._extra is None:
+                raise KeyError(key)
+            return self._extra[key]
+        try:
+            value = getattr(self, slot)
+        except AttributeError:
+            raise KeyError(key) from None
+        codec = self.CODECS.get(key)
+        return value if codec is None else codec[1](value)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        slot = self._SLOT_OF.get(key)
+        if slot is None:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[sys.intern(key)] = value
+            return
+        codec = self.CODECS.get(key)
+        setattr(self, slot, value if codec is None else codec[0](value))
+
+    def __delitem__(self, key: str) -> None:
+        slot = self._SLOT_OF.get(key)
+        if slot is None:
+            if self._extra is None:
+                raise KeyError(key)
+            del self._extra[key]
+            return
+        try:
+            delattr(self, slot)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: object) -> bool:
+        slot = self._SLOT_OF.get(key)  # type: ignore[call-overload]
+        if slot is None:
+            return self._extra is not None and key in self._extra
+        return hasattr(self, slot)
+
+    def __iter__(self) -> Iterator[str]:
+        for field, slot in self._SLOT_OF.items():
+            if hasattr(self, slot):
+                yield field
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    # Запись — сущность: равенство по тождеству, как у object. list.remove
+    # сравнивает удаляемую запись со всеми подряд, и сравнение по
+    # содержимому через Mapping.__eq__ делало удаление в разы дороже.
+    # Содержимое сравнивают явно: dict(record) == other
+    __eq__ = object.__eq__
+    __ne__ = object.__ne__
+    __hash__ = object.__hash__
+
+    def copy(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return type(self), (dict(self.items()),)
+
+
+class TravelerRecord(Record):
+    FIELDS = (
+        "id",
+        "email",
+        "username",
+        "password",
+        "createdAt",
+        "updatedAt",
+        "version",
+    )
+    CODECS = {field: DATE_CODEC for field in DATE_FIELDS}
+    __slots__ = _slots(FIELDS, CODECS)
+
+
+class JourneyRecord(Record):
+    FIELDS = (
+        "id",
+        "travelerId",
+        "destination",
+        "story",
+        "locationLat",
+        "locationLng",
+        "viewCount",
+        "likeCount",
+        "createdAt",
+        "updatedAt",
+        "version",
+    )
+    CODECS = {"story": TEXT_CODEC, **{field: DATE_CODEC for field in DATE_FIELDS}}
+    __slots__ = _slots(FIELDS, CODECS)
+
+
+def compact_all(records: List[Any], record_class: Type[Record]) -> List[Any]:
+    # Замена на месте: исходные словари освобождаются по ходу, и в пике
+    # память не удваивается
+    for position, record in enumerate(records):
+        if not isinstance(record, record_class):
+            records[position] = record_class(record)
+    return records
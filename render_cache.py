@@ -0,0 +1,89 @@
+import os
+from collections import OrderedDict
+from typing import Dict, Generic, Hashable, Iterable, Optional, Set, Tuple, TypeVar
+
+PAGE_CACHE_SIZE = int(os.environ.get("BLOG_PAGE_CACHE_SIZE", "1024"))
+FRAGMENT_CACHE_SIZE = int(os.environ.get("BLOG_FRAGMENT_CACHE_SIZE", "20000"))
+
+# Готовый HTML: строка для карточек, байты со сжатым вариантом для страниц
+V = TypeVar("V")
+
+
+class RenderCache(Generic[V]):
+    # LRU-кэш готового HTML. Каждая запись помечена тегами вида "journey:5",
+    # и изменение записи сбрасывает ровно те страницы, где она выводилась
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[V, Set[str]]]" = OrderedDict()
+        self._keys_by_tag: Dict[str, Set[Hashable]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Растёт при каждом сбросе: страница, отрендеренная по частям,
+        # кладётся в кэш, только если за это время ничего не менялось
+        self.epoch = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(
+        self,
+        key: Hashable,
+        html: V,
+        tags: Iterable[str],
+        epoch: Optional[int] = None,
+    ) -> None:
+        # epoch — значение self.epoch на начало рендеринга
+        if epoch is not None and epoch != self.epoch:
+            return
+        self._discard(key)
+        tag_set = set(tags)
+        self._entries[key] = (html, tag_set)
+        for tag in tag_set:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+
+    def invalidate(self, tag: str) -> None:
+        self.epoch += 1
+        for key in list(self._keys_by_tag.get(tag, ())):
+            self._discard(key)
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self.epoch += 1
+        self._entries.clear()
+        self._keys_by_tag.clear()
+
+    def _discard(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[1]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,430 @@
+import time
+from datetime import datetime
+from typing import Any, Callable, Collection, Dict, Iterable, List, Optional, Tuple
+
+from pagination import KeysetIndex, Page, sort_key
+from records import JourneyRecord, TravelerRecord, compact_all
+from tombstones import TombstoneList
+
+# Слушатель изменений: (операция create/update/delete/counters, коллекция, запись)
+Listener = Callable[[str, str, Dict[str, Any]], None]
+# Применяет к индексу коллекции изменение из журнала ({"op": "put", "rec": ...}
+# или {"op": "del", "id": ...}), записанное другим процессом
+Replayer = Callable[[Dict[str, Any]], None]
+
+# Поля поста, которые меняет только сброс просмотров и лайков
+COUNTER_FIELDS = ("viewCount", "likeCount")
+# Версия записи: растёт при каждом её изменении (см. VersionClock)
+VERSION_FIELD = "version"
+
+
+def now_us() -> int:
+    return time.time_ns() // 1000
+
+
+class VersionClock:
+    # Гибридные часы: версия — микросекунды от эпохи, но всегда больше
+    # предыдущей. Версии переживают перезапуск (время идёт вперёд), а
+    # процессы с общим журналом выдают их под одной блокировкой и
+    # подтягивают часы по чужим изменениям
+    def __init__(self) -> None:
+        # До изменений — самая новая из загруженных версий (см. ChangeLog):
+        # у процессов с одними данными она одна и та же
+        self.last = 0
+
+    def tick(self) -> int:
+        self.last = max(self.last + 1, now_us())
+        return self.last
+
+    def observe(self, version: Optional[int]) -> None:
+        if version is not None and version > self.last:
+            self.last = version
+
+
+class BlogRepository:
+    def __init__(
+        self,
+        travelers: List[Dict[str, Any]],
+        journeys: List[Dict[str, Any]],
+        next_traveler_id: int = 1,
+        next_journey_id: int = 1,
+    ) -> None:
+        # Записи хранятся компактно (records.py), словари из хранилища
+        # заменяются на месте. Удаление только помечает запись, список
+        # сжимается потом (compact)
+        self.travelers = TombstoneList(compact_all(travelers, TravelerRecord))
+        self.journeys = TombstoneList(compact_all(journeys, JourneyRecord))
+        self.next_traveler_id = next_traveler_id
+        self.next_journey_id = next_journey_id
+        # Изменения, ещё не переданные в хранилище
+        self._changes: List[Dict[str, Any]] = []
+        self._listeners: List[Listener] = []
+        # Коллекция -> (применить чужое изменение, все записи коллекции)
+        self._replayers: Dict[
+            str, Tuple[Replayer, Callable[[], Collection[Dict[str, Any]]]]
+        ] = {}
+        self._replaying = False
+        # Версия удаления, которое сейчас применяется из журнала
+        self._replay_version: Optional[int] = None
+        # Прежние значения полей записи, о правке которой сейчас сообщают
+        # слушателям: индексам по этим полям нужно знать, откуда её убрать
+        self.previous: Dict[str, Any] = {}
+        self.clock = VersionClock()
+
+        # Индексы: id -> запись, email -> пользователь, travelerId -> его посты
+        self._travelers_by_id: Dict[int, Dict[str, Any]] = {}
+        self._travelers_by_email: Dict[str, Dict[str, Any]] = {}
+        self._journeys_by_id: Dict[int, Dict[str, Any]] = {}
+        self._journeys_by_traveler: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        self._rebuild_indexes()
+
+    def _rebuild_indexes(self) -> None:
+        self._travelers_by_id.clear()
+        self._travelers_by_email.clear()
+        self._journeys_by_id.clear()
+        self._journeys_by_traveler.clear()
+        for traveler in self.travelers:
+            self._index_traveler(traveler)
+        for journey in self.journeys:
+            self._index_journey(journey)
+        # Порядок для постраничного вывода: (createdAt, id)
+        self._traveler_order = KeysetIndex(self.travelers)
+        self._journey_order = KeysetIndex(self.journeys)
+
+    def _index_traveler(self, traveler: Dict[str, Any]) -> None:
+        self._travelers_by_id[traveler["id"]] = traveler
+        self._travelers_by_email[traveler["email"]] = traveler
+
+    def _unindex_traveler(self, traveler: Dict[str, Any]) -> None:
+        self._travelers_by_id.pop(traveler["id"], None)
+        if self._travelers_by_email.get(traveler["email"]) is traveler:
+            del self._travelers_by_email[traveler["email"]]
+
+    def _index_journey(self, journey: Dict[str, Any]) -> None:
+        self._journeys_by_id[journey["id"]] = journey
+        by_author = self._journeys_by_traveler.setdefault(journey["travelerId"], {})
+        by_author[journey["id"]] = journey
+
+    def _unindex_journey(self, journey: Dict[str, Any]) -> None:
+        self._journeys_by_id.pop(journey["id"], None)
+        by_author = self._journeys_by_traveler.get(journey["travelerId"])
+        if by_author is not None:
+            by_author.pop(journey["id"], None)
+            if not by_author:
+                del self._journeys_by_traveler[journey["travelerId"]]
+
+    def add_listener(self, listener: Listener) -> None:
+        self._listeners.append(listener)
+
+    def emit(self, op: str, collection: str, record: Dict[str, Any]) -> None:
+        # Через репозиторий о своих изменениях сообщают и другие коллекции
+        # (комментарии): в хранилище и слушателям всё уходит одной очередью.
+        # Чужие изменения (replay) и их каскады уже записаны другим процессом
+        # Каждое изменение получает новую версию; она пишется в запись и
+        # уходит в журнал, чтобы другие процессы и перезапуск её сохранили
+        if not self._replaying:
+            record[VERSION_FIELD] = self.clock.tick()
+            if op == "delete":
+                self._changes.append(
+                    {
+                        "op": "del",
+                        "c": collection,
+                        "id": record["id"],
+                        "v": record[VERSION_FIELD],
+                    }
+                )
+            else:
+                self._changes.append(
+                    {"op": "put", "c": collection, "rec": dict(record)}
+                )
+        else:
+            if op == "delete":
+                # Каскады чужого удаления получают его же версию
+                record[VERSION_FIELD] = self._replay_version or self.clock.last
+            self.clock.observe(record.get(VERSION_FIELD))
+        for listener in self._listeners:
+            listener(op, collection, record)
+
+    def drain_changes(self) -> List[Dict[str, Any]]:
+        changes, self._changes = self._changes, []
+        return changes
+
+    # Изменения других процессов
+
+    def add_replayer(
+        self,
+        collection: str,
+        replayer: Replayer,
+        records: Callable[[], Collection[Dict[str, Any]]],
+    ) -> None:
+        self._replayers[collection] = (replayer, records)
+
+    def compact(self, min_ratio: float = 0.0) -> int:
+        # Физически убирает удалённые записи и их ключи в порядке страниц,
+        # если их не меньше min_ratio; вызывается фоновой задачей
+        return sum(
+            records.compact(min_ratio)
+            for records in (
+                self.travelers,
+                self.journeys,
+                self._traveler_order,
+                self._journey_order,
+            )
+        )
+
+    def records(self, collection: str) -> Collection[Dict[str, Any]]:
+        if collection == "travelers":
+            return self.travelers
+        if collection == "journeys":
+            return self.journeys
+        # Коллекция без индекса в этом процессе — сверять нечего
+        replayer = self._replayers.get(collection)
+        return replayer[1]() if replayer is not None else []
+
+    def replay(self, changes: List[Dict[str, Any]]) -> None:
+        # Изменения из общего журнала, записанные другими процессами: индексы
+        # и слушатели обновляются как при своих правках, но в очередь на
+        # запись ничего не попадает
+        self._replaying = True
+        try:
+            for change in changes:
+                collection = change["c"]
+                self._replay_version = change.get("v")
+                if collection == "travelers":
+                    self._replay_traveler(change)
+                elif collection == "journeys":
+                    self._replay_journey(change)
+                elif collection in self._replayers:
+                    self._replayers[collection][0](change)
+        finally:
+            self._replaying = False
+            self._replay_version = None
+
+    def _replay_traveler(self, change: Dict[str, Any]) -> None:
+        if change["op"] == "del":
+            self.delete_traveler(change["id"])
+            return
+        record = change["rec"]
+        traveler = self._travelers_by_id.get(record["id"])
+        if traveler is not None:
+            self.update_traveler(traveler, touch=False, **record)
+            return
+        traveler = TravelerRecord(record)
+        self.travelers.append(traveler)
+        self._index_traveler(traveler)
+        self._traveler_order.add(traveler)
+        self.next_traveler_id = max(self.next_traveler_id, traveler["id"] + 1)
+        self.emit("create", "travelers", traveler)
+
+    def _replay_journey(self, change: Dict[str, Any]) -> None:
+        if change["op"] == "del":
+            self.delete_journey(change["id"])
+            return
+        record = change["rec"]
+        journey = self._journeys_by_id.get(record["id"])
+        if journey is not None:
+            # Запись целиком: если отличаются только счётчики — это их сброс
+            counters_only = all(
+                journey.get(field) == value
+                for field, value in record.items()
+                if field not in COUNTER_FIELDS and field != VERSION_FIELD
+            )
+            previous = _changed_fields(journey, record)
+            self._unindex_journey(journey)
+            journey.update(record)
+            self._index_journey(journey)
+            self._emit_update(
+                "counters" if counters_only else "update", "journeys", journey, previous
+            )
+            return
+        journey = JourneyRecord(record)
+        self.journeys.append(journey)
+        self._index_journey(journey)
+        self._journey_order.add(journey)
+        self.next_journey_id = max(self.next_journey_id, journey["id"] + 1)
+        self.emit("create", "journeys", journey)
+
+    # Пользователи
+
+    def get_traveler(self, traveler_id: int) -> Optional[Dict[str, Any]]:
+        return self._travelers_by_id.get(traveler_id)
+
+    def get_traveler_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        return self._travelers_by_email.get(email)
+
+    def traveler_exists(self, traveler_id: int) -> bool:
+        return traveler_id in self._travelers_by_id
+
+    def create_traveler(
+        self,
+        email: str,
+        username: str,
+        password: str,
+        created_at: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        # created_at задаётся при переносе записей из выгрузки
+        now = datetime.now()
+        traveler = TravelerRecord(
+            id=self.next_traveler_id,
+            email=email,
+            username=username,
+            password=password,
+            createdAt=created_at or now,
+            updatedAt=now,
+        )
+        self.travelers.append(traveler)
+        self._index_traveler(traveler)
+        self._traveler_order.add(traveler)
+        self.next_traveler_id += 1
+        self.emit("create", "travelers", traveler)
+        return traveler
+
+    def update_traveler(
+        self, traveler: Dict[str, Any], touch: bool = True, **fields: Any
+    ) -> Dict[str, Any]:
+        # touch=False — служебная правка (перехэширование пароля), updatedAt не меняем
+        self._unindex_traveler(traveler)
+        traveler.update(fields)
+        if touch:
+            traveler["updatedAt"] = datetime.now()
+        self._index_traveler(traveler)
+        self.emit("update", "travelers", traveler)
+        return traveler
+
+    def delete_traveler(self, traveler_id: int) -> bool:
+        traveler = self._travelers_by_id.get(traveler_id)
+        if traveler is None:
+            return False
+        # Посты удаляются вместе с автором, как ON DELETE CASCADE в схеме:
+        # их удаления уходят в журнал раньше удаления самого пользователя
+        for journey in list(self._journeys_by_traveler.get(traveler_id, {}).values()):
+            self._remove_journey(journey)
+        self._unindex_traveler(traveler)
+        self._traveler_order.remove(traveler)
+        self.travelers.discard(traveler)
+        self.emit("delete", "travelers", traveler)
+        return True
+
+    def get_travelers(self, traveler_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        # В порядке запроса, без отсутствующих и повторов
+        return self._get_many(traveler_ids, self._travelers_by_id)
+
+    def page_travelers(
+        self, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Page]:
+        page = self._traveler_order.page(limit, cursor)
+        return [self._travelers_by_id[i] for i in page.ids], page
+
+    # Путешествия
+
+    def get_journey(self, journey_id: int) -> Optional[Dict[str, Any]]:
+        return self._journeys_by_id.get(journey_id)
+
+    def get_journeys_by_traveler(self, traveler_id: int) -> List[Dict[str, Any]]:
+        return list(self._journeys_by_traveler.get(traveler_id, {}).values())
+
+    def create_journey(
+        self,
+        traveler_id: int,
+        destination: str,
+        story: str,
+        created_at: Optional[datetime] = None,
+        location_lat: Optional[float] = None,
+        location_lng: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        now = datetime.now()
+        journey = JourneyRecord(
+            id=self.next_journey_id,
+            travelerId=traveler_id,
+            destination=destination,
+            story=story,
+            locationLat=location_lat,
+            locationLng=location_lng,
+            viewCount=0,
+            likeCount=0,
+            createdAt=created_at or now,
+            updatedAt=now,
+        )
+        self.journeys.append(journey)
+        self._index_journey(journey)
+        self._journey_order.add(journey)
+        self.next_journey_id += 1
+        self.emit("create", "journeys", journey)
+        return journey
+
+    def update_journey(self, journey: Dict[str, Any], **fields: Any) -> Dict[str, Any]:
+        previous = _changed_fields(journey, fields)
+        self._unindex_journey(journey)
+        journey.update(fields)
+        journey["updatedAt"] = datetime.now()
+        self._index_journey(journey)
+        self._emit_update("update", "journeys", journey, previous)
+        return journey
+
+    def _emit_update(
+        self, op: str, collection: str, record: Dict[str, Any], previous: Dict[str, Any]
+    ) -> None:
+        self.previous = previous
+        try:
+            self.emit(op, collection, record)
+        finally:
+            self.previous = {}
+
+    def update_journey_counters(
+        self, journey: Dict[str, Any], **counters: int
+    ) -> Dict[str, Any]:
+        # Просмотры и лайки — не правка поста: updatedAt не меняется,
+        # слушатели получают отдельную операцию "counters"
+        journey.update(counters)
+        self.emit("counters", "journeys", journey)
+        return journey
+
+    def delete_journey(self, journey_id: int) -> bool:
+        journey = self._journeys_by_id.get(journey_id)
+        if journey is None:
+            return False
+        self._remove_journey(journey)
+        return True
+
+    def _remove_journey(self, journey: Dict[str, Any]) -> None:
+        self._unindex_journey(journey)
+        self._journey_order.remove(journey)
+        self.journeys.discard(journey)
+        self.emit("delete", "journeys", journey)
+
+    def get_journeys(self, journey_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        return self._get_many(journey_ids, self._journeys_by_id)
+
+    def is_latest_journey(self, journey: Dict[str, Any]) -> bool:
+        # Пост встал в конец ленты, а не между уже существующими
+        return self._journey_order.last() == sort_key(journey)
+
+    def page_journeys(
+        self, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Page]:
+        page = self._journey_order.page(limit, cursor)
+        return [self._journeys_by_id[i] for i in page.ids], page
+
+    # Выборка нескольких записей по id
+
+    @staticmethod
+    def _get_many(
+        record_ids: Iterable[int], by_id: Dict[int, Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        seen = set()
+        found = []
+        for record_id in record_ids:
+            record = by_id.get(record_id)
+            if record is not None and record_id not in seen:
+                seen.add(record_id)
+                found.append(record)
+        return found
+
+
+def _changed_fields(record: Dict[str, Any], fields: Dict[str, Any]) -> Dict[str, Any]:
+    # Прежние значения полей, которые правка меняет
+    return {
+        field: record.get(field)
+        for field, value in fields.items()
+        if record.get(field) != value
+    }
@@ -0,0 +1,195 @@
+import heapq
+import math
+import os
+import pickle
+import re
+from bisect import bisect_left, insort
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SEARCH_INDEX_FILE = "blog_data.search"
+INDEX_VERSION = 1
+
+# Параметры BM25
+K1 = 1.2
+B = 0.75
+# Название весит больше текста рассказа
+DESTINATION_WEIGHT = 2
+# Сколько словоформ подставлять для последнего слова запроса по префиксу
+# и с каким весом они учитываются относительно точного совпадения
+MAX_PREFIX_EXPANSIONS = 50
+PREFIX_WEIGHT = 0.5
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_CYRILLIC_RE = re.compile(r"[а-я]")
+
+# Окончания русских слов, от длинных к коротким: облегчённый стеммер,
+# отрезающий одно окончание и оставляющий основу не короче трёх букв
+_RUSSIAN_ENDINGS = sorted(
+    (
+        "иями ями ами иях ях ах ией ием ого его ому ему ыми ими ым им ых их "
+        "ой ей ий ый "
+        "ая яя ое ее ие ые ую юю ом ем ам ям ов ев ия ья ию ью ии ться тся "
+        "ешь ишь ете ите ает яет ют ут ат ят ить ать ять еть уть ла ло ли ть "
+        "а я о е ы и у ю ь й л"
+    ).split(),
+    key=len,
+    reverse=True,
+)
+
+
+@lru_cache(maxsize=200_000)
+def stem(word: str) -> str:
+    if not _CYRILLIC_RE.search(word):
+        return word
+    for ending in _RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 3:
+            return word[: -len(ending)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(token) for token in _TOKEN_RE.findall(text.lower().replace("ё", "е"))]
+
+
+class SearchIndex:
+    def __init__(self) -> None:
+        # термин -> {id поста: частота}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        # id поста -> (частоты терминов, длина документа, метка версии)
+        self._documents: Dict[int, Tuple[Dict[str, int], int, str]] = {}
+        self._total_length = 0
+        # Отсортированный словарь для поиска по префиксу
+        self._vocabulary: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, journey: Dict[str, Any]) -> None:
+        self.remove(journey["id"])
+        tokens = tokenize(journey["destination"]) * DESTINATION_WEIGHT
+        tokens += tokenize(journey["story"])
+        frequencies: Dict[str, int] = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+
+        for term, count in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                insort(self._vocabulary, term)
+            postings[journey["id"]] = count
+        self._documents[journey["id"]] = (
+            frequencies,
+            len(tokens),
+            str(journey["updatedAt"]),
+        )
+        self._total_length += len(tokens)
+
+    def remove(self, journey_id: int) -> None:
+        document = self._documents.pop(journey_id, None)
+        if document is None:
+            return
+        frequencies, length, _ = document
+        self._total_length -= length
+        for term in frequencies:
+            postings = self._postings[term]
+            del postings[journey_id]
+            if not postings:
+                del self._postings[term]
+                position = bisect_left(self._vocabulary, term)
+                del self._vocabulary[position]
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        position = bisect_left(self._vocabulary, prefix)
+        terms = []
+        while (
+            position < len(self._vocabulary)
+            and self._vocabulary[position].startswith(prefix)
+            and len(terms) < MAX_PREFIX_EXPANSIONS
+        ):
+            terms.append(self._vocabulary[position])
+            position += 1
+        return terms
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[int, float]]:
+        terms = tokenize(query)
+        if not terms or not self._documents:
+            return []
+
+        # Последнее слово запроса может быть недописанным — ищем и по префиксу
+        weights: Dict[str, float] = {
+            term: PREFIX_WEIGHT for term in self._expand_prefix(terms[-1])
+        }
+        for term in terms:
+            weights[term] = 1.0
+
+        document_count = len(self._documents)
+        average_length = self._total_length / document_count
+        scores: Dict[int, float] = {}
+        for term, weight in weights.items():
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = weight * math.log(
+                1 + (document_count - len(postings) + 0.5) / (len(postings) + 0.5)
+            )
+            for journey_id, frequency in postings.items():
+                length = self._documents[journey_id][1]
+                norm = K1 * (1 - B + B * length / average_length)
+                scores[journey_id] = scores.get(journey_id, 0.0) + idf * (
+                    frequency * (K1 + 1) / (frequency + norm)
+                )
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    def sync_with(self, journeys: Iterable[Dict[str, Any]]) -> int:
+        # Доиндексируем только изменившиеся посты, лишние удаляем
+        seen = set()
+        updated = 0
+        for journey in journeys:
+            seen.add(journey["id"])
+            document = self._documents.get(journey["id"])
+            if document is None or document[2] != str(journey["updatedAt"]):
+                self.add(journey)
+                updated += 1
+        for journey_id in [i for i in self._documents if i not in seen]:
+            self.remove(journey_id)
+            updated += 1
+        return updated
+
+    def save(self, path: str = SEARCH_INDEX_FILE) -> None:
+        # У каждого процесса свой временный файл: при нескольких процессах
+        # uvicorn индекс сохраняют все, побеждает последний
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        state = (INDEX_VERSION, self._postings, self._documents, self._total_length)
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = SEARCH_INDEX_FILE) -> Optional["SearchIndex"]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                version, postings, documents, total_length = pickle.load(f)
+        except Exception as e:
+            print(f"❌ Ошибка загрузки поискового индекса: {e}")
+            return None
+        if version != INDEX_VERSION:
+            return None
+        index = cls()
+        index._postings = postings
+        index._documents = documents
+        index._total_length = total_length
+        index._vocabulary = sorted(postings)
+        return index
+
+
+def open_index(
+    journeys: Iterable[Dict[str, Any]], path: str = SEARCH_INDEX_FILE
+) -> SearchIndex:
+    index = SearchIndex.load(path) or SearchIndex()
+    index.sync_with(journeys)
+    return index
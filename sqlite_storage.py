@@ -0,0 +1,521 @@
+import argparse
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from repository import VERSION_FIELD
+from storage import (
+    CORE_COLLECTIONS,
+    DATA_FILE,
+    JOURNAL_FILE,
+    BaseStore,
+    JournalStore,
+    tombstone_cutoff,
+)
+
+SQLITE_FILE = os.environ.get("BLOG_SQLITE_FILE", "blog_data.sqlite3")
+POOL_SIZE = int(os.environ.get("BLOG_SQLITE_POOL_SIZE", "4"))
+
+# database_schema.sql, переведённая с PostgreSQL на SQLite: SERIAL -> INTEGER
+# PRIMARY KEY AUTOINCREMENT, TIMESTAMP WITH TIME ZONE -> TEXT (ISO-8601),
+# DECIMAL -> REAL, plpgsql-триггеры -> триггеры SQLite. Уникальность username
+# приложение не проверяет, поэтому здесь её нет. У journey_categories вместо
+# составного ключа суррогатный id: изменения адресуют записи по id, как в
+# остальных таблицах, а пара (journey_id, category_id) осталась уникальной.
+# Колонка version — версия записи для ETag и GET /api/changes (versions.py).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email VARCHAR(255) UNIQUE NOT NULL,
+    username VARCHAR(100) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    version INTEGER,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS journeys (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    traveler_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    destination VARCHAR(500) NOT NULL,
+    story TEXT NOT NULL,
+    image_url VARCHAR(500),
+    location_lat REAL,
+    location_lng REAL,
+    status VARCHAR(20) DEFAULT 'published'
+        CHECK (status IN ('draft', 'published', 'archived')),
+    view_count INTEGER DEFAULT 0,
+    like_count INTEGER DEFAULT 0,
+    version INTEGER,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100) UNIQUE NOT NULL,
+    slug VARCHAR(100) UNIQUE NOT NULL,
+    description TEXT,
+    version INTEGER,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS journey_categories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    journey_id INTEGER NOT NULL REFERENCES journeys(id) ON DELETE CASCADE,
+    category_id INTEGER NOT NULL REFERENCES categories(id) ON DELETE CASCADE,
+    version INTEGER,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (journey_id, category_id)
+);
+
+CREATE TABLE IF NOT EXISTS favorites (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    journey_id INTEGER NOT NULL REFERENCES journeys(id) ON DELETE CASCADE,
+    version INTEGER,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(user_id, journey_id)
+);
+
+CREATE TABLE IF NOT EXISTS comments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    content TEXT NOT NULL,
+    author_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    journey_id INTEGER NOT NULL REFERENCES journeys(id) ON DELETE CASCADE,
+    parent_comment_id INTEGER REFERENCES comments(id) ON DELETE CASCADE,
+    version INTEGER,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS subscriptions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    subscriber_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    target_user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    version INTEGER,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(subscriber_id, target_user_id),
+    CHECK (subscriber_id != target_user_id)
+);
+
+-- Удаления для GET /api/changes (см. versions.py) и самая новая версия
+-- среди уже забытых: дельта изменений переживает перезапуск
+CREATE TABLE IF NOT EXISTS tombstones (
+    collection VARCHAR(50) NOT NULL,
+    record_id INTEGER NOT NULL,
+    version INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS forgotten_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_tombstones_version ON tombstones(version);
+CREATE INDEX IF NOT EXISTS idx_journeys_traveler_id ON journeys(traveler_id);
+CREATE INDEX IF NOT EXISTS idx_journeys_created_at ON journeys(created_at);
+CREATE INDEX IF NOT EXISTS idx_comments_journey_id ON comments(journey_id);
+CREATE INDEX IF NOT EXISTS idx_comments_author_id ON comments(author_id);
+CREATE INDEX IF NOT EXISTS idx_favorites_user_id ON favorites(user_id);
+CREATE INDEX IF NOT EXISTS idx_subscriptions_subscriber_id
+    ON subscriptions(subscriber_id);
+CREATE INDEX IF NOT EXISTS idx_subscriptions_target_user_id
+    ON subscriptions(target_user_id);
+
+CREATE TRIGGER IF NOT EXISTS update_users_updated_at AFTER UPDATE ON users
+    FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE users SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS update_journeys_updated_at AFTER UPDATE ON journeys
+    FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE journeys SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS update_comments_updated_at AFTER UPDATE ON comments
+    FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE comments SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+"""
+
+# Коллекция приложения -> (таблица, поле записи -> колонка)
+TABLES: Dict[str, Tuple[str, Dict[str, str]]] = {
+    "travelers": (
+        "users",
+        {
+            "id": "id",
+            "email": "email",
+            "username": "username",
+            # Хэш scrypt; записи из старых данных перехэшируются при входе
+            "password": "password_hash",
+            "createdAt": "created_at",
+            "updatedAt": "updated_at",
+            "version": "version",
+        },
+    ),
+    "journeys": (
+        "journeys",
+        {
+            "id": "id",
+            "travelerId": "traveler_id",
+            "destination": "destination",
+            "story": "story",
+            "locationLat": "location_lat",
+            "locationLng": "location_lng",
+            "viewCount": "view_count",
+            "likeCount": "like_count",
+            "createdAt": "created_at",
+            "updatedAt": "updated_at",
+            "version": "version",
+        },
+    ),
+    "comments": (
+        "comments",
+        {
+            "id": "id",
+            "journeyId": "journey_id",
+            "authorId": "author_id",
+            "parentId": "parent_comment_id",
+            "content": "content",
+            "createdAt": "created_at",
+            "updatedAt": "updated_at",
+            "version": "version",
+        },
+    ),
+    "subscriptions": (
+        "subscriptions",
+        {
+            "id": "id",
+            "subscriberId": "subscriber_id",
+            "targetUserId": "target_user_id",
+            "createdAt": "created_at",
+            "version": "version",
+        },
+    ),
+    "categories": (
+        "categories",
+        {
+            "id": "id",
+            "name": "name",
+            "slug": "slug",
+            "description": "description",
+            "createdAt": "created_at",
+            "version": "version",
+        },
+    ),
+    "journey_categories": (
+        "journey_categories",
+        {
+            "id": "id",
+            "journeyId": "journey_id",
+            "categoryId": "category_id",
+            "createdAt": "created_at",
+            "version": "version",
+        },
+    ),
+    "favorites": (
+        "favorites",
+        {
+            "id": "id",
+            "userId": "user_id",
+            "journeyId": "journey_id",
+            "createdAt": "created_at",
+            "version": "version",
+        },
+    ),
+}
+
+INSERT_TOMBSTONE = "INSERT INTO tombstones VALUES (?, ?, ?)"
+
+DATE_FIELDS = ("createdAt", "updatedAt")
+# Значения для полей, которых нет в записях из старых данных
+FIELD_DEFAULTS = {"viewCount": 0, "likeCount": 0}
+
+
+def _build_statements() -> Dict[str, Tuple[str, str, str, List[str]]]:
+    # SQL собирается один раз: sqlite3 кэширует подготовленные выражения
+    # по тексту запроса, так что каждое выражение компилируется однократно
+    statements = {}
+    for collection, (table, columns) in TABLES.items():
+        fields = list(columns)
+        names = ", ".join(columns[field] for field in fields)
+        placeholders = ", ".join("?" for _ in fields)
+        updates = ", ".join(
+            f"{columns[field]} = excluded.{columns[field]}"
+            for field in fields
+            if field != "id"
+        )
+        upsert = (
+            f"INSERT INTO {table} ({names}) VALUES ({placeholders}) "
+            f"ON CONFLICT(id) DO UPDATE SET {updates}"
+        )
+        delete = f"DELETE FROM {table} WHERE id = ?"
+        select = f"SELECT {names} FROM {table} ORDER BY id"
+        statements[collection] = (upsert, delete, select, fields)
+    return statements
+
+
+STATEMENTS = _build_statements()
+
+
+def _to_column(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return str(value)
+    return value
+
+
+def _to_record(fields: List[str], row: Tuple[Any, ...]) -> Dict[str, Any]:
+    record = dict(zip(fields, row))
+    if record.get(VERSION_FIELD) is None:
+        # Запись из старых данных: версии у неё нет, как и в JSON
+        record.pop(VERSION_FIELD, None)
+    for field in DATE_FIELDS:
+        value = record.get(field)
+        if isinstance(value, str):
+            try:
+                record[field] = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            except ValueError:
+                record[field] = datetime.now()
+    return record
+
+
+def _expire_tombstones(connection: sqlite3.Connection) -> None:
+    # Удаления старше срока хранения забываем, запоминая самую новую версию
+    cutoff = tombstone_cutoff()
+    expired = connection.execute(
+        "SELECT MAX(version) FROM tombstones WHERE version < ?", (cutoff,)
+    ).fetchone()[0]
+    if expired is None:
+        return
+    connection.execute(
+        "INSERT INTO forgotten_version VALUES (1, ?) "
+        "ON CONFLICT(id) DO UPDATE SET version = MAX(version, excluded.version)",
+        (expired,),
+    )
+    connection.execute("DELETE FROM tombstones WHERE version < ?", (cutoff,))
+
+
+def _add_version_columns(connection: sqlite3.Connection) -> None:
+    # В базах, созданных до версий записей, колонки version ещё нет
+    for table, _ in TABLES.values():
+        columns = [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+        if "version" not in columns:
+            connection.execute(f"ALTER TABLE {table} ADD COLUMN version INTEGER")
+
+
+def _drop_keyless_journey_categories(connection: sqlite3.Connection) -> None:
+    # В базах, созданных до появления категорий, таблица осталась с составным
+    # ключом. Приложение в неё не писало, так что её можно просто пересоздать
+    columns = [
+        row[1] for row in connection.execute("PRAGMA table_info(journey_categories)")
+    ]
+    if columns and "id" not in columns:
+        connection.execute("DROP TABLE journey_categories")
+
+
+class ConnectionPool:
+    def __init__(self, path: str, size: int = POOL_SIZE) -> None:
+        self.path = path
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._connections: List[sqlite3.Connection] = []
+        for _ in range(size):
+            connection = sqlite3.connect(
+                path, check_same_thread=False, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            # FULL: каждая транзакция (одна на пачку изменений) сразу на диске
+            connection.execute("PRAGMA synchronous=FULL")
+            # Внешние ключи не включаем: каскады удаления делает приложение
+            # и пишет удаление каждой зависимой записи отдельным изменением
+            # с версией для GET /api/changes. Каскад базы опережал бы их, а
+            # старые данные с висячими ссылками база бы не приняла
+            self._connections.append(connection)
+            self._pool.put(connection)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        connection = self._pool.get()
+        try:
+            yield connection
+        finally:
+            self._pool.put(connection)
+
+    def close(self) -> None:
+        for connection in self._connections:
+            connection.close()
+        self._connections.clear()
+
+
+class SqliteStore(BaseStore):
+    def __init__(self, path: str = SQLITE_FILE, pool_size: int = POOL_SIZE) -> None:
+        self.path = path
+        self.pool_size = pool_size
+        self._pool: Optional[ConnectionPool] = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ConnectionPool:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ConnectionPool(self.path, self.pool_size)
+                with self._pool.connection() as connection:
+                    _drop_keyless_journey_categories(connection)
+                    connection.executescript(SCHEMA)
+                    _add_version_columns(connection)
+            return self._pool
+
+    def load(self) -> tuple:
+        with self.pool.connection() as connection:
+            records = {
+                collection: self._select(connection, collection)
+                for collection in TABLES
+            }
+            sequences = dict(
+                connection.execute("SELECT name, seq FROM sqlite_sequence")
+            )
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                _expire_tombstones(connection)
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            tombstones = [
+                list(row)
+                for row in connection.execute(
+                    "SELECT collection, record_id, version FROM tombstones "
+                    "ORDER BY version"
+                )
+            ]
+            forgotten = connection.execute(
+                "SELECT version FROM forgotten_version"
+            ).fetchone()
+        self._tombstones = (tombstones, forgotten[0] if forgotten else 0)
+        collections = {
+            collection: (records[collection], sequences.get(table, 0) + 1)
+            for collection, (table, _) in TABLES.items()
+            if collection not in CORE_COLLECTIONS
+        }
+        return (
+            records["travelers"],
+            records["journeys"],
+            sequences.get("users", 0) + 1,
+            sequences.get("journeys", 0) + 1,
+            collections,
+        )
+
+    def _select(
+        self, connection: sqlite3.Connection, collection: str
+    ) -> List[Dict[str, Any]]:
+        _, _, select, fields = STATEMENTS[collection]
+        return [_to_record(fields, row) for row in connection.execute(select)]
+
+    def apply(self, changes: List[Dict[str, Any]]) -> None:
+        if not changes:
+            return
+        with self.pool.connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                for change in changes:
+                    statements = STATEMENTS.get(change["c"])
+                    if statements is None:
+                        continue
+                    upsert, delete, _, fields = statements
+                    if change["op"] == "put":
+                        record = change["rec"]
+                        connection.execute(
+                            upsert,
+                            [
+                                _to_column(record.get(field, FIELD_DEFAULTS.get(field)))
+                                for field in fields
+                            ],
+                        )
+                    elif change["op"] == "del":
+                        connection.execute(delete, (change["id"],))
+                        if "v" in change:
+                            connection.execute(
+                                INSERT_TOMBSTONE,
+                                (change["c"], change["id"], change["v"]),
+                            )
+                if any(change["op"] == "del" for change in changes):
+                    _expire_tombstones(connection)
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+    def sync(self) -> None:
+        # При synchronous=FULL закоммиченная транзакция уже на диске
+        pass
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = None
+
+
+def migrate_from_json(
+    json_path: str = DATA_FILE,
+    journal_path: str = JOURNAL_FILE,
+    sqlite_path: str = SQLITE_FILE,
+    force: bool = False,
+) -> Tuple[int, int]:
+    store = SqliteStore(sqlite_path)
+    with store.pool.connection() as connection:
+        existing = connection.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    if existing and not force:
+        store.close()
+        raise RuntimeError(f"База {sqlite_path} уже содержит данные")
+
+    source = JournalStore(json_path, journal_path)
+    travelers, journeys, next_traveler_id, next_journey_id, collections = source.load()
+    source.close()
+
+    changes = [{"op": "put", "c": "travelers", "rec": t} for t in travelers]
+    changes += [{"op": "put", "c": "journeys", "rec": j} for j in journeys]
+    for collection, (records, _) in collections.items():
+        changes += [{"op": "put", "c": collection, "rec": r} for r in records]
+    tombstones, forgotten = source.tombstones()
+    store.apply(changes)
+    # Сохраняем счётчики id, чтобы удалённые id не выдавались повторно
+    sequences = [(next_traveler_id - 1, "users"), (next_journey_id - 1, "journeys")]
+    sequences += [
+        (next_id - 1, TABLES[collection][0])
+        for collection, (_, next_id) in collections.items()
+        if collection in TABLES
+    ]
+    with store.pool.connection() as connection:
+        connection.executemany(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", sequences
+        )
+        # Удаления из журнала: клиенты с дельтой изменений не получат 410
+        connection.executemany(INSERT_TOMBSTONE, tombstones)
+        if forgotten:
+            connection.execute(
+                "INSERT OR REPLACE INTO forgotten_version VALUES (1, ?)", (forgotten,)
+            )
+    store.close()
+    return len(travelers), len(journeys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Перенос blog_data.json в SQLite")
+    parser.add_argument("--json", default=DATA_FILE)
+    parser.add_argument("--journal", default=JOURNAL_FILE)
+    parser.add_argument("--sqlite", default=SQLITE_FILE)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    traveler_count, journey_count = migrate_from_json(
+        args.json, args.journal, args.sqlite, args.force
+    )
+    print(f"✅ Перенесено: {traveler_count} пользователей, {journey_count} постов")
@@ -1,50 +1,80 @@
 import json
+import marshal
 import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import nullcontext
 from datetime import datetime
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import Any, Callable, ContextManager, Dict, IO, List, Optional, Tuple
 
-DATA_FILE = "blog_data.json"
-
-def save_data(travelers: List[Dict], journeys: List[Dict], next_traveler_id: int, next_journey_id: int) -> None:
-    data = {
-        'travelers': travelers,
-        'journeys': journeys,
-        'next_traveler_id': next_traveler_id,
-        'next_journey_id': next_journey_id
-    }
+from metrics import timed
 
-    try:
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, default=str, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"Ошибка сохранения данных: {e}")
+try:
+    import fcntl
+except ImportError:  # Windows: несколько процессов не поддерживаются
+    fcntl = None  # type: ignore[assignment]
 
-def load_data() -> tuple:
-    if not os.path.exists(DATA_FILE):
-        return [], [], 1, 1
+DATA_FILE = "blog_data.json"
+JOURNAL_FILE = "blog_data.journal"
 
-    try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+# "journal" — дописываем изменения в журнал, "snapshot" — переписываем весь файл,
+# "sqlite" — база по схеме database_schema.sql (см. sqlite_storage.py)
+STORAGE_MODE = os.environ.get("BLOG_STORAGE_MODE", "journal")
+JOURNAL_FSYNC = os.environ.get("BLOG_JOURNAL_FSYNC", "0") == "1"
+COMPACT_EVERY = int(os.environ.get("BLOG_JOURNAL_COMPACT_EVERY", "1000"))
+# Рядом со снимком в JSON пишем бинарную копию для быстрого старта
+BINARY_SNAPSHOT = os.environ.get("BLOG_BINARY_SNAPSHOT", "1") == "1"
+BINARY_VERSION = 2
+# Метка отсутствующего поля в столбце бинарного снимка
+ABSENT = ...
+DATE_FIELDS = ('createdAt', 'updatedAt')
 
-        travelers = _convert_dates(data.get('travelers', []))
-        journeys = _convert_dates(data.get('journeys', []))
+# Коллекция -> ключ счётчика следующего id в снимке
+SEQUENCES = {
+    "travelers": "next_traveler_id",
+    "journeys": "next_journey_id",
+    "comments": "next_comment_id",
+    "subscriptions": "next_subscription_id",
+    "categories": "next_category_id",
+    "journey_categories": "next_journey_category_id",
+    "favorites": "next_favorite_id",
+}
+# Пользователи и посты load() отдаёт отдельно, остальное — словарём
+CORE_COLLECTIONS = ("travelers", "journeys")
+# Сколько помнить удалённые записи для GET /api/changes: клиент, который
+# не заходил дольше, получает 410 и загружает данные заново
+TOMBSTONE_RETENTION = float(
+    os.environ.get("BLOG_TOMBSTONE_RETENTION_SECONDS", str(24 * 3600))
+)
+# Удаления в снимке: [коллекция, id, версия], и самая новая версия среди
+# забытых — изменения до неё дельтой уже не собрать
+TOMBSTONES = "tombstones"
+FORGOTTEN_VERSION = "forgotten_version"
 
-        return (
-            travelers,
-            journeys,
-            data.get('next_traveler_id', 1),
-            data.get('next_journey_id', 1)
-        )
-    except Exception as e:
-        print(f"❌ Ошибка загрузки данных: {e}")
-        return [], [], 1, 1
+def _unpack(data: Dict[str, Any], copy: bool = True) -> tuple:
+    # copy=False — записи только что прочитаны и больше никому не нужны,
+    # даты разбираем прямо в них, без лишней копии каждого словаря.
+    # Последний элемент: коллекция -> (записи, следующий id) для прочих коллекций
+    collections = {
+        collection: (_convert_dates(data.get(collection, []), copy), data.get(sequence, 1))
+        for collection, sequence in SEQUENCES.items()
+        if collection not in CORE_COLLECTIONS
+    }
+    return (
+        _convert_dates(data.get('travelers', []), copy),
+        _convert_dates(data.get('journeys', []), copy),
+        data.get('next_traveler_id', 1),
+        data.get('next_journey_id', 1),
+        collections
+    )
 
-def _convert_dates(data_list: List[Dict]) -> List[Dict]:
+def _convert_dates(data_list: List[Dict], copy: bool = True) -> List[Dict]:
     converted = []
     for item in data_list:
-        converted_item = item.copy()
-        for field in ['createdAt', 'updatedAt']:
+        converted_item = item.copy() if copy else item
+        for field in DATE_FIELDS:
             if field in item and isinstance(item[field], str):
                 try:
                     date_str = item[field].replace('Z', '+00:00')
@@ -54,36 +84,595 @@ def _convert_dates(data_list: List[Dict]) -> List[Dict]:
         converted.append(converted_item)
     return converted
 
-def _restore_datetime_fields(data_list: List[Dict]) -> List[Dict]:
-    restored = []
-    for item in data_list:
-        restored_item = item.copy()
-        for field in ['createdAt', 'updatedAt']:
-            if field in item and isinstance(item[field], str):
-                try:
-                    restored_item[field] = datetime.fromisoformat(item[field].replace('Z', '+00:00'))
-                except:
-                    restored_item[field] = datetime.now()
-        restored.append(restored_item)
-    return restored
-
-def initialize_default_data() -> tuple:
-    default_travelers = [{
-        "id": 1,
-        "email": "wanderer@travel.com",
-        "username": "Челик",
-        "password": "wander123",
-        "createdAt": datetime.now(),
-        "updatedAt": datetime.now()
-    }]
-
-    default_journeys = [{
-        "id": 1,
-        "travelerId": 1,
-        "destination": "Горы Алтая",
-        "story": "Мои первые впечатления от путешествия по Алтайским горам. Невероятные пейзажи, чистый воздух и гостеприимные местные жители сделали эту поездку незабываемой...",
-        "createdAt": datetime.now(),
-        "updatedAt": datetime.now()
-    }]
-
-    return default_travelers, default_journeys, 2, 2
\ No newline at end of file
+
+# Снимок и журнал
+
+def _compacting_file(journal_path: str) -> str:
+    return journal_path + ".compacting"
+
+def _binary_file(path: str) -> str:
+    return os.path.splitext(path)[0] + ".bin"
+
+def _binary_is_fresh(path: str) -> bool:
+    # Бинарный снимок пишется после JSON: если JSON новее, копия устарела
+    binary_path = _binary_file(path)
+    if not os.path.exists(binary_path):
+        return False
+    return not os.path.exists(path) or os.path.getmtime(binary_path) >= os.path.getmtime(path)
+
+def _write_atomically(path: str, payload: bytes) -> None:
+    # Пишем во временный файл и атомарно подменяем им снимок
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _write_snapshot(path: str, data: Dict[str, Any], binary: bool = False) -> None:
+    payload = json.dumps(data, default=str, ensure_ascii=False, indent=2)
+    _write_atomically(path, payload.encode('utf-8'))
+    if binary:
+        _write_atomically(_binary_file(path), _encode_binary(data))
+
+def _encode_binary(data: Dict[str, Any]) -> bytes:
+    # Коллекции хранятся по столбцам: marshal читает списки строк и чисел
+    # почти без накладных расходов, в отличие от разбора JSON
+    columns = {}
+    for collection in SEQUENCES:
+        records = data.get(collection, [])
+        counts: Dict[str, int] = {}
+        for record in records:
+            for field in record:
+                counts[field] = counts.get(field, 0) + 1
+        # Поля, которых нет в части записей (например, в старых данных)
+        sparse = [field for field, count in counts.items() if count < len(records)]
+        columns[collection] = (
+            list(counts),
+            [[_to_plain(record.get(field, ABSENT)) for record in records] for field in counts],
+            sparse
+        )
+    meta = {key: value for key, value in data.items() if key not in SEQUENCES}
+    return marshal.dumps((BINARY_VERSION, columns, meta))
+
+def _to_plain(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return str(value)
+    return value
+
+def _read_binary(path: str) -> Dict[str, Any]:
+    with open(path, 'rb') as f:
+        version, columns, meta = marshal.loads(f.read())
+    if version != BINARY_VERSION:
+        raise ValueError(f"Неизвестная версия бинарного снимка: {version}")
+
+    data = dict(meta)
+    for collection, (fields, values, sparse) in columns.items():
+        for position, field in enumerate(fields):
+            if field in DATE_FIELDS:
+                values[position] = _parse_dates(values[position])
+        records = list(map(_record_builder(tuple(fields)), *values)) if fields else []
+        for field in sparse:
+            for record in records:
+                if record[field] is ABSENT:
+                    del record[field]
+        data[collection] = records
+    return data
+
+@lru_cache(maxsize=None)
+def _record_builder(fields: Tuple[str, ...]) -> Callable[..., Dict[str, Any]]:
+    # Функция со словарём-литералом собирает запись из столбцов
+    # вдвое быстрее, чем dict(zip(...)) — так же поступает namedtuple
+    arguments = ", ".join(f"_{position}" for position in range(len(fields)))
+    items = ", ".join(f"{field!r}: _{position}" for position, field in enumerate(fields))
+    return eval(f"lambda {arguments}: {{{items}}}", {})
+
+def _parse_dates(values: List[Any]) -> List[Any]:
+    try:
+        return [value if value is ABSENT else datetime.fromisoformat(value) for value in values]
+    except (TypeError, ValueError):
+        # Редкий случай: нестандартные даты разберёт _convert_dates
+        return values
+
+def _read_snapshot(path: str) -> Dict[str, Any]:
+    data: Dict[str, Any] = {}
+    if BINARY_SNAPSHOT and _binary_is_fresh(path):
+        try:
+            data = _read_binary(_binary_file(path))
+        except Exception as e:
+            print(f"❌ Ошибка чтения бинарного снимка, читаем JSON: {e}")
+            data = {}
+    if not data and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+    # Коллекции держим как id -> запись, чтобы применять журнал за O(1)
+    for collection in SEQUENCES:
+        data[collection] = {item["id"]: item for item in data.get(collection, [])}
+    return data
+
+def _collections_to_lists(data: Dict[str, Any]) -> Dict[str, Any]:
+    result = dict(data)
+    for collection in SEQUENCES:
+        result[collection] = list(data[collection].values())
+    return result
+
+def _apply_change(data: Dict[str, Any], change: Dict[str, Any]) -> None:
+    # seq есть у записей журнала, общего для нескольких процессов:
+    # снимок помнит последний вошедший в него номер
+    if "seq" in change:
+        data["seq"] = change["seq"]
+    collection = data.setdefault(change["c"], {})
+    if change["op"] == "put":
+        record = change["rec"]
+        collection[record["id"]] = record
+        sequence = SEQUENCES.get(change["c"])
+        if sequence and record["id"] >= data.get(sequence, 1):
+            data[sequence] = record["id"] + 1
+    elif change["op"] == "del":
+        collection.pop(change["id"], None)
+        if "v" in change:
+            # Удаление помним, чтобы дельта изменений пережила перезапуск
+            data.setdefault(TOMBSTONES, []).append([change["c"], change["id"], change["v"]])
+
+def tombstone_cutoff(retention: float = TOMBSTONE_RETENTION) -> int:
+    # Версия (микросекунды от эпохи), удаления до которой уже забыты
+    return int((time.time() - retention) * 1_000_000)
+
+def _expire_tombstones(data: Dict[str, Any]) -> Tuple[List[List[Any]], int]:
+    # Удаления старше срока хранения забываем; возвращает оставшиеся
+    # и версию, до которой изменения забыты
+    cutoff = tombstone_cutoff()
+    tombstones = data.get(TOMBSTONES, [])
+    forgotten = max(
+        [data.get(FORGOTTEN_VERSION, 0)] + [version for _, _, version in tombstones if version < cutoff]
+    )
+    if forgotten:
+        data[FORGOTTEN_VERSION] = forgotten
+    if tombstones:
+        data[TOMBSTONES] = [tombstone for tombstone in tombstones if tombstone[2] >= cutoff]
+    return data.get(TOMBSTONES, []), forgotten
+
+def _replay_journal(path: str, data: Dict[str, Any]) -> Tuple[int, int]:
+    # Возвращает длину корректной части журнала и число записей в ней:
+    # оборванный хвост после сбоя отбрасывается
+    if not os.path.exists(path):
+        return 0, 0
+
+    with open(path, 'rb') as f:
+        return _replay_lines(f, data)
+
+def _replay_lines(f: IO[bytes], data: Dict[str, Any]) -> Tuple[int, int]:
+    valid_size = 0
+    entries = 0
+    for line in f:
+        if not line.endswith(b"\n"):
+            break
+        try:
+            change = json.loads(line)
+        except ValueError:
+            break
+        _apply_change(data, change)
+        valid_size += len(line)
+        entries += 1
+    return valid_size, entries
+
+def _encode_change(change: Dict[str, Any]) -> str:
+    return json.dumps(change, default=str, ensure_ascii=False, separators=(',', ':')) + "\n"
+
+
+class BaseStore(ABC):
+    _tombstones: Tuple[List[List[Any]], int] = ([], 0)
+
+    @abstractmethod
+    def load(self) -> tuple:
+        ...
+
+    @abstractmethod
+    def apply(self, changes: List[Dict[str, Any]]) -> None:
+        ...
+
+    @abstractmethod
+    def sync(self) -> None:
+        ...
+
+    @abstractmethod
+    def close(self) -> None:
+        ...
+
+    def exclusive(self) -> ContextManager[Any]:
+        # Блокировка записи между процессами; у хранилища одного процесса её нет
+        return nullcontext()
+
+    def tombstones(self) -> Tuple[List[List[Any]], int]:
+        # Удаления, которые хранилище помнило при load(), и версия,
+        # до которой они забыты (см. versions.py)
+        return self._tombstones
+
+
+Store = BaseStore
+
+
+class SnapshotStore(BaseStore):
+    def __init__(self, path: str = DATA_FILE) -> None:
+        self.path = path
+        self._data: Dict[str, Any] = {}
+
+    def load(self) -> tuple:
+        self._data = _read_snapshot(self.path)
+        self._tombstones = _expire_tombstones(self._data)
+        return _unpack(_collections_to_lists(self._data))
+
+    def apply(self, changes: List[Dict[str, Any]]) -> None:
+        if not changes:
+            return
+        for change in changes:
+            _apply_change(self._data, change)
+        _expire_tombstones(self._data)
+        try:
+            _write_snapshot(self.path, _collections_to_lists(self._data))
+        except Exception as e:
+            print(f"Ошибка сохранения данных: {e}")
+
+    def sync(self) -> None:
+        # Снимок и так пишется с fsync
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class JournalStore(BaseStore):
+    def __init__(
+            self,
+            path: str = DATA_FILE,
+            journal_path: str = JOURNAL_FILE,
+            compact_every: int = COMPACT_EVERY,
+            fsync: bool = JOURNAL_FSYNC
+    ) -> None:
+        self.path = path
+        self.journal_path = journal_path
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self._journal: Optional[IO[str]] = None
+        self._entries = 0
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._compaction: Optional[threading.Thread] = None
+
+    def load(self) -> tuple:
+        # Недоделанное уплотнение после сбоя доводим до конца
+        if os.path.exists(_compacting_file(self.journal_path)):
+            self._fold_into_snapshot(_compacting_file(self.journal_path))
+
+        data = _read_snapshot(self.path)
+        valid_size, self._entries = _replay_journal(self.journal_path, data)
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(valid_size)
+
+        self._tombstones = _expire_tombstones(data)
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        return _unpack(_collections_to_lists(data), copy=False)
+
+    def apply(self, changes: List[Dict[str, Any]]) -> None:
+        if not changes:
+            return
+        payload = "".join(_encode_change(change) for change in changes)
+        with self._lock:
+            if self._journal is None:
+                self._journal = open(self.journal_path, 'a', encoding='utf-8')
+            self._journal.write(payload)
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+            self._entries += len(changes)
+            need_compaction = self._entries >= self.compact_every
+        if need_compaction:
+            self.compact_in_background()
+
+    def sync(self) -> None:
+        with self._lock:
+            if self._journal is not None:
+                os.fsync(self._journal.fileno())
+
+    def compact_in_background(self) -> None:
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        self._compaction = threading.Thread(target=self.compact, daemon=True)
+        self._compaction.start()
+
+    def compact(self) -> None:
+        with self._compact_lock:
+            compacting = _compacting_file(self.journal_path)
+            try:
+                if os.path.exists(compacting):
+                    # Прошлое уплотнение не удалось: сначала доводим его,
+                    # иначе переименование ниже затёрло бы эти изменения
+                    self._fold_into_snapshot(compacting)
+                # Отцепляем текущий журнал, новые записи пойдут в свежий файл
+                with self._lock:
+                    if self._journal is None or self._entries == 0:
+                        return
+                    self._journal.close()
+                    os.replace(self.journal_path, compacting)
+                    self._journal = open(self.journal_path, 'a', encoding='utf-8')
+                    self._entries = 0
+                self._fold_into_snapshot(compacting)
+            except Exception as e:
+                # Файл .compacting остаётся на диске и будет уплотнён при
+                # следующей попытке или при старте
+                print(f"Ошибка уплотнения журнала: {e}")
+
+    def _fold_into_snapshot(self, journal_path: str) -> None:
+        with timed("journal_compact"):
+            data = _read_snapshot(self.path)
+            _replay_journal(journal_path, data)
+            _expire_tombstones(data)
+            _write_snapshot(self.path, _collections_to_lists(data), binary=BINARY_SNAPSHOT)
+            os.remove(journal_path)
+
+    def close(self) -> None:
+        if self._compaction is not None:
+            self._compaction.join()
+        # Уплотняем журнал при остановке, чтобы следующий старт читал
+        # только бинарный снимок, а не разбирал JSON и журнал
+        if self._entries > 0:
+            self.compact()
+        elif BINARY_SNAPSHOT and os.path.exists(self.path) and not _binary_is_fresh(self.path):
+            try:
+                data = _read_snapshot(self.path)
+                _write_atomically(
+                    _binary_file(self.path), _encode_binary(_collections_to_lists(data))
+                )
+            except Exception as e:
+                print(f"Ошибка записи бинарного снимка: {e}")
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+
+class FileLock:
+    # Блокировка между процессами (flock) поверх обычной — между потоками
+    def __init__(self, path: str) -> None:
+        if fcntl is None:
+            raise RuntimeError("Несколько процессов поддерживаются только в POSIX-системах")
+        self.path = path
+        self._lock = threading.Lock()
+        self._file: Optional[IO[bytes]] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if not self._lock.acquire(blocking):
+            return False
+        try:
+            if self._file is None:
+                self._file = open(self.path, 'ab')
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            fcntl.flock(self._file.fileno(), flags)
+        except BlockingIOError:
+            self._lock.release()
+            return False
+        except BaseException:
+            self._lock.release()
+            raise
+        return True
+
+    def release(self) -> None:
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class SharedJournalStore(JournalStore):
+    # Журнал, общий для нескольких процессов (uvicorn --workers). Пишут по
+    # очереди под FileLock, и у каждой записи сквозной номер seq. Остальные
+    # процессы дочитывают хвост журнала и применяют чужие изменения к своим
+    # индексам (см. cluster.py), а не перечитывают данные целиком
+    def __init__(
+            self,
+            path: str = DATA_FILE,
+            journal_path: str = JOURNAL_FILE,
+            compact_every: int = COMPACT_EVERY,
+            fsync: bool = JOURNAL_FSYNC
+    ) -> None:
+        super().__init__(path, journal_path, compact_every, fsync)
+        self.lock = FileLock(path + ".lock")
+        self._compaction_lock = FileLock(path + ".compact.lock")
+        # Номер последней записи журнала, известной этому процессу
+        self.seq = 0
+        # Пропущена часть записей: poll() ждёт reload()
+        self._gap = False
+        self._reader: Optional[IO[bytes]] = None
+        self._offset = 0
+
+    def exclusive(self) -> ContextManager[Any]:
+        return self.lock
+
+    def load(self) -> tuple:
+        with self.lock:
+            data = self._read_all()
+            self._tombstones = _expire_tombstones(data)
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        return _unpack(_collections_to_lists(data), copy=False)
+
+    def reload(self) -> Dict[str, List[Dict[str, Any]]]:
+        # Все записи заново — если хвост журнала уплотнили раньше, чем этот
+        # процесс его дочитал. Вызывается под self.lock
+        data = _collections_to_lists(self._read_all())
+        return {collection: _convert_dates(data[collection], copy=False) for collection in SEQUENCES}
+
+    def _read_all(self) -> Dict[str, Any]:
+        # Уплотняемый журнал открываем до чтения снимка: если уплотнение
+        # закончится посередине, открытый файл останется читаемым, а его
+        # записи, применённые к уже новому снимку, ничего не изменят
+        try:
+            compacting: Optional[IO[bytes]] = open(_compacting_file(self.journal_path), 'rb')
+        except FileNotFoundError:
+            compacting = None
+        try:
+            data = _read_snapshot(self.path)
+            if compacting is not None:
+                _replay_lines(compacting, data)
+        finally:
+            if compacting is not None:
+                compacting.close()
+
+        reader = self._open_reader()
+        valid_size, self._entries = _replay_lines(reader, data)
+        if os.fstat(reader.fileno()).st_size > valid_size:
+            # Оборванный хвост после сбоя; под блокировкой его никто не дописывает
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(valid_size)
+        self._offset = valid_size
+        self.seq = data.get("seq", 0)
+        self._gap = False
+        return data
+
+    def _open_reader(self) -> IO[bytes]:
+        if self._reader is not None:
+            self._reader.close()
+        # 'ab' создаёт журнал, если его ещё нет
+        open(self.journal_path, 'ab').close()
+        self._reader = open(self.journal_path, 'rb')
+        self._offset = 0
+        return self._reader
+
+    def poll(self) -> Optional[List[Dict[str, Any]]]:
+        # Записи, добавленные другими процессами с прошлого вызова.
+        # None — часть записей уже уплотнена в снимок, нужен reload()
+        if self._gap:
+            return None
+        changes = self._read_tail()
+        try:
+            inode = os.stat(self.journal_path).st_ino
+        except FileNotFoundError:
+            # Уплотнение между переименованием и созданием нового журнала
+            inode = None
+        if inode is not None and self._reader is not None and inode != os.fstat(self._reader.fileno()).st_ino:
+            # Журнал уплотнили: дочитываем старый файл и переходим на новый
+            changes += self._read_tail()
+            self._open_reader()
+            with self._lock:
+                self._entries = 0
+            changes += self._read_tail()
+
+        fresh = []
+        for change in changes:
+            seq = change.get("seq")
+            # Свои записи и записи, уже вошедшие в загруженные данные
+            if seq is None or seq <= self.seq:
+                continue
+            if seq != self.seq + 1:
+                self._gap = True
+                return None
+            self.seq = seq
+            fresh.append(change)
+        _convert_dates([change["rec"] for change in fresh if "rec" in change], copy=False)
+        with self._lock:
+            self._entries += len(fresh)
+        return fresh
+
+    def _read_tail(self) -> List[Dict[str, Any]]:
+        reader = self._reader
+        if reader is None:
+            return []
+        size = os.fstat(reader.fileno()).st_size
+        if size <= self._offset:
+            return []
+        reader.seek(self._offset)
+        chunk = reader.read(size - self._offset)
+        # Только целые строки: последнюю могут дописывать прямо сейчас
+        end = chunk.rfind(b"\n") + 1
+        self._offset += end
+        return [json.loads(line) for line in chunk[:end].splitlines()]
+
+    def apply(self, changes: List[Dict[str, Any]]) -> None:
+        # Вызывается под self.lock, после того как процесс дочитал журнал:
+        # номера выдаются подряд в порядке записи
+        if not changes:
+            return
+        with self._lock:
+            if self._journal is not None and self._journal_replaced():
+                # Журнал уплотнил другой процесс — пишем в новый файл
+                self._journal.close()
+                self._journal = None
+        for change in changes:
+            self.seq += 1
+            change["seq"] = self.seq
+        super().apply(changes)
+
+    def _journal_replaced(self) -> bool:
+        assert self._journal is not None
+        try:
+            return os.stat(self.journal_path).st_ino != os.fstat(self._journal.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def compact(self) -> None:
+        with self._compact_lock:
+            # Уплотняет один процесс; если уже уплотняет другой — пропускаем
+            if not self._compaction_lock.acquire(blocking=False):
+                return
+            try:
+                compacting = _compacting_file(self.journal_path)
+                if os.path.exists(compacting):
+                    # Уплотнение, прерванное сбоем, доводим до конца
+                    self._fold_into_snapshot(compacting)
+                # Переименование — под блокировкой записи, чтобы ни один
+                # процесс не дописал строку в уже отцепленный файл
+                with self.lock, self._lock:
+                    if not os.path.exists(self.journal_path) or os.path.getsize(self.journal_path) == 0:
+                        return
+                    if self._journal is not None:
+                        self._journal.close()
+                    os.replace(self.journal_path, compacting)
+                    self._journal = open(self.journal_path, 'a', encoding='utf-8')
+                    self._entries = 0
+                self._fold_into_snapshot(compacting)
+            except Exception as e:
+                print(f"Ошибка уплотнения журнала: {e}")
+            finally:
+                self._compaction_lock.release()
+
+    def close(self) -> None:
+        if self._compaction is not None:
+            self._compaction.join()
+        # Уплотняем при остановке; другие процессы в это время могут писать
+        self.compact()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        self.lock.close()
+        self._compaction_lock.close()
+
+
+def open_store(mode: str = STORAGE_MODE, shared: bool = False) -> Store:
+    # shared=True — хранилище общее для нескольких процессов приложения
+    if shared and mode != "journal":
+        raise ValueError("Несколько процессов поддерживает только режим journal")
+    if mode == "snapshot":
+        return SnapshotStore()
+    if mode == "journal":
+        return SharedJournalStore() if shared else JournalStore()
+    if mode == "sqlite":
+        from sqlite_storage import SqliteStore
+
+        return SqliteStore()
+    raise ValueError(f"Неизвестный режим хранения: {mode}")
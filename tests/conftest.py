@@ -0,0 +1,48 @@
+import importlib
+import os
+import uuid
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parent.parent
+# Дешёвый scrypt: иначе каждый вход и регистрация — десятки миллисекунд
+os.environ.setdefault("BLOG_SCRYPT_N", "1024")
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory: pytest.TempPathFactory) -> Iterator[ModuleType]:
+    # main читает данные и шаблоны из текущего каталога и регистрирует
+    # метрики при импорте — поэтому один экземпляр на весь прогон, в
+    # отдельном каталоге
+    workdir = tmp_path_factory.mktemp("blog")
+    (workdir / "templates").symlink_to(ROOT / "templates")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        main = importlib.import_module("main")
+        yield main
+        main.store.close()
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture(scope="session")
+def client(app: ModuleType) -> Iterator[TestClient]:
+    with TestClient(app.app) as client:
+        yield client
+
+
+@pytest.fixture
+def traveler(client: TestClient) -> Dict[str, Any]:
+    # Свой пользователь у каждого теста: данные общие на весь прогон
+    email = f"{uuid.uuid4().hex}@test.ru"
+    response = client.post(
+        "/api/travelers/",
+        json={"email": email, "username": "tester", "password": "secret123"},
+    )
+    assert response.status_code == 200
+    return response.json()
@@ -0,0 +1,118 @@
+import uuid
+from types import ModuleType
+from typing import Any, Dict, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+STORY = "Рассказ о поездке, достаточно длинный для проверки"
+
+
+def journey_data(traveler_id: int, destination: str = "Казань") -> Dict[str, Any]:
+    return {"travelerId": traveler_id, "destination": destination, "story": STORY}
+
+
+def statuses(response: Any) -> List[int]:
+    return [result["status"] for result in response.json()["results"]]
+
+
+@pytest.fixture
+def journey(client: TestClient, traveler: Dict[str, Any]) -> Dict[str, Any]:
+    response = client.post("/api/journeys/", json=journey_data(traveler["id"]))
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_journey_batch(
+    app: ModuleType,
+    client: TestClient,
+    traveler: Dict[str, Any],
+    journey: Dict[str, Any],
+) -> None:
+    response = client.post(
+        "/api/journeys/batch",
+        json={
+            "operations": [
+                {"op": "create", "data": journey_data(traveler["id"], "Пермь")},
+                {"op": "update", "id": journey["id"], "data": {"destination": "Уфа"}},
+                {"op": "delete", "id": journey["id"]},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    assert statuses(response) == [201, 200, 204]
+    created = response.json()["results"][0]["record"]
+    assert app.repo.get_journey(created["id"])["destination"] == "Пермь"
+    assert app.repo.get_journey(journey["id"]) is None
+
+
+def test_journey_batch_rollback(
+    app: ModuleType,
+    client: TestClient,
+    traveler: Dict[str, Any],
+    journey: Dict[str, Any],
+) -> None:
+    # Одна ошибка — и не применяется ни одна операция пакета
+    version = app.change_log.version
+    response = client.post(
+        "/api/journeys/batch",
+        json={
+            "operations": [
+                {"op": "create", "data": journey_data(traveler["id"], "Пермь")},
+                {"op": "update", "id": journey["id"], "data": {"destination": "Уфа"}},
+                {"op": "delete", "id": journey["id"]},
+                # Удалён предыдущей операцией того же пакета
+                {"op": "update", "id": journey["id"], "data": {"story": STORY}},
+                {"op": "create", "data": journey_data(10**9)},
+                {"op": "create", "data": journey_data(traveler["id"], "Я")},
+            ]
+        },
+    )
+    assert response.status_code == 400
+    assert statuses(response) == [424, 424, 424, 404, 400, 422]
+    assert app.change_log.version == version
+    assert app.repo.get_journey(journey["id"])["destination"] == "Казань"
+    assert len(app.repo.get_journeys_by_traveler(traveler["id"])) == 1
+
+
+def test_traveler_batch_rollback(app: ModuleType, client: TestClient) -> None:
+    # Email, занятый предыдущей операцией пакета, — тоже ошибка
+    email = f"{uuid.uuid4().hex}@test.ru"
+    data = {"email": email, "username": "tester", "password": "secret123"}
+    version = app.change_log.version
+    response = client.post(
+        "/api/travelers/batch",
+        json={
+            "operations": [
+                {"op": "create", "data": data},
+                {"op": "create", "data": data},
+            ]
+        },
+    )
+    assert response.status_code == 400
+    assert statuses(response) == [424, 400]
+    assert app.change_log.version == version
+    assert app.repo.get_traveler_by_email(email) is None
+
+
+@pytest.mark.parametrize(
+    "operations",
+    [
+        [],
+        [{"op": "rename", "id": 1, "data": {}}],
+        # MAX_BATCH_SIZE + 1
+        [{"op": "delete", "id": 1}] * 1_001,
+    ],
+    ids=["empty", "unknown-op", "too-large"],
+)
+@pytest.mark.parametrize("collection", ["journeys", "travelers"])
+def test_invalid_batch(
+    app: ModuleType,
+    client: TestClient,
+    collection: str,
+    operations: List[Dict[str, Any]],
+) -> None:
+    version = app.change_log.version
+    response = client.post(f"/api/{collection}/batch", json={"operations": operations})
+    assert response.status_code == 422
+    assert app.change_log.version == version
@@ -0,0 +1,83 @@
+from types import ModuleType
+from typing import Any, Dict, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+STORY = "Рассказ о поездке, достаточно длинный для проверки"
+
+
+def changed(client: TestClient, since: int) -> List[Dict[str, Any]]:
+    response = client.get("/api/changes", params={"since": since})
+    assert response.status_code == 200
+    return response.json()["changes"]
+
+
+def test_changes(app: ModuleType, client: TestClient, traveler: Dict[str, Any]) -> None:
+    since = app.change_log.version
+    created = client.post(
+        "/api/journeys/",
+        json={"travelerId": traveler["id"], "destination": "Казань", "story": STORY},
+    ).json()
+    assert [(c["type"], c["id"]) for c in changed(client, since)] == [
+        ("created", created["id"])
+    ]
+
+    since = app.change_log.version
+    assert (
+        client.put(
+            f"/api/journeys/{created['id']}", json={"destination": "Уфа"}
+        ).status_code
+        == 200
+    )
+    [change] = changed(client, since)
+    assert change["type"] == "updated"
+    assert change["record"]["destination"] == "Уфа"
+
+    since = app.change_log.version
+    assert client.delete(f"/api/journeys/{created['id']}").status_code == 200
+    [change] = changed(client, since)
+    assert (change["type"], change["id"]) == ("deleted", created["id"])
+    assert "record" not in change
+
+
+def test_not_modified(client: TestClient, traveler: Dict[str, Any]) -> None:
+    first = client.get("/api/changes", params={"since": 0})
+    etag = first.headers["ETag"]
+    cached = client.get(
+        "/api/changes", params={"since": 0}, headers={"If-None-Match": etag}
+    )
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+
+    # После записи версия другая — снова полный ответ
+    client.put(f"/api/travelers/{traveler['id']}", json={"username": "renamed"})
+    fresh = client.get(
+        "/api/changes", params={"since": 0}, headers={"If-None-Match": etag}
+    )
+    assert fresh.status_code == 200
+    assert fresh.headers["ETag"] != etag
+
+
+def test_expired(
+    app: ModuleType,
+    client: TestClient,
+    traveler: Dict[str, Any],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # Граница забытых удалений общая на весь прогон — после теста прежняя
+    monkeypatch.setattr(app.change_log, "floor", app.change_log.floor)
+    since = app.change_log.version
+    assert client.delete(f"/api/travelers/{traveler['id']}").status_code == 200
+    assert changed(client, since)
+
+    # Срок хранения удалений истёк: клиент с since до удаления его пропустил
+    monkeypatch.setattr(app.change_log, "retention", -1)
+    response = client.get("/api/changes", params={"since": since})
+    assert response.status_code == 410
+    # С версии после удаления пропущенного нет
+    assert (
+        client.get("/api/changes", params={"since": app.change_log.version}).status_code
+        == 200
+    )
@@ -0,0 +1,152 @@
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from benchmarks.dataset import generate
+from comments import CommentTree
+from pagination import MAX_PAGE_SIZE, sort_key
+from repository import BlogRepository
+
+# Большой набор — как в benchmarks/bench_deletes.py; уменьшить для быстрого
+# прогона: BLOG_TEST_DELETES_SIZE=10000 python -m pytest
+LARGE_SIZE = int(os.environ.get("BLOG_TEST_DELETES_SIZE", "100000"))
+DELETES = 2_000
+# Пользователей, удаляемых вместе с постами
+CASCADES = 50
+
+
+def all_pages(repo: BlogRepository) -> Tuple[List[int], List[int]]:
+    # Все посты по страницам вперёд, затем назад от последней страницы
+    forward: List[int] = []
+    cursor = None
+    while True:
+        journeys, page = repo.page_journeys(MAX_PAGE_SIZE, cursor)
+        forward += [journey["id"] for journey in journeys]
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+    pages = [[journey["id"] for journey in journeys]]
+    while page.prev_cursor is not None:
+        journeys, page = repo.page_journeys(MAX_PAGE_SIZE, page.prev_cursor)
+        pages.append([journey["id"] for journey in journeys])
+    return forward, [journey_id for ids in reversed(pages) for journey_id in ids]
+
+
+@pytest.fixture(scope="module", params=[1_000, LARGE_SIZE], ids=lambda size: f"{size}")
+def dataset(request: pytest.FixtureRequest) -> Dict[str, Any]:
+    # Генерация — самое долгое: один набор на размер для всех тестов
+    size = request.param
+    return generate(max(size // 10, 2), size, comments_per_journey=0, seed=42)
+
+
+@pytest.fixture
+def deleted(
+    dataset: Dict[str, Any],
+) -> Tuple[BlogRepository, List[Dict[str, Any]]]:
+    # Репозиторий после удаления постов и пользователей с их постами и
+    # посты, которые должны остаться, в исходном порядке. Записи свои у
+    # каждого теста: репозиторий их меняет
+    rng = random.Random(42)
+    data = {
+        collection: [dict(record) for record in dataset[collection]]
+        for collection in ("travelers", "journeys")
+    }
+    repo = BlogRepository(data["travelers"], data["journeys"])
+    doomed = rng.sample(list(repo.journeys), min(DELETES, len(data["journeys"]) // 2))
+    for journey in doomed:
+        repo.delete_journey(journey["id"])
+    gone = {id(journey) for journey in doomed}
+    # Удаление пользователя уносит его посты (ON DELETE CASCADE)
+    victims = rng.sample([traveler["id"] for traveler in repo.travelers], CASCADES)
+    for traveler_id in victims:
+        gone.update(
+            id(journey) for journey in repo.get_journeys_by_traveler(traveler_id)
+        )
+        repo.delete_traveler(traveler_id)
+    repo.drain_changes()
+    expected = [journey for journey in data["journeys"] if id(journey) not in gone]
+    return repo, expected
+
+
+@pytest.mark.parametrize("compacted", [False, True], ids=["marked", "compacted"])
+def test_iteration_order(
+    deleted: Tuple[BlogRepository, List[Dict[str, Any]]], compacted: bool
+) -> None:
+    # Обход — как у списка, из которого записи удалены по-старому
+    repo, expected = deleted
+    if compacted:
+        repo.compact()
+    assert len(repo.journeys) == len(expected)
+    assert all(a is b for a, b in zip(repo.journeys, expected))
+
+
+@pytest.mark.parametrize("compacted", [False, True], ids=["marked", "compacted"])
+def test_api_pages(
+    deleted: Tuple[BlogRepository, List[Dict[str, Any]]], compacted: bool
+) -> None:
+    repo, expected = deleted
+    if compacted:
+        repo.compact()
+    ids = [journey["id"] for journey in sorted(expected, key=sort_key)]
+    forward, backward = all_pages(repo)
+    assert forward == ids
+    assert backward == ids
+
+
+def test_cascade(deleted: Tuple[BlogRepository, List[Dict[str, Any]]]) -> None:
+    repo, _ = deleted
+    authors = {traveler["id"] for traveler in repo.travelers}
+    assert len(authors) == len(list(repo.travelers))
+    assert all(journey["travelerId"] in authors for journey in repo.journeys)
+    for traveler_id in {journey["travelerId"] for journey in repo.journeys}:
+        assert repo.get_traveler(traveler_id) is not None
+
+
+def test_comment_cascade() -> None:
+    # Удаление пользователя уносит и его комментарии под чужими постами,
+    # вместе с ответами на них (ON DELETE CASCADE у author_id)
+    start = datetime(2025, 1, 1)
+    travelers = [
+        {"id": i, "email": f"{i}@t.ru", "username": f"t{i}", "createdAt": start}
+        for i in (1, 2, 3)
+    ]
+    journeys = [
+        {
+            "id": i,
+            "travelerId": i,
+            "destination": f"Место {i}",
+            "story": "Рассказ",
+            "createdAt": start + timedelta(days=i),
+        }
+        for i in (1, 2)
+    ]
+    repo = BlogRepository(travelers, journeys, 4, 3)
+    tree = CommentTree(repo, [])
+    # Под постом удаляемого пользователя
+    on_own = tree.create(1, 3, "чужой комментарий")
+    tree.create(1, 1, "ответ автора", on_own)
+    # Под чужим постом: ветка удаляемого и чужая
+    branch = tree.create(2, 1, "комментарий удаляемого")
+    tree.create(2, 2, "ответ на него", branch)
+    kept = tree.create(2, 2, "своя ветка")
+    tree.create(2, 1, "ответ удаляемого", kept)
+    repo.drain_changes()
+
+    repo.delete_traveler(1)
+
+    assert len(tree) == 1
+    assert tree.count(1) == 0
+    assert tree.count(2) == 1
+    threads, _ = tree.page_threads(2, 10)
+    assert [thread.comment["id"] for thread in threads] == [kept["id"]]
+    assert threads[0].replies == []
+    deleted_comments = {
+        change["id"]
+        for change in repo.drain_changes()
+        if change["op"] == "del" and change["c"] == "comments"
+    }
+    assert deleted_comments == {1, 2, 3, 4, 6}
+    assert all(tree.get(comment_id) is None for comment_id in deleted_comments)
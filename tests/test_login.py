@@ -0,0 +1,68 @@
+from types import ModuleType
+from typing import Any, Dict
+
+import pytest
+from fastapi.testclient import TestClient
+
+import passwords
+
+PASSWORD = "secret123"
+
+
+def login(client: TestClient, email: str, password: str = PASSWORD) -> Any:
+    return client.post("/api/login", json={"email": email, "password": password})
+
+
+def test_login(client: TestClient, traveler: Dict[str, Any]) -> None:
+    response = login(client, traveler["email"])
+    assert response.status_code == 200
+    assert response.json() == traveler
+    assert "password" not in response.json()
+
+
+@pytest.mark.parametrize("wrong", ["email", "password"])
+def test_login_rejected(
+    client: TestClient, traveler: Dict[str, Any], wrong: str
+) -> None:
+    # Один и тот же ответ: по нему не узнать, какие email зарегистрированы
+    if wrong == "email":
+        response = login(client, "nobody" + traveler["email"])
+    else:
+        response = login(client, traveler["email"], PASSWORD + "!")
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Неверный email или пароль"}
+
+
+@pytest.mark.parametrize("stored", ["plaintext", "outdated"])
+def test_login_rehash(
+    app: ModuleType,
+    client: TestClient,
+    traveler: Dict[str, Any],
+    monkeypatch: pytest.MonkeyPatch,
+    stored: str,
+) -> None:
+    # Пароль из старых данных или со старыми параметрами scrypt после
+    # успешного входа хранится хэшем с текущими параметрами
+    record = app.repo.get_traveler(traveler["id"])
+    if stored == "plaintext":
+        legacy = PASSWORD
+    else:
+        with monkeypatch.context() as patched:
+            patched.setattr(passwords, "SCRYPT_N", passwords.SCRYPT_N // 2)
+            legacy = passwords.hash_password(PASSWORD)
+    app.repo.update_traveler(record, touch=False, password=legacy)
+    assert passwords.verify_password(PASSWORD, legacy) == (True, True)
+
+    assert login(client, traveler["email"], PASSWORD + "!").status_code == 401
+    assert record["password"] == legacy
+
+    response = login(client, traveler["email"])
+    assert response.status_code == 200
+    assert "password" not in response.json()
+    assert record["password"] != legacy
+    assert passwords.is_hashed(record["password"])
+    assert passwords.verify_password(PASSWORD, record["password"]) == (True, False)
+    # Повторный вход уже ничего не меняет
+    rehashed = record["password"]
+    assert login(client, traveler["email"]).status_code == 200
+    assert record["password"] == rehashed
@@ -0,0 +1,68 @@
+import os
+from collections.abc import Collection
+from typing import Any, Dict, Iterator, List, Set
+
+# Раз в сколько секунд фоновая задача сжимает списки записей
+COMPACT_INTERVAL = float(os.environ.get("BLOG_COMPACT_INTERVAL_SECONDS", "5"))
+# Если удалённых больше этой доли, список сжимается сразу, не дожидаясь
+# фоновой задачи: обход не должен тратить большую часть времени на пропуск
+# пометок. Сжатие стоит O(n) после n/2 удалений — в среднем O(1) на каждое
+COMPACT_RATIO = 0.5
+# Сжатие миллиона записей — сотни миллисекунд без ответов, поэтому фоновая
+# задача ждёт, пока помеченных наберётся хотя бы такая доля
+BACKGROUND_COMPACT_RATIO = 1 / 64
+
+
+class TombstoneList(Collection):
+    # Записи в порядке добавления с удалением за O(1): удалённая запись
+    # остаётся в списке с пометкой и пропускается при обходе, а список
+    # сжимается потом одним проходом. Снаружи это коллекция живых записей:
+    # обход, len и добавление — как у обычного списка
+    def __init__(self, items: List[Dict[str, Any]]) -> None:
+        self._items = items
+        # id() удалённых записей; сами записи держит _items до сжатия
+        self._dead: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._items) - len(self._dead)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if not self._dead:
+            return iter(self._items)
+        return self._live(self._items, self._dead)
+
+    @staticmethod
+    def _live(items: List[Dict[str, Any]], dead: Set[int]) -> Iterator[Dict[str, Any]]:
+        # Список и пометки передаются явно: сжатие подменяет их новыми,
+        # и начатый обход спокойно доходит до конца по старым
+        for item in items:
+            if id(item) not in dead:
+                yield item
+
+    def __contains__(self, value: object) -> bool:
+        return id(value) not in self._dead and any(
+            item is value for item in self._items
+        )
+
+    @property
+    def dead(self) -> int:
+        return len(self._dead)
+
+    def append(self, item: Dict[str, Any]) -> None:
+        self._items.append(item)
+
+    def discard(self, item: Dict[str, Any]) -> None:
+        # Запись должна быть в списке: это проверяет вызывающий по индексу id
+        self._dead.add(id(item))
+        if len(self._dead) > len(self._items) * COMPACT_RATIO:
+            self.compact()
+
+    def compact(self, min_ratio: float = 0.0) -> int:
+        # Новый список, а не правка на месте: идущий обход его не заметит
+        removed = len(self._dead)
+        if not removed or removed < len(self._items) * min_ratio:
+            return 0
+        dead = self._dead
+        self._items = [item for item in self._items if id(item) not in dead]
+        self._dead = set()
+        return removed
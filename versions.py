@@ -0,0 +1,186 @@
+from bisect import bisect_right
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from json_cache import JsonCache
+from repository import VERSION_FIELD, BlogRepository
+from storage import SEQUENCES, TOMBSTONE_RETENTION, tombstone_cutoff
+
+CHANGES_PAGE_SIZE = 500
+MAX_CHANGES_PAGE_SIZE = 5000
+
+# (коллекция, id)
+Key = Tuple[str, int]
+# версия изменения, версия создания, запись (None — удалена)
+Entry = Tuple[int, int, Optional[Dict[str, Any]]]
+# Версия записей без поля version (данные до версий). Она же — версия
+# создания загруженных записей, которая не хранится: для клиента с since=0
+# они созданы, для остальных — изменены
+LEGACY_VERSION = 1
+
+
+class ChangesExpired(Exception):
+    # Удаления после since уже забыты: дельту не собрать
+    pass
+
+
+class ChangeLog:
+    # Последнее изменение каждой записи и журнал версий по возрастанию:
+    # изменения после since находятся бинарным поиском, а запись,
+    # менявшаяся много раз, отдаётся один раз — в текущем виде
+    def __init__(
+        self,
+        repo: BlogRepository,
+        tombstones: Iterable[List[Any]] = (),
+        forgotten: int = 0,
+        retention: float = TOMBSTONE_RETENTION,
+    ) -> None:
+        # tombstones и forgotten — удаления, которые помнит хранилище
+        # (store.tombstones()): дельта переживает перезапуск, а у процессов
+        # с общим журналом она одна и та же
+        self.clock = repo.clock
+        self.retention = retention
+        # Версии не старше floor клиент мог пропустить: удаления до неё забыты
+        self.floor = forgotten
+        self._latest: Dict[Key, Entry] = {}
+        self._versions: List[int] = []
+        self._keys: List[Key] = []
+        self._stale = 0
+        self._tombstones: Deque[Tuple[int, Key]] = deque()
+        self.clock.observe(forgotten)
+        self._load(repo, tombstones)
+        repo.add_listener(self._on_change)
+
+    def _load(self, repo: BlogRepository, tombstones: Iterable[List[Any]]) -> None:
+        # Журнал версий из загруженных записей: каждая — своим последним
+        # изменением, удалённые — удалением
+        loaded: List[Tuple[int, Key, Optional[Dict[str, Any]]]] = []
+        for collection in SEQUENCES:
+            for record in repo.records(collection):
+                version = record.get(VERSION_FIELD) or LEGACY_VERSION
+                loaded.append((version, (collection, record["id"]), record))
+        for collection, record_id, version in tombstones:
+            loaded.append((version, (collection, record_id), None))
+        loaded.sort(key=lambda item: item[0])
+        for version, key, record in loaded:
+            if key in self._latest:
+                self._stale += 1
+            self._latest[key] = (version, LEGACY_VERSION, record)
+            self._versions.append(version)
+            self._keys.append(key)
+            if record is None:
+                self._tombstones.append((version, key))
+            self.clock.observe(version)
+        self._expire()
+
+    @property
+    def version(self) -> int:
+        return self.clock.last
+
+    def _on_change(self, op: str, collection: str, record: Dict[str, Any]) -> None:
+        key = (collection, record["id"])
+        version = record.get(VERSION_FIELD) or self.clock.last
+        if self._versions and version < self._versions[-1]:
+            # Чужая запись из сверки после перечитывания журнала: в журнале
+            # версий она встаёт последней, иначе её не найдёт бинарный поиск
+            version = self._versions[-1]
+        previous = self._latest.get(key)
+        if previous is not None:
+            self._stale += 1
+        if op == "create":
+            created = version
+        else:
+            created = previous[1] if previous is not None else LEGACY_VERSION
+        self._latest[key] = (version, created, None if op == "delete" else record)
+        self._versions.append(version)
+        self._keys.append(key)
+        if op == "delete":
+            self._tombstones.append((version, key))
+        self._expire()
+        if self._stale > len(self._versions) // 2 > 512:
+            self._compact()
+
+    def _expire(self) -> None:
+        # Срок хранения отсчитывается от версии удаления, как и в хранилище
+        cutoff = tombstone_cutoff(self.retention)
+        while self._tombstones and self._tombstones[0][0] < cutoff:
+            version, key = self._tombstones.popleft()
+            entry = self._latest.get(key)
+            if entry is not None and entry[2] is None and entry[0] == version:
+                del self._latest[key]
+                self._stale += 1
+            self.floor = max(self.floor, version)
+
+    def _compact(self) -> None:
+        # Оставляем в журнале версий только последнее изменение записей
+        versions, keys = [], []
+        for version, key in zip(self._versions, self._keys):
+            entry = self._latest.get(key)
+            if entry is not None and entry[0] == version:
+                versions.append(version)
+                keys.append(key)
+        self._versions, self._keys = versions, keys
+        self._stale = 0
+
+    def record_version(self, record: Dict[str, Any]) -> int:
+        return record.get(VERSION_FIELD) or LEGACY_VERSION
+
+    def changes(
+        self,
+        since: int,
+        limit: int = CHANGES_PAGE_SIZE,
+        collections: Optional[Set[str]] = None,
+    ) -> Tuple[List[Tuple[str, Key, int, Optional[Dict[str, Any]]]], int, bool]:
+        # (тип, ключ, версия, запись), версия для следующего запроса, есть ли ещё
+        self._expire()
+        if since < self.floor:
+            raise ChangesExpired(since)
+        result: List[Tuple[str, Key, int, Optional[Dict[str, Any]]]] = []
+        seen: Set[Key] = set()
+        start = bisect_right(self._versions, since)
+        for position in range(start, len(self._versions)):
+            version, key = self._versions[position], self._keys[position]
+            if len(result) >= limit and version != result[-1][2]:
+                # Изменения одной версии не разрываем между страницами
+                return result, result[-1][2], True
+            entry = self._latest.get(key)
+            if entry is None or entry[0] != version or key in seen:
+                continue
+            if collections is not None and key[0] not in collections:
+                continue
+            seen.add(key)
+            _, created, record = entry
+            if record is None:
+                if created > since:
+                    # Создана и удалена после since: клиент её не видел
+                    continue
+                result.append(("deleted", key, version, None))
+            else:
+                kind = "created" if created > since else "updated"
+                result.append((kind, key, version, record))
+        return result, self.clock.last, False
+
+    def encode_changes(
+        self,
+        json_cache: JsonCache,
+        since: int,
+        limit: int = CHANGES_PAGE_SIZE,
+        collections: Optional[Set[str]] = None,
+    ) -> bytes:
+        changes, version, has_more = self.changes(since, limit, collections)
+        items = []
+        for kind, (collection, record_id), record_version, record in changes:
+            item = b'{"type":"%s","collection":"%s","id":%d,"version":%d' % (
+                kind.encode(),
+                collection.encode(),
+                record_id,
+                record_version,
+            )
+            if record is not None:
+                item += b',"record":' + json_cache.encode(collection, record)
+            items.append(item + b"}")
+        return b'{"version":%d,"hasMore":%s,"changes":[%s]}' % (
+            version,
+            b"true" if has_more else b"false",
+            b",".join(items),
+        )